@@ -23,6 +23,7 @@ class SVDk2b_Descriptor :
         self.path_dir_k2b_pkl = path_dir_k2b_pkl
         self.path_bso4_pkl = path_bso4_pkl
         self.path_writing = path_writing
+        self.collection_k2b : Dict[str, List[np.ndarray]] = None
 
     def load_pickle(self, path_pickle : os.PathLike[str]) -> Dict[str, Data] : 
         return pickle.load(open(path_pickle, 'rb'))
@@ -39,48 +40,32 @@ class SVDk2b_Descriptor :
         else :
             return data_config[key]['atoms'].get_array('milady-descriptors')[:,:-dimtoavoid-1]
 
+    def LoadAllCollectionk2b(self) -> Dict[str, List[np.ndarray]] : 
+        # each k2b pickle is read only once, only descriptor arrays are kept 
+        if self.collection_k2b is None : 
+            self.collection_k2b = {}
+            paths_picklek2b = sorted([f'{self.path_dir_k2b_pkl}/{f}' for f in os.listdir(self.path_dir_k2b_pkl)])
+            for path_pickle in paths_picklek2b :  
+                data_pickle_idp = self.load_pickle(path_pickle)
+                for conf in data_pickle_idp.keys() : 
+                    desc_p_c = np.ascontiguousarray(self.GetDescritporConfig(data_pickle_idp, conf))
+                    self.collection_k2b.setdefault(conf, []).append(desc_p_c)
+                del data_pickle_idp
+        
+        return self.collection_k2b
+
     def LoadCollectionk2b_simple(self, key : str) -> np.ndarray : 
         # descriptor tensor shape is NxDxNb_k2b
-        descriptor_tensor = None 
-
-        paths_picklek2b = [f'{self.path_dir_k2b_pkl}/{f}' for f in os.listdir(self.path_dir_k2b_pkl)]
-        nb_pickek2b = len(paths_picklek2b)
-        for id_p, path_pickle in enumerate(paths_picklek2b) :  
-            data_pickle_idp = self.load_pickle(path_pickle) 
-            desc_p_c = self.GetDescritporConfig(data_pickle_idp, key)
-            if id_p == 0 :
-                descriptor_tensor = np.zeros((desc_p_c.shape[0],desc_p_c.shape[1],nb_pickek2b))
-            
-            descriptor_tensor[:,:,id_p] = desc_p_c
-
-        return descriptor_tensor
+        return np.stack(self.LoadAllCollectionk2b()[key], axis=-1)
 
     def BuildSVDK2b_simple(self, tensor_desc : np.ndarray) -> np.ndarray : 
-        svd_desc = np.zeros((tensor_desc.shape[0],min(tensor_desc.shape[1],tensor_desc.shape[2])))
-        for id_at in range(tensor_desc.shape[0]) : 
-            _, svd_desc_config, _ = np.linalg.svd(tensor_desc[id_at,:,:], full_matrices=True)
-            svd_desc[id_at,:] = svd_desc_config
-        return svd_desc
+        # batched svd over the atom axis, only singular values are needed
+        return np.linalg.svd(tensor_desc, compute_uv=False)
 
     def LoadCollectionk2b(self) -> np.ndarray : 
         # descriptor tensor shape is MxDxNb_k2b
-        descriptor_tensor = None 
-
-        paths_picklek2b = [f'{self.path_dir_k2b_pkl}/{f}' for f in os.listdir(self.path_dir_k2b_pkl)]
-        nb_pickek2b = len(paths_picklek2b)
-        for id_p, path_pickle in enumerate(paths_picklek2b) :
-            data_pickle_idp = self.load_pickle(path_pickle)
-            nb_config = len(data_pickle_idp)
-            for id_c, conf in enumerate(data_pickle_idp.keys()) : 
-                desc_p_c = self.GetDescritporConfig(data_pickle_idp, conf)
-                if id_c == 0 and id_p == 0: 
-                    size_desc = desc_p_c.shape[1]
-                    nb_atoms = desc_p_c.shape[0]
-                    descriptor_tensor = np.zeros((nb_config, nb_atoms, size_desc, nb_pickek2b))
-
-                descriptor_tensor[id_c,:,:,id_p] = desc_p_c
-        
-        return descriptor_tensor
+        collection_k2b = self.LoadAllCollectionk2b()
+        return np.stack([np.stack(collection_k2b[conf], axis=-1) for conf in collection_k2b], axis=0)
     
     def LoadManyBodyDescriptor(self) -> Tuple[np.ndarray, Dict[str,Data]] : 
         data_pkl_manyb = self.load_pickle(self.path_bso4_pkl)
@@ -94,14 +79,8 @@ class SVDk2b_Descriptor :
         return desc_many, data_pkl_manyb.copy()
 
     def BuildSVDK2b(self, tensor_desc : np.ndarray) -> np.ndarray : 
-        svd_desc = np.zeros((tensor_desc.shape[0],tensor_desc.shape[1],min(tensor_desc.shape[2],tensor_desc.shape[3])))
-        for id_config in range(tensor_desc.shape[0]) : 
-            for id_at in range(tensor_desc.shape[1]) : 
-
-                _, svd_desc_config, _ = np.linalg.svd(tensor_desc[id_config,id_at,:,:], full_matrices=True)
-                svd_desc[id_config,id_at,:] = svd_desc_config
-
-        return svd_desc
+        # batched svd over configuration and atom axes
+        return np.linalg.svd(tensor_desc, compute_uv=False)
     
     def BuildSVDDescriptor(self) -> None :
         tensor_descriptor = self.LoadCollectionk2b()
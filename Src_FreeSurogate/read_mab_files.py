@@ -4,7 +4,8 @@ import os, re, shutil
 import pickle
 import warnings
 
-from typing import Dict, TypedDict, List
+from typing import Dict, TypedDict, List, Tuple
+from joblib import Parallel, delayed
 from tools import RecursiveBuilder
 
 from ase import Atoms
@@ -53,6 +54,78 @@ def add_or_update_FE(hdf5_group : Group,
         hdf5_group[name_config].create_dataset("delta_FE", data=data_object['array_delta_FE'], compression="gzip", compression_opts=9)
     return 
 
+header_pattern = re.compile(r'----------FREE ENERGY FINAL RESULTS---------')
+reference_pattern = re.compile(r'F\(Reference\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
+full_ref_pattern = re.compile(r'F\(Full\) - F\(Reference\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
+full_pattern = re.compile(r'F\(Full\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
+sigma_pattern = re.compile(r'sigma\(F\(full\)\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
+delta_pattern = re.compile(r'F\(Full\) - F\(Reference\) - F\(block\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
+
+def extract_value(patern : Pattern[str], string : str) -> float : 
+    try : 
+        return float(patern.search(string).group(1))
+    except : 
+        return np.nan
+
+def read_out_mab(path_out : os.PathLike[str], 
+                 nb_langevin : float, 
+                 alpha : float,
+                 temperature : float) -> np.ndarray :
+    try : 
+        str_FE = open(path_out,'r').read()
+        header_str = header_pattern.search(str_FE)
+    except :
+        print('... No free energy results ...')
+        return np.array([temperature, np.nan, np.nan, np.nan, np.nan, np.nan])
+
+    # Extract data using the regular expressions
+    reference_value = extract_value(reference_pattern, str_FE)
+    full_ref_value =  extract_value(full_ref_pattern, str_FE)
+    full_value = extract_value(full_pattern, str_FE)
+    sigma_value =  alpha*extract_value(sigma_pattern, str_FE)/np.sqrt(nb_langevin)
+    delta_F_value = extract_value(delta_pattern, str_FE)
+
+    return np.array([temperature ,reference_value, full_ref_value, full_value, sigma_value, delta_F_value])
+
+def extract_mab_run(collection_path : List[os.PathLike[str]],
+                    list_temperature : List[float],
+                    nb_langevin : float, 
+                    alpha : float) -> Data :
+    """Parse all out_mab files and the in.lmp geometry of one configuration. 
+    This function only reads files, it is the unit of work sent to parallel workers
+    (hdf5 writing is kept in the main process)"""
+    collection_path = sorted(collection_path)
+    array_data = np.zeros((len(list_temperature),6))
+    root_path = os.path.dirname(collection_path[0])
+    for id_temperature, temperature in enumerate(list_temperature) :
+        path_temperature = '{:s}/{:4.1f}'.format(root_path,temperature) 
+        array_data[id_temperature] = read_out_mab(f'{path_temperature}/out_mab',
+                                                  nb_langevin,
+                                                  alpha,
+                                                  temperature)
+    atoms = read('{:s}/in.lmp'.format(collection_path[0]),format='lammps-data',style='atomic')
+    atoms.set_chemical_symbols(['Fe'] * len(atoms))
+
+    return {'atoms':atoms,
+            'array_temperature':array_data[:,0],
+            'array_ref_FE':array_data[:,1],
+            'array_anah_FE':array_data[:,2],
+            'array_full_FE':array_data[:,3],
+            'array_sigma_FE':array_data[:,4],
+            'array_delta_FE':array_data[:,5]}
+
+def safe_extract_mab_run(name : str, 
+                         collection_path : List[os.PathLike[str]],
+                         list_temperature : List[float],
+                         nb_langevin : float, 
+                         alpha : float) -> Tuple[str, Data | None] :
+    """Worker version of ```extract_mab_run```, a broken run does not stop the harvesting"""
+    try : 
+        return name, extract_mab_run(collection_path, list_temperature, nb_langevin, alpha)
+    except Exception as error : 
+        print('Something wrong with : {:s} ({})'.format(name, error))
+        return name, None
+
 class DataMAB : 
     def __init__(self, root_dir : os.PathLike[str],
                  list_temperature : List[float]) -> None : 
@@ -62,18 +135,55 @@ class DataMAB :
 
     def GenerateData(self, hdf5 : Group,
                      nb_langevin : float,
-                     alpha : float = 2.0) -> None : 
-        list_all_calculations = RecursiveBuilder(self.root_dir, file2find='out_mab')
+                     alpha : float = 2.0,
+                     njob : int = 1,
+                     incremental : bool = False,
+                     index_file : os.PathLike[str] = None) -> None : 
+        """Harvest all MAB runs below root_dir into the hdf5 group. Run directories are parsed 
+        by njob parallel workers while the main process is the only hdf5 writer. In incremental 
+        mode, configurations already stored in the hdf5 group are skipped.
+
+        Parameters
+        ----------
+
+        hdf5 : ```Group```
+            hdf5 group to fill 
+
+        nb_langevin : float
+            Number of Langevin steps used to normalise sigma 
+
+        alpha : float 
+            Confidence factor applied on sigma 
+
+        njob : int 
+            Number of parallel parsing workers
+
+        incremental : bool 
+            Skip configurations already present in hdf5
+
+        index_file : os.PathLike[str]
+            json index for the directory scan (see ```tools.ScanDirectories```)
+        """
+        list_all_calculations = RecursiveBuilder(self.root_dir, file2find='out_mab', index_file=index_file)
         gather_dictionnary = self.GatheringPath(list_all_calculations)
         print(f'... I found {len(gather_dictionnary)} configurations ...')
+        if incremental : 
+            gather_dictionnary = {name:collection for name, collection in gather_dictionnary.items() if name not in hdf5}
+            print(f'... {len(gather_dictionnary)} configurations are not stored yet ...')
         print()
-        for name, collection_path_name in gather_dictionnary.items() : 
+
+        results = Parallel(n_jobs=njob, return_as='generator')(delayed(safe_extract_mab_run)(name, 
+                                                                                            collection_path_name,
+                                                                                            self.list_temperature,
+                                                                                            nb_langevin,
+                                                                                            alpha) for name, collection_path_name in gather_dictionnary.items())
+        for name, data in results : 
+            if data is None : 
+                continue
             print('Extracting data : {:s}'.format(name))
-            self.UpdateData(hdf5,
-                            name,
-                            collection_path_name,
-                            nb_langevin,
-                            alpha)
+            self.Data[name] = data
+            add_or_update_FE(hdf5, name, data)
+        hdf5.file.flush()
 
     def GatheringPath(self, list_path : List[os.PathLike[str]]) -> Dict[str,List[os.PathLike[str]]] :
         gather_dic : Dict[str, List[os.PathLike[str]]] = {}
@@ -94,37 +204,13 @@ class DataMAB :
         return open(path,'r').read()
 
     def extract_value(self, patern : Pattern[str], string : str) -> float : 
-        try : 
-            return float(patern.search(string).group(1))
-        except : 
-            return np.nan
+        return extract_value(patern, string)
 
     def ReadOutMab(self, path_out : os.PathLike[str], 
                    nb_langevin : float, 
                    alpha : float,
                    temperature : float) -> np.ndarray :
-        try : 
-            str_FE = open(path_out,'r').read()
-            header = re.compile(r'----------FREE ENERGY FINAL RESULTS---------')
-            header_str = header.search(str_FE)
-        except :
-            print('... No free energy results ...')
-            return np.array([temperature, np.nan, np.nan, np.nan, np.nan, np.nan])
-
-        reference_pattern = re.compile(r'F\(Reference\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
-        full_ref_pattern = re.compile(r'F\(Full\) - F\(Reference\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
-        full_pattern = re.compile(r'F\(Full\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
-        sigma_pattern = re.compile(r'sigma\(F\(full\)\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
-        delta_pattern = re.compile(r'F\(Full\) - F\(Reference\) - F\(block\)\s+\(eV\)\s+\.+:\s+([-\d\.]+)')
-
-        # Extract data using the regular expressions
-        reference_value = self.extract_value(reference_pattern, str_FE) #reference_pattern.search(str_FE).group(1)
-        full_ref_value =  self.extract_value(full_ref_pattern, str_FE) #full_ref_pattern.search(str_FE).group(1)
-        full_value = self.extract_value(full_pattern, str_FE) #full_pattern.search(str_FE).group(1)
-        sigma_value =  alpha*self.extract_value(sigma_pattern, str_FE)/np.sqrt(nb_langevin) # alpha*sigma_pattern.search(str_FE).group(1)/np.sqrt(nb_langevin)
-        delta_F_value = self.extract_value(delta_pattern, str_FE)
-
-        return np.array([temperature ,reference_value, full_ref_value, full_value, sigma_value, delta_F_value])
+        return read_out_mab(path_out, nb_langevin, alpha, temperature)
 
     def UpdateData(self,
                    hdf5 : Group, 
@@ -132,27 +218,11 @@ class DataMAB :
                    collection_path : List[os.PathLike[str]], 
                    nb_langevin : float, 
                    alpha : float) -> None :
-        collection_path.sort()
-        array_data = np.zeros((len(self.list_temperature),6))
-        root_path = os.path.dirname(collection_path[0])
-        for id_temperature, temperature in enumerate(self.list_temperature) :
-            path_temperature = '{:s}/{:4.1f}'.format(root_path,temperature) 
-            #print(path_temperature)            
-            array_data[id_temperature] = self.ReadOutMab(f'{path_temperature}/out_mab',
-                                                         nb_langevin,
-                                                         alpha,
-                                                         temperature)
-        atoms = read('{:s}/in.lmp'.format(collection_path[0]),format='lammps-data',style='atomic')
-        atoms = self.change_all_symbols(atoms, 'Fe')
-
         #updating Data object 
-        self.Data[name] = {'atoms':atoms,
-                           'array_temperature':array_data[:,0],
-                           'array_ref_FE':array_data[:,1],
-                           'array_anah_FE':array_data[:,2],
-                           'array_full_FE':array_data[:,3],
-                           'array_sigma_FE':array_data[:,4],
-                           'array_delta_FE':array_data[:,5]}
+        self.Data[name] = extract_mab_run(collection_path, 
+                                          self.list_temperature, 
+                                          nb_langevin, 
+                                          alpha)
         print(self.Data[name])
 
         add_or_update_FE(hdf5, 
@@ -160,13 +230,23 @@ class DataMAB :
                          self.Data[name])
 
 
-    def WritePickle(self, path2write : str = '.') -> None :
-        if os.path.exists('{:s}/mab.pickle'.format(path2write)) : 
-            os.remove('{:s}/mab.pickle'.format(path2write))
+    def WritePickle(self, path2write : str = '.', merge : bool = False) -> None :
+        """Write Data dictionnary in mab.pickle. In merge mode (incremental harvesting, 
+        where Data only contains new configurations) Data is merged into the existing pickle"""
+        path_pickle = '{:s}/mab.pickle'.format(path2write)
+        data2write : Dict[str,Data] = {}
+        if merge and os.path.exists(path_pickle) : 
+            with open(path_pickle,'rb') as f : 
+                data2write = pickle.load(f)
+        data2write.update(self.Data)
+
+        if os.path.exists(path_pickle) : 
+            os.remove(path_pickle)
 
-        if self.Data is None : 
+        if len(data2write) == 0 : 
             warnings.warn('Data dictionnary is empty !')
-        pickle.dump(self.Data, open('{:s}/mab.pickle'.format(path2write),'wb'))
+        with open(path_pickle,'wb') as f : 
+            pickle.dump(data2write, f)
 
 ####################
 ### INPUTS
@@ -175,18 +255,26 @@ root_path = '/lustre/fsn1/projects/rech/yxs/uef77fk/FreeEnergyFe'
 nb_langevin = 40000.0 
 alpha = 5.0
 list_temperature = [300., 600., 900., 1200.]
+# parallel workers, incremental update of free_energy.h5 / mab.pickle and json index of the scan are opt-in
+njob = 1
+incremental = False
+index_file = None
 ####################
 
 mab_object = DataMAB(root_path,
                      list_temperature)
 
-if os.path.exists('free_energy.h5') :
+if os.path.exists('free_energy.h5') and not incremental :
     os.remove('free_energy.h5')
 
-file = h5py.File('free_energy.h5', 'w')
+file = h5py.File('free_energy.h5', 'a' if incremental else 'w')
 # Create a group for potentials
-free_energy_group = file.create_group('free_energy')
+free_energy_group = file.require_group('free_energy')
 mab_object.GenerateData(free_energy_group,
                         nb_langevin,
-                        alpha=alpha)
-mab_object.WritePickle()
+                        alpha=alpha,
+                        njob=njob,
+                        incremental=incremental,
+                        index_file=index_file)
+file.close()
+mab_object.WritePickle(merge=incremental)
@@ -8,6 +8,7 @@ import scipy
 
 from sklearn.metrics import mean_squared_error
 from scipy.stats import kde
+from joblib import Parallel, delayed
 import pickle
 plt.rcParams['text.usetex'] = True
 plt.rcParams.update({'text.latex.preamble': r'\usepackage{amsfonts}'})
@@ -29,6 +30,14 @@ class MyLinearRegression :
         self.intercept_ = None 
         self.weights = None  
 
+        # incremental QR factorisation of the training design matrix : X = Q R, 
+        # Q^T Y and Q^T 1 are kept to center the targets
+        self.R = None 
+        self.QtY = None 
+        self.Qt1 = None 
+        self.sum_Y = 0.0
+        self.nb_samples = 0
+
     def fit(self, X : np.ndarray, Y : np.ndarray, dim : int = None) -> None :
         self.intercept_ = np.mean(Y)
 
@@ -42,6 +51,45 @@ class MyLinearRegression :
             self.coef2_, res, rank2, s = np.linalg.lstsq(X[:,dim:], Y - self.intercept_ - X[:,:dim]@self.coef1_, rcond=self.lamb2) 
             print(f'Rank of design matrix = {rank1}, {rank2}')
         return 
+
+    def update_statistics(self, X : np.ndarray, Y : np.ndarray) -> None : 
+        """Update the QR factorisation of the design matrix with new rows (R and new rows are 
+        factorised again), Q^T Y, Q^T 1, sum of Y and number of samples"""
+        if self.R is None : 
+            self.R = np.zeros((0,X.shape[1]))
+            self.QtY = np.zeros(0)
+            self.Qt1 = np.zeros(0)
+
+        Q, self.R = np.linalg.qr(np.concatenate((self.R, X), axis=0))
+        self.QtY = Q.T@np.concatenate((self.QtY, Y))
+        self.Qt1 = Q.T@np.concatenate((self.Qt1, np.ones(X.shape[0])))
+        self.sum_Y += np.sum(Y)
+        self.nb_samples += X.shape[0]
+        return 
+
+    def fit_from_statistics(self, dim : int = None) -> None : 
+        """Fit the model from the QR factorisation : lstsq(X[:,S], b - X[:,T] c) is the same 
+        problem as lstsq(R[:,S], Q^T b - R[:,T] c) with the same singular values"""
+        self.intercept_ = self.sum_Y/self.nb_samples
+        # Q^T (Y - <Y>)
+        QtYc = self.QtY - self.intercept_*self.Qt1
+
+        if dim is None : 
+            self.coef_, res, rank, s = np.linalg.lstsq(self.R, QtYc, rcond=self.lamb)
+            self.weights = self.coef_
+            print(f'Rank of design matrix = {rank}')
+
+        else : 
+            self.coef1_, res, rank1, s = np.linalg.lstsq(self.R[:,:dim], QtYc, rcond=self.lamb)
+            self.coef2_, res, rank2, s = np.linalg.lstsq(self.R[:,dim:], QtYc - self.R[:,:dim]@self.coef1_, rcond=self.lamb2)
+            print(f'Rank of design matrix = {rank1}, {rank2}')
+        return 
+
+    def partial_fit(self, X : np.ndarray, Y : np.ndarray, dim : int = None) -> None : 
+        """Update the QR factorisation with new samples and refit without the previous samples"""
+        self.update_statistics(X, Y)
+        self.fit_from_statistics(dim=dim)
+        return 
     
     def compute_rmse(self, X : np.ndarray, Y : np.ndarray) -> None : 
         return np.sqrt(np.mean(np.power(self.predict(X) - Y, 2.0),axis=0))
@@ -236,6 +284,22 @@ class ModelFE(TypedDict) :
     rmse : float 
     temperature : float 
 
+class FitFE(TypedDict) : 
+    model : MyLinearRegression
+    med_error : float
+    Y : np.ndarray
+    Y_pred : np.ndarray
+    Y_train : np.ndarray
+    Y_pred_train : np.ndarray
+    Y_test : np.ndarray
+    Y_pred_test : np.ndarray
+    idx_train : np.ndarray
+    rows : np.ndarray
+    rows_train : np.ndarray
+    rows_test : np.ndarray
+    mean : np.ndarray | None
+    std : np.ndarray | None
+
 class RegressorFreeEnergy : 
     def __init__(self, design_matrix : np.ndarray, 
                 dic_target : Dict[float, np.ndarray],
@@ -263,6 +327,7 @@ class RegressorFreeEnergy :
 
         self.mask_mcd = mask_mcd
         self.percentile = percentile
+        self.dic_fit : Dict[float, FitFE] = {}
 
     def GetMaxError(self,Ycalc : np.ndarray,
                         Ypred : np.ndarray,
@@ -382,99 +447,152 @@ class RegressorFreeEnergy :
 
         return 
 
-    def BuildAllModels(self, tolerance : float = 1e-5, dim_lin : int = None) -> Dict[float, ModelFE] : 
-        #fig, axis = plt.subplots(nrows=len(self.dic_target), ncols=2, figsize=(12,5*len(self.dic_target)))
-        fig, axis = plt.subplots(nrows=2, ncols=len(self.dic_target), figsize=(8*len(self.dic_target),12))
-        compt = 0
-        list_inter, list_T = [], []
-        for temp, target_temp in self.dic_target.items() : 
-            #self.dic_model[temp]['model'] = BayesianRidge(compute_score=True)
-            self.dic_model[temp]['model'] = MyLinearRegression(compute_score=True)
+    def FitTemperature(self, temp : float, tolerance : float = 1e-5, dim_lin : int = None) -> FitFE : 
+        """Fit the model for one temperature, no plotting is done here (can be run in parallel)"""
+        target_temp = self.dic_target[temp]
+        model = MyLinearRegression(compute_score=True)
+
+        # check nan for each temperature ! 
+        mask_nan = np.isnan(target_temp)
+        mask_error = self.dic_error[temp] < tolerance
+        print(len(mask_error),len( [el for el in mask_error if el] ), temp)
+
+        med_error = np.mean(self.dic_sigma[temp][mask_error])
+        print(med_error)
+
+        mask = ~mask_nan & mask_error
+        if self.mask_mcd is not None :
+            mask = mask & self.mask_mcd
+
+        Y = target_temp[mask]
+        X = self.design_matrix[mask,:]
+        idx_config_temp = self.array_idx_config[mask]
+        rows_temp = np.arange(self.design_matrix.shape[0])[mask]
+
+        mean, std = None, None
+        if self.normalised_design_matrix : 
+            mean = np.mean(X, axis = 0)
+            std = np.std(X, axis = 0)
+            X = (X-mean)/std 
+
+        if self.percentile is not None : 
+            mask_percentile = self.build_percentile_target(Y, self.percentile)
+            Y = Y[mask_percentile]
+            X = X[mask_percentile,:]
+            idx_config_temp = idx_config_temp[mask_percentile]
+            rows_temp = rows_temp[mask_percentile]
+
+        # train test part ! 
+        X_train, X_test, Y_train, Y_test, idx_train, _, rows_train, rows_test =  train_test_split(X,Y,idx_config_temp,rows_temp, 
+                                                                                          test_size=self.test_size, 
+                                                                                          random_state=self.random_state)
+        model.fit(X_train, Y_train, dim=dim_lin)            
+
+        return {'model':model,
+                'med_error':med_error,
+                'Y':Y,
+                'Y_pred':model.predict(X, dim=dim_lin),
+                'Y_train':Y_train,
+                'Y_pred_train':model.predict(X_train, dim=dim_lin),
+                'Y_test':Y_test,
+                'Y_pred_test':model.predict(X_test, dim=dim_lin),
+                'idx_train':idx_train,
+                'rows':rows_temp,
+                'rows_train':rows_train,
+                'rows_test':rows_test,
+                'mean':mean,
+                'std':std}
+
+    def BuildAllModels(self, tolerance : float = 1e-5, dim_lin : int = None, njob : int = 1, plot : bool = True) -> Dict[float, ModelFE] : 
+        list_T = [temp for temp in self.dic_target.keys()]
+        list_fit = Parallel(n_jobs=njob)(delayed(self.FitTemperature)(temp, tolerance, dim_lin) for temp in list_T)
+        for temp, fit in zip(list_T, list_fit) : 
+            self.dic_fit[temp] = fit
+            self.dic_model[temp]['model'] = fit['model']
             self.dic_model[temp]['temperature'] = temp
-
-            # check nan for each temperature ! 
-            mask_nan = np.isnan(target_temp)
-            mask_error = self.dic_error[temp] < tolerance
-            print(len(mask_error),len( [el for el in mask_error if el] ), temp)
-
-            med_error = np.mean(self.dic_sigma[temp][mask_error])
-            print(med_error)
-
-            mask = ~mask_nan & mask_error
-            if self.mask_mcd is not None :
-                mask = mask & self.mask_mcd
-
-            Y = target_temp[mask]
-            X = self.design_matrix[mask,:]
-            idx_config_temp = self.array_idx_config[mask]
-
-            if self.normalised_design_matrix : 
-                mean = np.mean(X, axis = 0)
-                std = np.std(X, axis = 0)
-                X = (X-mean)/std 
-
-            if self.percentile is not None : 
-                mask_percentile = self.build_percentile_target(Y, self.percentile)
-                Y = Y[mask_percentile]
-                X = X[mask_percentile,:]
-                idx_config_temp = idx_config_temp[mask_percentile]
-
-            # train test part ! 
-            X_train, X_test, Y_train, Y_test, idx_train, _ =  train_test_split(X,Y,idx_config_temp, 
-                                                                 test_size=self.test_size, 
-                                                                 random_state=self.random_state)
-            self.dic_model[temp]['model'].fit(X_train, Y_train, dim=dim_lin)            
-            Y_pred = self.dic_model[temp]['model'].predict(X, dim=dim_lin)
-            Y_pred_test = self.dic_model[temp]['model'].predict(X_test, dim=dim_lin)
-            Y_pred_train = self.dic_model[temp]['model'].predict(X_train, dim=dim_lin)
-            self.dic_model[temp]['rmse'] = np.sqrt(mean_squared_error(Y,Y_pred))
-
-            #self.PlotCorrelation(Y_test,
-            #                     Y_pred_test,
-            #                     temp,
-            #                     axis,
-            #                     [compt,1],
-            #                     med_error)
-            #self.PlotCorrelation(Y_train,
-            #                 Y_pred_train,
-            #                 temp,
-            #                 axis,
-            #                 [compt,0],
-            #                 med_error)  
-
-            #self.GetMaxError(Y_train,
-            #                 Y_pred_train,
-            #                 idx_train,
-            #                 temp,
-            #                 axis,
-            #                 [compt,0],
-            #                 1.5*np.sqrt(mean_squared_error(Y_train,Y_pred_train)))
-
+            self.dic_model[temp]['rmse'] = np.sqrt(mean_squared_error(fit['Y'],fit['Y_pred']))
+
+        if plot : 
+            self.PlotAllModels()
+        return self.dic_model
+
+    def normalise(self, X : np.ndarray, fit : FitFE) -> np.ndarray : 
+        """Apply the normalisation statistics of a given fit on design matrix rows (identity if 
+        the design matrix is not normalised)"""
+        if fit.get('mean') is None : 
+            return X
+        return (X - fit['mean'])/fit['std']
+
+    def UpdateModels(self, design_matrix : np.ndarray, 
+                     dic_target : Dict[float, np.ndarray],
+                     dic_error : Dict[float, np.ndarray],
+                     dic_sigma : Dict[float, np.ndarray],
+                     array_idx_config : np.ndarray,
+                     tolerance : float = 1e-5, 
+                     dim_lin : int = None) -> Dict[float, ModelFE] : 
+        """Refit models with new configurations by updating the QR factorisation
+        of the training set instead of refitting from scratch. All new configurations are used for training, 
+        MCD and percentile selections are not applied on them. For normalised design matrix, new 
+        configurations are normalised with the statistics of the initial fit"""
+        nb_old_config = self.design_matrix.shape[0]
+        self.design_matrix = np.concatenate((self.design_matrix, design_matrix), axis=0)
+        self.array_idx_config = np.concatenate((self.array_idx_config, array_idx_config))
+        if self.mask_mcd is not None : 
+            self.mask_mcd = np.concatenate((self.mask_mcd, np.ones(design_matrix.shape[0], dtype=bool)))
+        for temp in self.dic_target.keys() : 
+            self.dic_target[temp] = np.concatenate((self.dic_target[temp], dic_target[temp]))
+            self.dic_error[temp] = np.concatenate((self.dic_error[temp], dic_error[temp]))
+            self.dic_sigma[temp] = np.concatenate((self.dic_sigma[temp], dic_sigma[temp]))
+
+        for temp, fit in self.dic_fit.items() : 
+            model = fit['model']
+            if model.R is None : 
+                model.update_statistics(self.normalise(self.design_matrix[fit['rows_train'],:], fit), fit['Y_train'])
+
+            mask = ~np.isnan(dic_target[temp]) & (dic_error[temp] < tolerance)
+            rows_new = nb_old_config + np.arange(design_matrix.shape[0])[mask]
+            model.partial_fit(self.normalise(self.design_matrix[rows_new,:], fit), self.dic_target[temp][rows_new], dim=dim_lin)
+
+            fit['rows'] = np.concatenate((fit['rows'], rows_new))
+            fit['rows_train'] = np.concatenate((fit['rows_train'], rows_new))
+            fit['idx_train'] = self.array_idx_config[fit['rows_train']]
+            for key in ['', '_train', '_test'] : 
+                fit[f'Y{key}'] = self.dic_target[temp][fit[f'rows{key}']]
+                fit[f'Y_pred{key}'] = model.predict(self.normalise(self.design_matrix[fit[f'rows{key}'],:], fit), dim=dim_lin)
+
+            self.dic_model[temp]['model'] = model
+            self.dic_model[temp]['rmse'] = np.sqrt(mean_squared_error(fit['Y'],fit['Y_pred']))
+
+        return self.dic_model
+
+    def PlotAllModels(self) -> None : 
+        """Plot correlations and intercepts from the stored fitting results"""
+        fig, axis = plt.subplots(nrows=2, ncols=len(self.dic_fit), figsize=(8*len(self.dic_fit),12))
+        list_inter, list_T = [], []
+        for compt, (temp, fit) in enumerate(self.dic_fit.items()) : 
             scale = 2.0
-            self.PlotCorrelation(Y_test,
-                                 Y_pred_test,
+            self.PlotCorrelation(fit['Y_test'],
+                                 fit['Y_pred_test'],
                                  temp,
                                  axis,
                                  [1,compt],
-                                 scale*med_error)
-            self.PlotCorrelation(Y_train,
-                             Y_pred_train,
-                             temp,
-                             axis,
-                             [0,compt],
-                             scale*med_error)  
+                                 scale*fit['med_error'])
+            self.PlotCorrelation(fit['Y_train'],
+                                 fit['Y_pred_train'],
+                                 temp,
+                                 axis,
+                                 [0,compt],
+                                 scale*fit['med_error'])  
 
-            self.GetMaxError(Y_train,
-                             Y_pred_train,
-                             idx_train,
+            self.GetMaxError(fit['Y_train'],
+                             fit['Y_pred_train'],
+                             fit['idx_train'],
                              temp,
                              axis,
                              [0,compt],
-                             1.5*np.sqrt(mean_squared_error(Y_train,Y_pred_train)))
-
+                             1.5*np.sqrt(mean_squared_error(fit['Y_train'],fit['Y_pred_train'])))
 
-            compt += 1
-            list_inter.append(self.dic_model[temp]['model'].intercept_)
+            list_inter.append(fit['model'].intercept_)
             list_T.append(temp)
 
         plt.tight_layout()
@@ -486,4 +604,4 @@ class RegressorFreeEnergy :
         self.plot_theoritical_intercept(array_T,array_inter)
 
         plt.show()
-        return self.dic_model
\ No newline at end of file
+        return 
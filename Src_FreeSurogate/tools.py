@@ -1,5 +1,8 @@
 import os
-from typing import List
+import json
+import fnmatch
+from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
 import numpy as np
 
@@ -52,7 +55,7 @@ def RecursiveCheck(path : str, list : List[str], file2find : str = 'OUTCAR') ->
             new_path = '%s/%s'%(path,el)
             RecursiveCheck(new_path,list,file2find)
 
-def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR') -> List[str] :
+def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR', index_file : str = None, nb_workers : int = None) -> List[str] :
     """Build recursively the list of all file2find paths
     
     Parameters 
@@ -64,6 +67,13 @@ def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR') -> List[s
     file2find : str
         Name of the file to find   
 
+    index_file : str
+        Path to the json index of the tree (see ```ScanDirectories```), if None 
+        the tree is fully traversed with the recursive serial scheme
+
+    nb_workers : int 
+        Number of threads used for the concurrent scan when index_file is given
+
     Returns 
     -------
 
@@ -71,12 +81,128 @@ def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR') -> List[s
         List of all file2find paths
 
     """
+    if index_file is not None : 
+        return [path for path, _ in ScanDirectories(root_dir_check, file2find=file2find, index_file=index_file, nb_workers=nb_workers)]
+
     list_path_outcar = []
     RecursiveCheck(root_dir_check,list_path_outcar,file2find)
 
     return list_path_outcar
 
 
+def _scan_directory(path : str, file2find : str, cached : Dict[str,Any] | None) -> Tuple[str, Dict[str,Any]] :
+    """Scan one directory with ```os.scandir```. If the directory mtime did not change 
+    since the cached entry, only the matched file is stat-ed again
+    
+    Parameters
+    ----------
+
+    path : str
+        Path of the directory to scan 
+
+    file2find : str
+        Name (or fnmatch pattern) of the file to find
+
+    cached : Dict[str,Any] | None
+        Index entry of the previous scan for this directory
+
+    Returns
+    -------
+
+    str 
+        Path of the directory
+
+    Dict[str,Any]
+        Index entry : mtime, subdirs and match (name, size and mtime of the matched file or None)
+
+    """
+    try :
+        mtime = os.stat(path).st_mtime
+    except OSError :
+        return path, None
+
+    if cached is not None and cached['mtime'] == mtime :
+        entry = dict(cached)
+        if entry['match'] is not None :
+            try : 
+                stat = os.stat('%s/%s'%(path,entry['match']['name']))
+                entry['match'] = {'name':entry['match']['name'], 'size':stat.st_size, 'mtime':stat.st_mtime}
+            except OSError :
+                entry['match'] = None
+        return path, entry
+
+    subdirs, match = [], None
+    with os.scandir(path) as it :
+        for dir_entry in it :
+            if dir_entry.is_dir() :
+                subdirs.append(dir_entry.name)
+            elif match is None and fnmatch.fnmatch(dir_entry.name, file2find) :
+                stat = dir_entry.stat()
+                match = {'name':dir_entry.name, 'size':stat.st_size, 'mtime':stat.st_mtime}
+
+    return path, {'mtime':mtime, 'subdirs':sorted(subdirs), 'match':match}
+
+
+def ScanDirectories(root_dir_check : str, 
+                    file2find : str = 'OUTCAR', 
+                    index_file : str = None, 
+                    nb_workers : int = None) -> List[Tuple[str,Dict[str,Any]]] :
+    """Concurrent version of ```RecursiveBuilder``` : subtrees are explored level by level 
+    with ```os.scandir``` in a thread pool. When index_file is given, a small json index 
+    (mtime, subdirectories and matched file for each directory) is read and rewritten, so that 
+    later scans only list the directories whose mtime changed. As for ```RecursiveCheck```, 
+    only leaf directories containing file2find are returned
+    
+    Parameters
+    ----------
+
+    root_dir_check : str
+        Root of all paths to check
+
+    file2find : str
+        Name (or fnmatch pattern) of the file to find
+
+    index_file : str
+        Path to the json index, if None no index is used
+
+    nb_workers : int 
+        Number of threads, default is min(32, cpu_count + 4)
+
+    Returns
+    -------
+
+    List[Tuple[str,Dict[str,Any]]]
+        Sorted list of (directory, index entry) where the entry contains name, size and mtime 
+        of the matched file under key "match"
+
+    """
+    root_dir_check = str(root_dir_check)
+    cached_dirs : Dict[str,Dict[str,Any]] = {}
+    if index_file is not None and os.path.exists(index_file) :
+        with open(index_file,'r') as f :
+            index = json.load(f)
+        if index.get('root') == root_dir_check and index.get('file2find') == file2find :
+            cached_dirs = index['directories']
+
+    scanned_dirs : Dict[str,Dict[str,Any]] = {}
+    frontier = [root_dir_check]
+    with ThreadPoolExecutor(max_workers=nb_workers) as executor :
+        while len(frontier) > 0 :
+            results = executor.map(lambda path : _scan_directory(path, file2find, cached_dirs.get(path)), frontier)
+            frontier = []
+            for path, entry in results :
+                if entry is None :
+                    continue
+                scanned_dirs[path] = entry
+                frontier += ['%s/%s'%(path,dir) for dir in entry['subdirs']]
+
+    if index_file is not None :
+        with open(index_file,'w') as f :
+            json.dump({'root':root_dir_check, 'file2find':file2find, 'directories':scanned_dirs}, f)
+
+    return sorted([(path, entry) for path, entry in scanned_dirs.items() if entry['match'] is not None and entry['subdirs'] == []], key=lambda item : item[0])
+
+
 def nearest_mode(list_mode,mode,nb_poss):
     list_score = []
     for mode_implemented_i in list_mode :
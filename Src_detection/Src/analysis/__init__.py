@@ -2,4 +2,5 @@ from .dfct_analysis import DfctAnalysisObject
 from .dfct_multi_model_analysis import DfctMultiAnalysisObject
 from .library_mcd import NormDescriptorHistogram, MCDAnalysisObject
 from .library_mcd_multi import MetricAnalysisObject
-from .reference import ReferenceBuilder
\ No newline at end of file
+from .reference import ReferenceBuilder
+from .ovito_cache import OvitoCache, configuration_hash, precompute_ovito_arrays
@@ -1,24 +1,32 @@
 import numpy as np
 import os
 import matplotlib.pyplot as plt
-import more_itertools
 
 from ase import Atoms, Atom
 from typing import Dict, List, Any, Tuple
-from ..metrics import MCDModel, GMMModel, PCAModel, LogisticRegressor
+from ..metrics import MCDModel, GMMModel, PCAModel, LogisticRegressor, stack_properties, list_models_h5, is_h5_file
 from ..clusters import Cluster, ClusterDislo, DislocationObject, reference_structure, NanoCluster
 from ..mld import DBManager
 from ..tools import timeit, build_extended_neigh_
+from .ovito_cache import OvitoCache, precompute_ovito_arrays
 
 from ovito.io.ase import ase_to_ovito
-from ovito.modifiers import VoronoiAnalysisModifier, DislocationAnalysisModifier, CoordinationAnalysisModifier
+from ovito.modifiers import DislocationAnalysisModifier
 from ovito.pipeline import StaticSource, Pipeline
 
 #######################################################
 ## Dfct analysis object
 #######################################################
 class DfctMultiAnalysisObject : 
-    """TODO write doc"""
+    """TODO write doc
+
+    Extra keyword arguments for ovito precomputation : 
+        - njob (int) : number of workers for Voronoi/CNA analysis (default 1)
+        - ovito_cache (os.PathLike[str]) : h5 file where ovito arrays of ```dbmodel``` configurations are cached by configuration hash (default None, no file), 
+        analysed frames are only kept in a bounded memory cache
+        - skip_voronoi (bool) : skip Voronoi analysis when atomic volumes are not needed (default False),
+        ValueError is raised if ```atomic-volume``` is in extended_properties
+    """
     def __init__(self, dbmodel : DBManager, extended_properties : List[str] = None, **kwargs) -> None : 
         self.dic_class : Dict[str,Dict[str,List[Atoms]]] = {}
         self.mcd_models : Dict[str,MCDModel] = {}
@@ -46,14 +54,24 @@ class DfctMultiAnalysisObject :
         for prop in extended_properties : 
             if prop not in implemented_properies :
                 raise NotImplementedError('{} : this property is not yet implemented'.format(prop))
+        if kwargs.get('skip_voronoi', False) and 'atomic-volume' in extended_properties : 
+            raise ValueError('atomic-volume property needs the Voronoi analysis, skip_voronoi can not be used')
+
+        # voronoi analysis in worker pool with cache
+        self.njob = kwargs.get('njob', 1)
+        self.ovito_cache = OvitoCache(kwargs.get('ovito_cache', None))
+        list_keys = list(dbmodel.model_init_dic.keys())
+        if not kwargs.get('skip_voronoi', False) : 
+            list_voronoi = precompute_ovito_arrays([dbmodel.model_init_dic[key]['atoms'] for key in list_keys],
+                                                   kind='voronoi',
+                                                   cache=self.ovito_cache,
+                                                   njob=self.njob)
+            for key, arrays in zip(list_keys, list_voronoi) : 
+                self._set_voronoi_arrays(dbmodel.model_init_dic[key]['atoms'], arrays)
 
         for key in dbmodel.model_init_dic.keys() : 
             key_dic = key[0:6]
             if key_dic in self.dic_class.keys() : 
-                #voronoi analysis
-                if 'atomic-volume' or 'coordination' in extended_properties : 
-                    dbmodel.model_init_dic[key]['atoms'] = self.compute_Voronoi(dbmodel.model_init_dic[key]['atoms'])
-
                 if 'label-dfct' in extended_properties : 
                     dic_nb_dfct = kwargs['dic_nb_dfct']
                     dbmodel.model_init_dic[key]['atoms'] = self._labeling_outlier_atoms(dbmodel.model_init_dic[key]['atoms'],dic_nb_dfct)
@@ -61,10 +79,6 @@ class DfctMultiAnalysisObject :
                 fill_dictionnary_fast(dbmodel.model_init_dic[key]['atoms'], self.dic_class[key_dic])
 
             else : 
-                # voronoi analysis
-                if 'atomic-volume' or 'coordination' in extended_properties : 
-                    dbmodel.model_init_dic[key]['atoms'] = self.compute_Voronoi(dbmodel.model_init_dic[key]['atoms'])
-                
                 if 'label-dfct' in extended_properties : 
                     dic_nb_dfct = kwargs['dic_nb_dfct']
                     dbmodel.model_init_dic[key]['atoms'] = self._labeling_outlier_atoms(dbmodel.model_init_dic[key]['atoms'],dic_nb_dfct)             
@@ -76,8 +90,19 @@ class DfctMultiAnalysisObject :
                 self.dic_class[key_dic] = dic_species
         return
 
+    @staticmethod
+    def _set_voronoi_arrays(atoms : Atoms, arrays : Dict[str,np.ndarray]) -> Atoms : 
+        atoms.set_array('atomic-volume',
+                        arrays['atomic-volume'],
+                        dtype=float)
+        atoms.set_array('coordination',
+                        arrays['coordination'],
+                        dtype=int)
+        return atoms
+
     def compute_Voronoi(self, atoms : Atoms) -> Atoms : 
-        """Compute atomic volume and coordination based on Ovito Voronoi analysis
+        """Compute atomic volume and coordination based on Ovito Voronoi analysis, 
+        results are read from ```OvitoCache``` when the configuration has already been analysed
         
         Parameters
         ----------
@@ -91,23 +116,8 @@ class DfctMultiAnalysisObject :
         Atoms 
             Updated Atoms object with new arrays : atomic-volume, coordination
         """
-        ovito_config = ase_to_ovito(atoms)
-        pipeline = Pipeline(source = StaticSource(data = ovito_config))
-        
-        voro = VoronoiAnalysisModifier(compute_indices = True,
-                                       use_radii = False,
-                                       edge_threshold = 0.1)
-        pipeline.modifiers.append(voro)
-        data = pipeline.compute()
-
-        atoms.set_array('atomic-volume',
-                        data.particles['Atomic Volume'][:],
-                        dtype=float)
-        atoms.set_array('coordination',
-                        data.particles['Coordination'][:],
-                        dtype=int)
-        
-        return atoms
+        arrays = precompute_ovito_arrays([atoms], kind='voronoi', cache=self.ovito_cache, persist=False)[0]
+        return self._set_voronoi_arrays(atoms, arrays)
 
     def StructureEstimator(self, atoms : Atoms, rcut : float = 5.0, nb_bin = 100) -> reference_structure : 
         """Agnostic reference structure identifier for dislocation analysis. This method is 
@@ -140,13 +150,9 @@ class DfctMultiAnalysisObject :
                            'bcc':3,
                            'ico':4}
 
-        ovito_config = ase_to_ovito(atoms)
-        pipeline = Pipeline(source = StaticSource(data = ovito_config))
-        CNA = CoordinationAnalysisModifier(cutoff = rcut, number_of_bins = nb_bin) 
-        pipeline.modifiers.append(CNA)
-        data = pipeline.compute()
-        rdf = data.tables['coordination-rdf'].xy()
-        particule_type = data.particles['Coordination'][:]
+        arrays = precompute_ovito_arrays([atoms], kind='cna', cache=self.ovito_cache, rcut=rcut, nb_bin=nb_bin, persist=False)[0]
+        rdf = arrays['coordination-rdf']
+        particule_type = arrays['coordination']
 
         # guessing the structure from CNA ...
         types, count_types = np.unique(particule_type, return_counts=True)
@@ -321,10 +327,19 @@ class DfctMultiAnalysisObject :
             Filled MCD_analysis_object from a bulk analysis
 
         """
-        pkl_model_paths = [f'{path_pkl}/{f}' for f in os.listdir(path_pkl)]
+        if os.path.isdir(path_pkl) : 
+            pkl_model_paths = [f'{path_pkl}/{f}' for f in os.listdir(path_pkl)]
+        else : 
+            pkl_model_paths = [path_pkl]
+
         for pkl_model in pkl_model_paths : 
-            model_mcd = MCDModel(pkl_model)
-            self.mcd_models[model_mcd.name] = model_mcd
+            if is_h5_file(pkl_model) : 
+                # only MCD models of the store are read
+                for name_model in list_models_h5(pkl_model, kind='MCD').keys() : 
+                    self.mcd_models[name_model] = MCDModel(pkl_model, name_model)
+            else :
+                model_mcd = MCDModel(pkl_model)
+                self.mcd_models[model_mcd.name] = model_mcd
         return
 
     def setting_gmm_models(self, path_pkl : os.PathLike[str]) -> None : 
@@ -337,10 +352,19 @@ class DfctMultiAnalysisObject :
             Filled MCD_analysis_object from a bulk analysis
 
         """
-        pkl_model_paths = [f'{path_pkl}/{f}' for f in os.listdir(path_pkl)]
+        if os.path.isdir(path_pkl) : 
+            pkl_model_paths = [f'{path_pkl}/{f}' for f in os.listdir(path_pkl)]
+        else : 
+            pkl_model_paths = [path_pkl]
+
         for pkl_model in pkl_model_paths : 
-            model_gmm = GMMModel(pkl_model)
-            self.gmm_models[model_gmm.name] = model_gmm
+            if is_h5_file(pkl_model) : 
+                # only GMM models of the store are read
+                for name_model in list_models_h5(pkl_model, kind='GMM').keys() : 
+                    self.gmm_models[name_model] = GMMModel(pkl_model, name_model)
+            else :
+                model_gmm = GMMModel(pkl_model)
+                self.gmm_models[model_gmm.name] = model_gmm
         return
 
     def _get_all_atoms_species(self, species : str) -> List[Atoms] : 
@@ -505,24 +529,19 @@ class DfctMultiAnalysisObject :
         if 'gmm-distance' in inputs_properties : 
             list_species_atoms = self.gmm_models[name_model]._get_gmm_distance(list_species_atoms, species)
 
-        Xdata = []
-        Ytarget = []
-        for atoms in list_species_atoms : 
-            Ytarget.append(atoms.get_array('label-dfct')[0])
-            miss_shaped_X = [ atoms.get_array(prop)[0].tolist() for prop in inputs_properties ]
-            Xdata.append(list(more_itertools.collapse(miss_shaped_X)))
-
-        Xdata = np.array(Xdata)
-        Ytarget = np.array(Ytarget)
+        Xdata = stack_properties([ np.concatenate([atoms.get_array(prop)[:1] for atoms in list_species_atoms], axis=0) 
+                                   for prop in inputs_properties ])
+        Ytarget = np.concatenate([atoms.get_array('label-dfct')[:1] for atoms in list_species_atoms])
         
         self.logistic_models[name_regressor] = LogisticRegressor()
         self.logistic_models[name_regressor]._fit_logistic_model(Xdata, Ytarget, species, inputs_properties)
 
-        print('Score for {:s} logistic regressor is : {:1.4f}'.format(species,self.logistic_model.models[species]['logistic_regressor'].score(Xdata,Ytarget)))
+        print('Score for {:s} logistic regressor is : {:1.4f}'.format(species,self.logistic_models[name_regressor].models[species]['logistic_regressor'].score(Xdata,Ytarget)))
         return 
 
-    def one_the_fly_logistic_analysis(self, atoms : Atoms) -> Atoms :
-        """Perfrom logistic regression analysis
+    def one_the_fly_logistic_analysis(self, atoms : Atoms, size_chunk : int = 100000) -> Atoms :
+        """Perfrom logistic regression analysis, the whole descriptor block of the configuration 
+        is predicted at once (per species and per chunk of atoms)
         
         Parameters
         ----------
@@ -530,6 +549,9 @@ class DfctMultiAnalysisObject :
         atoms : Atoms 
             Atoms object containing a given configuration
 
+        size_chunk : int 
+            Maximum number of atoms predicted in one call, if None all atoms of a species are predicted at once
+
         Returns:
         --------
 
@@ -554,7 +576,7 @@ class DfctMultiAnalysisObject :
 
                     if prop == 'atomic-volume' : 
                         atoms = self.compute_Voronoi(atoms)
-                        new_prop += prop
+                        new_prop += [prop]
 
                     if prop == 'gmm-distance' : 
                         atoms = self.one_the_fly_gmm_analysis(atoms)
@@ -565,14 +587,11 @@ class DfctMultiAnalysisObject :
                 dic_prop[prop] = atoms.get_array(prop)
 
 
-            list_logistic_score = []
-            for id_at, at in enumerate(atoms) :
-                miss_shaped_data = [ dic_prop[prop][id_at].tolist() for prop in dic_prop.keys() ]
-                array_data = np.array([ list(more_itertools.collapse(miss_shaped_data)) ])
-                list_logistic_score.append( self.logistic_models[m]._predict_logistic(at.symbol,array_data).flatten() )
-
+            array_data = stack_properties([ dic_prop[prop] for prop in dic_prop.keys() ])
             atoms.set_array(f'logistic-score-{m}',
-                            np.array(list_logistic_score),
+                            self.logistic_models[m]._predict_logistic_batch(atoms.get_chemical_symbols(), 
+                                                                            array_data,
+                                                                            size_chunk=size_chunk),
                             dtype=float)
 
         return atoms
@@ -605,7 +624,7 @@ class DfctMultiAnalysisObject :
         else : 
             key_closest = np.argmin([np.linalg.norm( atom.position - cluster.center) for _, cluster in self.dfct[key_nano].items()])
             key_closest = [key for key in self.dfct[key_nano]][key_closest]
-            if self.dfct[key_nano][key_closest].get_elliptic_distance(atom) < 1.5 :
+            if self.dfct[key_nano][key_closest].get_elliptic_distance(atom, threshold=1.5) < 1.5 :
                 self.dfct[key_nano][key_closest].append(atom, array_property=array_property, elliptic = elliptic)
             
             else : 
@@ -642,7 +661,7 @@ class DfctMultiAnalysisObject :
         else : 
             key_closest = np.argmin([np.linalg.norm( atom.position - cluster.center) for _, cluster in self.dfct[key_dfct].items()])
             key_closest = [key for key in self.dfct[key_dfct]][key_closest]
-            if self.dfct[key_dfct][key_closest].get_elliptic_distance(atom) < 1.5 :
+            if self.dfct[key_dfct][key_closest].get_elliptic_distance(atom, threshold=1.5) < 1.5 :
                 self.dfct[key_dfct][key_closest].append(atom, array_property=array_property, elliptic = 'iso')
             
             else : 
@@ -650,6 +669,7 @@ class DfctMultiAnalysisObject :
                 self.dfct[key_dfct][next_index] = NanoCluster(atom, rcut, array_property=array_property) 
 
 
+    @staticmethod
     def _aggregate_cluster(c1 : Cluster, c2 : Cluster) -> Cluster : 
         """Local method to aggregate two ```Cluster``` objects
         
@@ -669,11 +689,7 @@ class DfctMultiAnalysisObject :
             Aggregated ```Cluster``` from c1 and c2
         
         """
-        atom_c2 = c2.atoms_dfct
-        c1.atoms_dfct += atom_c2
-        c1.center = c1.atoms_dfct.get_center_of_mass()
-        c1.update_extension()
-        
+        c1.extend(c2.atoms_dfct, array_property=c2.array_property)
         return c1
 
     def AggregateClusters(self, dic_cluster : Dict[str,Cluster] ) -> Dict[str,Cluster] : 
@@ -880,7 +896,8 @@ class DfctMultiAnalysisObject :
                                          params_dislocation['rcut_cluster'],
                                          params_dislocation['scale_cluster'],
                                          params_dislocation['descriptor'],
-                                         params_dislocation['smoothing_line'])
+                                         params_dislocation['smoothing_line'],
+                                         njob=self.njob)
 
         return
 
@@ -1,6 +1,5 @@
 import numpy as np
 
-import random
 import os
 from ase import Atoms
 
@@ -14,19 +13,12 @@ import matplotlib
 import pickle
 matplotlib.use('Agg')
 
-from typing import List, Dict, TypedDict
+from typing import List, Dict
 import matplotlib.pyplot as plt
 
 plt.rcParams['text.usetex'] = True
 plt.rcParams['text.latex.preamble'] = r'\usepackage{amsmath}'
 
-class Bin(TypedDict) : 
-    min : float
-    max : float
-    list_norm : List[float]
-    list_id : List[int]
-    density : float
-
 ####################################################
 ## SQUARE NORM DESCRIPTORS CLASS
 ####################################################
@@ -34,65 +26,56 @@ class NormDescriptorHistogram :
     """Selection method based on histogram of square descriptor norm. This class allows 
     to build small size dataset for MCD fitting with the same statistical properties than the original one"""
     
-    def __init__(self, list_atoms : List[Atoms], nb_bin : int = None) :
+    def __init__(self, list_atoms : List[Atoms] | np.ndarray, nb_bin : int = None, seed : int = 0) :
         """Build the square descriptor norm histogram for a given dataset.
         
         Parameters
         ----------
-        list_atoms : List[Atoms]
-            Full dataset contains in Atoms object
+        list_atoms : List[Atoms] | np.ndarray
+            Full dataset contains in Atoms object or directly the descriptor array (N,D)
 
         nb_bin : int 
-            Number of bin for the histogram. If nb_bin is set to None, nb_bin = int(0.05*len(list_atoms)) by default
+            Number of bin for the histogram. If nb_bin is set to None, nb_bin = int(0.05*N) by default with N the number of
+            descriptors (atoms), at least 1
+
+        seed : int 
+            Seed of the random generator used for the selection
         
         """ 
-        if nb_bin is None :
-            nb_bin = int(0.05*len(list_atoms))
+        if isinstance(list_atoms, np.ndarray) : 
+            self.descriptors = list_atoms
+        else : 
+            self.descriptors = np.concatenate([ats.get_array('milady-descriptors') for ats in list_atoms], axis=0)
 
-        self.descriptors = np.concatenate([ats.get_array('milady-descriptors') for ats in list_atoms], axis=0)
+        if nb_bin is None :
+            nb_bin = int(0.05*self.descriptors.shape[0])
+        nb_bin = max(1, nb_bin)
         self.nb_bin = nb_bin
-        self.id_list = np.array([i for i in range(self.descriptors.shape[0])])
+        self.rng = np.random.default_rng(seed)
 
         self.array_norm_square = np.sum(self.descriptors**2, axis=1)
-        self.bin : Dict[int, Bin] = {}
-
         self.min_dis, self.max_dis = np.amin(self.array_norm_square), np.amax(self.array_norm_square)
-        increment = (self.max_dis - self.min_dis)/nb_bin
-        #here is the histogram generation procedure
-        
-        for k in range(nb_bin) : 
-            self.bin[k] = {'min':self.min_dis+k*increment,
-                           'max':self.min_dis+(k+1)*increment,
-                           'list_norm':[],
-                           'list_id':[],
-                           'density':None}
+        self.bin_edges = np.linspace(self.min_dis, self.max_dis, num=nb_bin+1)
 
         self.fill_histogram()
 
     def fill_histogram(self) :
-        """Fill the histogram based square norm of descriptors"""
-        for _, bin_data in self.bin.items() : 
-            mask_bin_inf = self.array_norm_square > bin_data['min']
-            mask_bin_supp = self.array_norm_square <= bin_data['max']
-            
-            mask_bin = mask_bin_inf & mask_bin_supp
-            
-            bin_data['list_norm'] += self.array_norm_square[mask_bin].tolist()
-            bin_data['list_id'] += self.id_list[mask_bin].tolist()
-
-        # density correction for random choice
-        sum_density = 0
-        for i, data_bin in self.bin.items() : 
-            random.shuffle(data_bin['list_id'])
-            data_bin['density'] = float(len(data_bin['list_norm']))/float(self.descriptors.shape[0])
-            sum_density += data_bin['density']
-        
-        miss_density = (1.0-sum_density)/(self.nb_bin)
-        for _, data_bin in self.bin.items() : 
-            data_bin['density'] += miss_density
+        """Fill the histogram based square norm of descriptors. Ids are sorted by bin once 
+        (random order inside each bin) so that each bin is a contiguous slice of ```sorted_id```"""
+        # bins are ]min,max] except the first one which also contains the minimum norm
+        self.bin_id = np.clip(np.digitize(self.array_norm_square, self.bin_edges[1:-1], right=True), 0, self.nb_bin-1)
+        self.bin_id = self.bin_id.astype(np.min_scalar_type(self.nb_bin))
+        random_id = self.rng.permutation(len(self.bin_id))
+        self.sorted_id = random_id[np.argsort(self.bin_id[random_id], kind='stable')]
+
+        self.bin_count = np.bincount(self.bin_id, minlength=self.nb_bin)
+        self.bin_start = np.concatenate(([0], np.cumsum(self.bin_count)[:-1]))
+        self.bin_used = np.zeros(self.nb_bin, dtype=int)
+        self.density = self.bin_count/float(self.descriptors.shape[0])
 
     def histogram_sample(self,nb_selected : int) -> np.ndarray :
-        """Histogram selection based on random choice function
+        """Histogram selection : per bin quotas are drawn from the histogram density and filled 
+        with atoms not selected by previous calls
         
         Parameters
         ----------
@@ -106,12 +89,14 @@ class NormDescriptorHistogram :
         np.ndarray
             Selected descriptors to fit data envelop
         """
-        list_id_selected = []
-        selection_bin = np.random.choice([k for k in range(self.nb_bin)], nb_selected, p=[data_bin['density'] for _, data_bin in self.bin.items()])
-        for sl_bin in selection_bin : 
-            if len(self.bin[sl_bin]['list_id']) > 0 :
-                list_id_selected.append(self.bin[sl_bin]['list_id'][-1])
-                self.bin[sl_bin]['list_id'].pop(-1)
+        quota_bin = self.rng.multinomial(nb_selected, self.density)
+        quota_bin = np.minimum(quota_bin, self.bin_count - self.bin_used)
+
+        # positions in sorted_id : bin k gives the slice [start_k + used_k, start_k + used_k + quota_k[
+        offset_bin = self.bin_start + self.bin_used - np.cumsum(quota_bin) + quota_bin
+        positions = np.repeat(offset_bin, quota_bin) + np.arange(np.sum(quota_bin))
+        list_id_selected = self.sorted_id[positions]
+        self.bin_used += quota_bin
 
         print('... Effective number of selected atoms is {:5d}/{:5d} ...'.format(len(list_id_selected),nb_selected))
         return self.descriptors[list_id_selected]
@@ -174,6 +159,29 @@ class MCDAnalysisObject :
         pickle.dump(self.__dict__[model_kind], open(path_pkl,'wb'))
         return 
 
+    def store_model_h5(self, path_h5 : os.PathLike[str],
+                       model_kind : str = '') -> None :
+        """Write only the fitted parameters of model in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_h5 : os.PathLike[str]
+            Path to the h5 store to write 
+
+        model_kind : str 
+            Name of the model to store in the h5 store
+        """
+        implemented_models = ['mcd_model', 'gmm_model', 'pca_model']
+        if model_kind == '' : 
+            for model in implemented_models :
+                if len(self.__dict__[model].models) > 0 :
+                    model_kind = model 
+                    break 
+                    
+        self.__dict__[model_kind]._write_h5(path_h5)
+        return 
+
     def _get_all_atoms_species(self, species : str) -> List[Atoms] : 
         """Create the full list of Atoms for a given species
         
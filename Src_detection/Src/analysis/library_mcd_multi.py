@@ -1,6 +1,5 @@
 import numpy as np
 
-import random
 import os
 from ase import Atoms
 
@@ -20,13 +19,6 @@ import matplotlib.pyplot as plt
 plt.rcParams['text.usetex'] = True
 plt.rcParams['text.latex.preamble'] = r'\usepackage{amsmath}'
 
-class Bin(TypedDict) : 
-    min : float
-    max : float
-    list_norm : List[float]
-    list_id : List[int]
-    density : float
-
 ####################################################
 ## SQUARE NORM DESCRIPTORS CLASS
 ####################################################
@@ -34,78 +26,56 @@ class NormDescriptorHistogram :
     """Selection method based on histogram of square descriptor norm. This class allows 
     to build small size dataset for MCD fitting with the same statistical properties than the original one"""
     
-    def __init__(self, list_atoms : List[Atoms], nb_bin : int = None) :
+    def __init__(self, list_atoms : List[Atoms] | np.ndarray, nb_bin : int = None, seed : int = 0) :
         """Build the square descriptor norm histogram for a given dataset.
         
         Parameters
         ----------
-        list_atoms : List[Atoms]
-            Full dataset contains in Atoms object
+        list_atoms : List[Atoms] | np.ndarray
+            Full dataset contains in Atoms object or directly the descriptor array (N,D)
 
         nb_bin : int 
-            Number of bin for the histogram. If nb_bin is set to None, nb_bin = int(0.05*len(list_atoms)) by default
+            Number of bin for the histogram. If nb_bin is set to None, nb_bin = int(0.05*N) by default with N the number of
+            descriptors (atoms), at least 1
+
+        seed : int 
+            Seed of the random generator used for the selection
         
         """ 
+        if isinstance(list_atoms, np.ndarray) : 
+            self.descriptors = list_atoms
+        else : 
+            self.descriptors = np.concatenate([ats.get_array('milady-descriptors') for ats in list_atoms], axis=0)
+
         if nb_bin is None :
-            nb_bin = int(0.05*len(list_atoms))
-        
-        """
-        for i, ats in enumerate(list_atoms):
-            print(f"Atoms object {i} has arrays: {list(ats.arrays.keys())}")
-        
-        this is the output:  
-  
-          Atoms object 0 has arrays: ['numbers', 'positions']
-          Atoms object 1 has arrays: ['numbers', 'positions']
-          Atoms object 2 has arrays: ['numbers', 'positions']
-          Atoms object 3 has arrays: ['numbers', 'positions']
-          Atoms object 4 has arrays: ['numbers', 'positions']
-        """  
-
-        self.descriptors = np.concatenate([ats.get_array('milady-descriptors') for ats in list_atoms], axis=0)
+            nb_bin = int(0.05*self.descriptors.shape[0])
+        nb_bin = max(1, nb_bin)
         self.nb_bin = nb_bin
-        self.id_list = np.array([i for i in range(self.descriptors.shape[0])])
+        self.rng = np.random.default_rng(seed)
 
         self.array_norm_square = np.sum(self.descriptors**2, axis=1)
-        self.bin : Dict[int, Bin] = {}
-
         self.min_dis, self.max_dis = np.amin(self.array_norm_square), np.amax(self.array_norm_square)
-        increment = (self.max_dis - self.min_dis)/nb_bin
-        #here is the histogram generation procedure
-        
-        for k in range(nb_bin) : 
-            self.bin[k] = {'min':self.min_dis+k*increment,
-                           'max':self.min_dis+(k+1)*increment,
-                           'list_norm':[],
-                           'list_id':[],
-                           'density':None}
+        self.bin_edges = np.linspace(self.min_dis, self.max_dis, num=nb_bin+1)
 
         self.fill_histogram()
 
     def fill_histogram(self) :
-        """Fill the histogram based square norm of descriptors"""
-        for _, bin_data in self.bin.items() : 
-            mask_bin_inf = self.array_norm_square > bin_data['min']
-            mask_bin_supp = self.array_norm_square <= bin_data['max']
-            
-            mask_bin = mask_bin_inf & mask_bin_supp
-            
-            bin_data['list_norm'] += self.array_norm_square[mask_bin].tolist()
-            bin_data['list_id'] += self.id_list[mask_bin].tolist()
-
-        # density correction for random choice
-        sum_density = 0
-        for i, data_bin in self.bin.items() : 
-            random.shuffle(data_bin['list_id'])
-            data_bin['density'] = float(len(data_bin['list_norm']))/float(self.descriptors.shape[0])
-            sum_density += data_bin['density']
-        
-        miss_density = (1.0-sum_density)/(self.nb_bin)
-        for _, data_bin in self.bin.items() : 
-            data_bin['density'] += miss_density
+        """Fill the histogram based square norm of descriptors. Ids are sorted by bin once 
+        (random order inside each bin) so that each bin is a contiguous slice of ```sorted_id```"""
+        # bins are ]min,max] except the first one which also contains the minimum norm
+        self.bin_id = np.clip(np.digitize(self.array_norm_square, self.bin_edges[1:-1], right=True), 0, self.nb_bin-1)
+        self.bin_id = self.bin_id.astype(np.min_scalar_type(self.nb_bin))
+        random_id = self.rng.permutation(len(self.bin_id))
+        self.sorted_id = random_id[np.argsort(self.bin_id[random_id], kind='stable')]
+
+        self.bin_count = np.bincount(self.bin_id, minlength=self.nb_bin)
+        self.bin_start = np.concatenate(([0], np.cumsum(self.bin_count)[:-1]))
+        self.bin_used = np.zeros(self.nb_bin, dtype=int)
+        self.density = self.bin_count/float(self.descriptors.shape[0])
 
     def histogram_sample(self,nb_selected : int) -> np.ndarray :
-        """Histogram selection based on random choice function
+        """Histogram selection : per bin quotas are drawn from the histogram density and filled 
+        with atoms not selected by previous calls
         
         Parameters
         ----------
@@ -119,12 +89,14 @@ class NormDescriptorHistogram :
         np.ndarray
             Selected descriptors to fit data envelop
         """
-        list_id_selected = []
-        selection_bin = np.random.choice([k for k in range(self.nb_bin)], nb_selected, p=[data_bin['density'] for _, data_bin in self.bin.items()])
-        for sl_bin in selection_bin : 
-            if len(self.bin[sl_bin]['list_id']) > 0 :
-                list_id_selected.append(self.bin[sl_bin]['list_id'][-1])
-                self.bin[sl_bin]['list_id'].pop(-1)
+        quota_bin = self.rng.multinomial(nb_selected, self.density)
+        quota_bin = np.minimum(quota_bin, self.bin_count - self.bin_used)
+
+        # positions in sorted_id : bin k gives the slice [start_k + used_k, start_k + used_k + quota_k[
+        offset_bin = self.bin_start + self.bin_used - np.cumsum(quota_bin) + quota_bin
+        positions = np.repeat(offset_bin, quota_bin) + np.arange(np.sum(quota_bin))
+        list_id_selected = self.sorted_id[positions]
+        self.bin_used += quota_bin
 
         print('... Effective number of selected atoms is {:5d}/{:5d} ...'.format(len(list_id_selected),nb_selected))
         return self.descriptors[list_id_selected]
@@ -132,37 +104,53 @@ class NormDescriptorHistogram :
 #######################################################
 ## MCD ANALYSIS OBJECT
 #######################################################
+class DescriptorArena(TypedDict) : 
+    descriptors : np.ndarray
+    offsets : np.ndarray
+    configurations : List[str]
+    atom_index : np.ndarray
+
+class FitData(TypedDict) : 
+    kind : str
+    species : str
+    distances : np.ndarray
+
 class MetricAnalysisObject : 
 
     def __init__(self, dbmodel : DBManager = None) -> None : 
-        self.dic_class : Dict[str,Dict[str,List[Atoms]]] = {}
+        """Build the per species descriptor arena : one contiguous descriptor matrix per species 
+        with an offsets table back to configurations of ```dbmodel```
+        
+        Parameters
+        ----------
+
+        dbmodel : DBManager
+            Database containing configurations with milady-descriptors array
+        """
+        self.arena : Dict[str,DescriptorArena] = {}
+        self.fit_data : Dict[str,FitData] = {}
         self.meta_model = MetaModel()
         self.pca_model = PCAModel()
 
-        def fill_dictionnary_fast(ats : Atoms, dic : Dict[str,List[Atoms]]) -> None : 
-            symbols = ats.get_chemical_symbols()
-            for sym in dic.keys() : 
-                mask_sym = list(map( lambda b : b == sym, symbols))
-                ats_sym = ats[mask_sym]
-
-                dic[sym] += [ats_sym]
-            return 
-
         if dbmodel is not None :
-            for key in dbmodel.model_init_dic.keys() : 
-                key_dic = key[0:6]
-                if key_dic in self.dic_class.keys() : 
-                    fill_dictionnary_fast(dbmodel.model_init_dic[key]['atoms'],
-                                          self.dic_class[key_dic])
-    
-                else : 
-                    species = dbmodel.model_init_dic[key]['atoms'].symbols.species()
-                    dic_species : Dict[str,List[Atoms]] = {sp:[] for sp in species}
-                    fill_dictionnary_fast(dbmodel.model_init_dic[key]['atoms'],
-                                          dic_species)
-    
-                    self.dic_class[key_dic] = dic_species
-
+            dic_desc : Dict[str,List[np.ndarray]] = {}
+            dic_index : Dict[str,List[np.ndarray]] = {}
+            dic_config : Dict[str,List[str]] = {}
+            for key, data in dbmodel.model_init_dic.items() : 
+                symbols = np.array(data['atoms'].get_chemical_symbols())
+                descriptors = data['atoms'].get_array('milady-descriptors')
+                for sym in np.unique(symbols).tolist() : 
+                    index_sym = np.flatnonzero(symbols == sym)
+                    dic_desc.setdefault(sym, []).append(descriptors[index_sym])
+                    dic_index.setdefault(sym, []).append(index_sym)
+                    dic_config.setdefault(sym, []).append(key)
+
+            for sym in dic_desc.keys() : 
+                self.arena[sym] = {'descriptors':np.concatenate(dic_desc[sym], axis=0),
+                                   'offsets':np.cumsum([0] + [len(index) for index in dic_index[sym]]),
+                                   'configurations':dic_config[sym],
+                                   'atom_index':np.concatenate(dic_index[sym])}
+                dic_desc[sym] = []
 
     def store_model_pickle(self, path_pkl : os.PathLike[str]) -> None :
         """Build agnostically the pickle file for model
@@ -177,8 +165,56 @@ class MetricAnalysisObject :
         pickle.dump(self.meta_model, open(path_pkl,'wb'))
         return 
 
-    def _get_all_atoms_species(self, species : str) -> List[Atoms] : 
-        """Create the full list of Atoms for a given species
+    def store_model_h5(self, path_h5 : os.PathLike[str]) -> None :
+        """Write only the fitted parameters of models in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_h5 : os.PathLike[str]
+            Path to the h5 store to write 
+        """
+        self.meta_model._write_h5(path_h5)
+        return 
+
+    def store_model(self, path_model : os.PathLike[str]) -> None :
+        """Write models in h5 store if path has an h5 extension, pickle file otherwise
+        
+        Parameters
+        ----------
+
+        path_model : os.PathLike[str]
+            Path to the model file to write 
+        """
+        if os.path.splitext(path_model)[1] in ['.h5', '.hdf5'] : 
+            self.store_model_h5(path_model)
+        else : 
+            self.store_model_pickle(path_model)
+        return 
+
+    def _update_fit_data(self, name_model : str, kind : str, species : str, distances : np.ndarray) -> None : 
+        """Store distances of a fitted model to compute diagnostics on demand
+        
+        Parameters
+        ----------
+
+        name_model : str
+            Name of the fitted model
+
+        kind : str
+            Kind of model (MCD, GMM, MAHA)
+
+        species : str
+            Species of the model
+
+        distances : np.ndarray
+            Distances of all atoms of species
+        """
+        self.fit_data[name_model] = {'kind':kind, 'species':species, 'distances':distances}
+        return 
+
+    def _get_all_descriptors_species(self, species : str) -> np.ndarray : 
+        """Get the contiguous descriptor matrix for a given species
         
         Parameters
         ----------
@@ -189,13 +225,31 @@ class MetricAnalysisObject :
         Returns:
         --------
 
-        List[Atoms]
-            List of selected Atoms objects based on species
+        np.ndarray
+            Descriptor matrix (N_species,D)
         """
-        list_atoms_species = []
-        for sub_class in self.dic_class.keys() : 
-            list_atoms_species += self.dic_class[sub_class][species]
-        return list_atoms_species
+        return self.arena[species]['descriptors']
+
+    def _split_by_configuration(self, species : str, array : np.ndarray) -> Dict[str,np.ndarray] : 
+        """Split a per atom array of the species arena back to configurations using the offsets table
+        
+        Parameters
+        ----------
+
+        species : str
+            Species of the arena
+
+        array : np.ndarray
+            Per atom array (N_species,...) ordered as the arena
+
+        Returns:
+        --------
+
+        Dict[str,np.ndarray]
+            Dictionnary configuration -> array for atoms of species (ordered as ```atom_index```)
+        """
+        offsets = self.arena[species]['offsets']
+        return {key:array[offsets[id_conf]:offsets[id_conf+1]] for id_conf, key in enumerate(self.arena[species]['configurations'])}
 
     def _get_all_atoms_species_list(self, list_ats : List[Atoms], species : str) -> List[Atoms] : 
         """Fast method to extract ```Atoms``` object with specific species from a given ```List[Atoms]``` """
@@ -211,7 +265,8 @@ class MetricAnalysisObject :
                         list_atoms : List[Atoms] = None,
                         contamination : float = 0.05, 
                         nb_bin = 100, 
-                        nb_selected=10000) -> None : 
+                        nb_selected=10000,
+                        diagnostics : bool = False) -> None : 
         """Perform MCD analysis for a given species
         species : str is the chemical symbol of the species to analyze e.g. 'U', 'O', 'Cu
         name_model : str is the name of the model to store
@@ -219,18 +274,15 @@ class MetricAnalysisObject :
         contamination : float is the contamination rate for the MCD analysis
         nb_bin : int is the number of bin for the histogram
         nb_selected : int is the number of selected atoms for the MCD analysis
+        diagnostics : bool if False only the model and the distance distribution are built (headless), 
+        diagnostics can be computed later with ```plot_mcd_diagnostics```
         """
-        #TODO_cos the version list do not work ... WTF! 
-        #if list_atoms is None : 
-        list_atom_species = self._get_all_atoms_species(species)
-        #else : 
-        #    list_atom_species = self._get_all_atoms_species_list(list_atoms, species)
+        desc_species = self._get_all_descriptors_species(species)
 
         print()
         print('... Starting histogram procedure ...')
-        print('list_atom_species ', list_atom_species)
         print('nb_bin', nb_bin)
-        histogram_norm_species = NormDescriptorHistogram(list_atom_species,nb_bin=nb_bin)
+        histogram_norm_species = NormDescriptorHistogram(desc_species,nb_bin=nb_bin)
         print('... Histogram selection begins ... ')
         array_desc_selected = histogram_norm_species.histogram_sample(nb_selected=nb_selected)
         print(array_desc_selected.shape)
@@ -245,26 +297,33 @@ class MetricAnalysisObject :
                                    contamination=contamination)
         #self._fit_mcd_model(list_atom_species, species, contamination=contamination)
         print('... MCD envelop is fitted ...')
-        updated_atoms = self.meta_model._get_statistical_distances(list_atom_species, 
-                                                                   name_model, 
-                                                                   'MCD', 
-                                                                   species)
+        list_mcd = self.meta_model._get_statistical_distances_array(desc_species, 
+                                                                    name_model, 
+                                                                    'MCD', 
+                                                                    species)
+        # kde estimation
+        self.meta_model._fit_distribution(np.array(list_mcd), 
+                                          name_model, 
+                                          'MCD', 
+                                          species)
+        self._update_fit_data(name_model, 'MCD', species, list_mcd)
+
+        if diagnostics : 
+            self.plot_mcd_diagnostics(name_model)
+
+    def plot_mcd_diagnostics(self, name_model : str) -> None : 
+        """Compute MCD diagnostics from stored distances : chi2 fit, PCA projection and figure
+        
+        Parameters
+        ----------
+
+        name_model : str
+            Name of the fitted MCD model
+        """
+        species, list_mcd = self.fit_data[name_model]['species'], self.fit_data[name_model]['distances']
+
         #mcd distribution 
         fig, axis = plt.subplots(nrows=1, ncols=2, figsize=(14,6))
-        
-        #list_mcd = np.concatenate([at.get_array(f'mcd-distance-{name_model}') for at in updated_atoms], axis=0)
-        list_mcd_arrays = []
-        for at in updated_atoms:
-            if f'mcd-distance-{name_model}' in at.arrays:
-                list_mcd_arrays.append(at.get_array(f'mcd-distance-{name_model}'))
-            else:
-                print(f"Warning: Atom object missing array: {f'mcd-distance-{name_model}'}")
-        if list_mcd_arrays:
-            list_mcd = np.concatenate(list_mcd_arrays, axis=0)
-        else:
-            raise ValueError("No valid mcd distance arrays found!")
-        
-        
         n, _, patches = axis[0].hist(list_mcd,density=True,bins=50,alpha=0.7)
         
         for i in range(len(patches)):
@@ -276,12 +335,6 @@ class MetricAnalysisObject :
         fake_mcd = np.linspace(np.amin(list_mcd), np.amax(list_mcd), 1000) #
         axis[0].plot(fake_mcd, dist(*param).pdf(fake_mcd), linewidth=1.5, linestyle='dashed',color='grey')
         
-        # kde estimation
-        self.meta_model._fit_distribution(np.array(list_mcd), 
-                                          name_model, 
-                                          'MCD', 
-                                          species)
-
         axis[0].set_xlabel(r'MCD distance $d_{\textrm{MCD}}$ for %s atoms'%(species))
         axis[0].set_ylabel(r'Probability density')
 
@@ -289,7 +342,7 @@ class MetricAnalysisObject :
         cm = plt.cm.get_cmap('gnuplot')
         print('')
         print('... Starting PCA analysis for {:s} atoms ...'.format(species))
-        desc_transform = self.pca_model._get_pca_model(list_atom_species, species, n_component=2)
+        desc_transform = self.pca_model._get_pca_model(self._get_all_descriptors_species(species), species, n_component=2)
         scat = axis[1].scatter(desc_transform[:,0],desc_transform[:,1],
                                c=list_mcd,
                                cmap=cm,
@@ -304,6 +357,7 @@ class MetricAnalysisObject :
         plt.tight_layout()
 
         plt.savefig('{:s}_{:s}_distribution_mcd.png'.format(species,name_model),dpi=300)
+        plt.close(fig)
 
     def fit_gmm_envelop(self, species : str,
                         name_model : str, 
@@ -312,20 +366,19 @@ class MetricAnalysisObject :
                         nb_selected :int = 10000, 
                         dict_gaussian : dict = {'n_components':2, 'max_iter':100,
                                                             'covariance_type':'full',
-                                                            'init_params':'kmeans'}) -> None : 
+                                                            'init_params':'kmeans'},
+                        diagnostics : bool = False) -> None : 
         """Perform MCD analysis for a given species
         
         TODO Same write doc 
+        diagnostics : bool if False only the model and the distance distribution are built (headless), 
+        diagnostics can be computed later with ```plot_gmm_diagnostics```
         """
-        #TODO_cos the version list do not work ... WTF!
-        #if list_atoms is None : 
-        list_atom_species = self._get_all_atoms_species(species)
-        #else : 
-        #    list_atom_species = self._get_all_atoms_species_list(list_atoms, species)
+        desc_species = self._get_all_descriptors_species(species)
                  
         print()
         print('... Starting histogram procedure ...')
-        histogram_norm_species = NormDescriptorHistogram(list_atom_species,nb_bin=nb_bin_histo)
+        histogram_norm_species = NormDescriptorHistogram(desc_species,nb_bin=nb_bin_histo)
         array_desc_selected = histogram_norm_species.histogram_sample(nb_selected=nb_selected)
         print('... Histogram selection is done ...')
         print()
@@ -338,21 +391,33 @@ class MetricAnalysisObject :
                                    dict_gaussian=dict_gaussian)
 
         print('... GMM envelop is fitted ...')
-        updated_atoms = self.meta_model._get_statistical_distances(list_atom_species,
-                                                                   name_model,
-                                                                   'GMM',
-                                                                   species)
-
-        fig, axis = plt.subplots(nrows=1, ncols=dict_gaussian['n_components'], figsize=(14,6))
-        
-        #mcd distribution 
-        list_gmm = np.concatenate([at.get_array(f'gmm-distance-{name_model}') for at in updated_atoms], axis=0)
+        list_gmm = self.meta_model._get_statistical_distances_array(desc_species,
+                                                                    name_model,
+                                                                    'GMM',
+                                                                    species)
         self.meta_model._fit_distribution(list_gmm,
                                           name_model,
                                           'GMM',
                                           species)
+        self._update_fit_data(name_model, 'GMM', species, list_gmm)
+
+        if diagnostics : 
+            self.plot_gmm_diagnostics(name_model)
+
+    def plot_gmm_diagnostics(self, name_model : str) -> None : 
+        """Compute GMM diagnostics from stored distances : chi2 fit for each gaussian and figure
+        
+        Parameters
+        ----------
+
+        name_model : str
+            Name of the fitted GMM model
+        """
+        species, list_gmm = self.fit_data[name_model]['species'], self.fit_data[name_model]['distances']
+        n_components = list_gmm.shape[1]
+        fig, axis = plt.subplots(nrows=1, ncols=n_components, figsize=(14,6))
 
-        for k in range(dict_gaussian['n_components']) : 
+        for k in range(n_components) : 
             mask = k == np.argmin(list_gmm, axis=1)
             dist = getattr(scipy.stats, 'chi2')
             param = dist.fit(list_gmm[:,k][mask])
@@ -371,22 +436,22 @@ class MetricAnalysisObject :
         plt.tight_layout()
 
         plt.savefig('{:s}_{:s}_gmm_analysis.pdf'.format(species,name_model),dpi=300)
-
+        plt.close(fig)
 
     def fit_mahalanobis_envelop(self, species : str, 
                                 name_model : str,
-                                list_atoms : List[Atoms] = None) -> None : 
+                                list_atoms : List[Atoms] = None,
+                                diagnostics : bool = False) -> None : 
         """Perform MCD analysis for a given species
         
         TODO write doc
+        diagnostics : bool if False only the model and the distance distribution are built (headless), 
+        diagnostics can be computed later with ```plot_mahalanobis_diagnostics```
         """
-        #TODO_cos the version list do not work ... 
-        #if list_atoms is None : 
-        list_atom_species = self._get_all_atoms_species(species)
-        #else : 
-        #    list_atom_species = self._get_all_atoms_species_list(list_atoms, species)
+        desc_species = self._get_all_descriptors_species(species)
 
-        array_desc_selected = np.concatenate([ ats.get_array('milady-descriptors') for ats in list_atom_species ])
+        # copy : mahalanobis fit centers the array inplace
+        array_desc_selected = desc_species.copy()
         print('... Starting Mahalanobis fit for {:} atoms ...'.format(species))
         self.meta_model._fit_model(array_desc_selected, 
                                    name_model,
@@ -394,14 +459,34 @@ class MetricAnalysisObject :
                                    species)
 
         print('... Mahalanobis envelop is fitted ...')
-        updated_atoms = self.meta_model._get_statistical_distances(list_atom_species, 
-                                                                   name_model, 
-                                                                   'MAHA', 
-                                                                   species)
+        list_mcd = self.meta_model._get_statistical_distances_array(desc_species, 
+                                                                    name_model, 
+                                                                    'MAHA', 
+                                                                    species)
+        # kde estimation
+        self.meta_model._fit_distribution(np.array(list_mcd), 
+                                          name_model, 
+                                          'MAHA', 
+                                          species)
+        self._update_fit_data(name_model, 'MAHA', species, list_mcd)
+
+        if diagnostics : 
+            self.plot_mahalanobis_diagnostics(name_model)
+
+    def plot_mahalanobis_diagnostics(self, name_model : str) -> None : 
+        """Compute Mahalanobis diagnostics from stored distances : chi2 fit, PCA projection and figure
+        
+        Parameters
+        ----------
+
+        name_model : str
+            Name of the fitted Mahalanobis model
+        """
+        species, list_mcd = self.fit_data[name_model]['species'], self.fit_data[name_model]['distances']
+
         #mcd distribution 
         print('... Starting Mahalanobis analysis for {:s} atoms ...'.format(species))
         fig, axis = plt.subplots(nrows=1, ncols=2, figsize=(14,6))
-        list_mcd = np.concatenate([at.get_array(f'mahalanobis-distance-{name_model}') for at in updated_atoms], axis=0)
         n, _, patches = axis[0].hist(list_mcd,density=True,bins=50,alpha=0.7)
         for i in range(len(patches)):
             patches[i].set_facecolor(plt.cm.viridis(n[i]/max(n)))        
@@ -411,12 +496,6 @@ class MetricAnalysisObject :
         param = dist.fit(list_mcd)
         fake_mcd = np.linspace(np.amin(list_mcd), np.amax(list_mcd), 1000) #
         axis[0].plot(fake_mcd, dist(*param).pdf(fake_mcd), linewidth=1.5, linestyle='dashed',color='grey')
-        
-        # kde estimation
-        self.meta_model._fit_distribution(np.array(list_mcd), 
-                                          name_model, 
-                                          'MAHA', 
-                                          species)
 
         axis[0].set_xlabel(r'Mahalanobis distance $d_{\textrm{Maha}}$ for %s atoms'%(species))
         axis[0].set_ylabel(r'Probability density')
@@ -425,7 +504,7 @@ class MetricAnalysisObject :
         cm = plt.cm.get_cmap('gnuplot')
         print('')
         print('... Starting PCA analysis for {:s} atoms ...'.format(species))
-        desc_transform = self.pca_model._get_pca_model(list_atom_species, species, n_component=2)
+        desc_transform = self.pca_model._get_pca_model(self._get_all_descriptors_species(species), species, n_component=2)
         scat = axis[1].scatter(desc_transform[:,0],desc_transform[:,1],
                                c=list_mcd,
                                cmap=cm,
@@ -440,6 +519,7 @@ class MetricAnalysisObject :
         plt.tight_layout()
 
         plt.savefig('{:s}_{:s}_mahalanobis_analysis.png'.format(species,name_model),dpi=300)
+        plt.close(fig)
 
 #######################################################
     
@@ -0,0 +1,223 @@
+import numpy as np
+import os
+import hashlib
+import h5py
+
+from ase import Atoms
+from collections import OrderedDict
+from typing import Dict, List
+
+from ovito.io.ase import ase_to_ovito
+from ovito.modifiers import VoronoiAnalysisModifier, CoordinationAnalysisModifier
+from ovito.pipeline import StaticSource, Pipeline
+
+from joblib import Parallel, delayed
+
+def configuration_hash(atoms : Atoms) -> str :
+    """Hash of a configuration (species, positions, cell and periodic boundary conditions)
+    used as key for the ovito cache
+
+    Parameters
+    ----------
+
+    atoms : Atoms
+        Atoms object corresponding to a given configuration
+
+    Returns:
+    --------
+
+    str
+        Hexadecimal sha1 digest of the configuration
+    """
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(atoms.numbers, dtype=np.int64).tobytes())
+    sha.update(np.ascontiguousarray(atoms.positions, dtype=np.float64).tobytes())
+    sha.update(np.ascontiguousarray(atoms.cell[:], dtype=np.float64).tobytes())
+    sha.update(np.ascontiguousarray(atoms.pbc, dtype=bool).tobytes())
+    return sha.hexdigest()
+
+def compute_voronoi_arrays(atoms : Atoms) -> Dict[str,np.ndarray] :
+    """Compute atomic volume and coordination based on Ovito Voronoi analysis
+
+    Parameters
+    ----------
+
+    atoms : Atoms
+        Atoms object corresponding to a given configuration
+
+    Returns:
+    --------
+
+    Dict[str,np.ndarray]
+        Per atom arrays : atomic-volume, coordination
+    """
+    pipeline = Pipeline(source = StaticSource(data = ase_to_ovito(atoms)))
+    voro = VoronoiAnalysisModifier(compute_indices = True,
+                                   use_radii = False,
+                                   edge_threshold = 0.1)
+    pipeline.modifiers.append(voro)
+    data = pipeline.compute()
+    return {'atomic-volume':np.array(data.particles['Atomic Volume'][:], dtype=float),
+            'coordination':np.array(data.particles['Coordination'][:], dtype=int)}
+
+def compute_cna_arrays(atoms : Atoms, rcut : float = 5.0, nb_bin : int = 100) -> Dict[str,np.ndarray] :
+    """Compute coordination and radial distribution function based on Ovito coordination analysis
+    (inputs of ```StructureEstimator```)
+
+    Parameters
+    ----------
+
+    atoms : Atoms
+        Atoms object corresponding to a given configuration
+
+    rcut : float
+        Cutoff radius for CNA analysis
+
+    nb_bin : int
+        Number of bins used to build the RDF histogram
+
+    Returns:
+    --------
+
+    Dict[str,np.ndarray]
+        Arrays : coordination (per atom) and coordination-rdf (nb_bin,2)
+    """
+    pipeline = Pipeline(source = StaticSource(data = ase_to_ovito(atoms)))
+    CNA = CoordinationAnalysisModifier(cutoff = rcut, number_of_bins = nb_bin)
+    pipeline.modifiers.append(CNA)
+    data = pipeline.compute()
+    return {'coordination':np.array(data.particles['Coordination'][:], dtype=int),
+            'coordination-rdf':np.array(data.tables['coordination-rdf'].xy(), dtype=float)}
+
+class OvitoCache :
+    """Cache of ovito arrays keyed by configuration hash. Arrays are kept in a bounded memory cache 
+    (least recently used entries are dropped) and, if a path is given, stored in a h5 file 
+    (one group per configuration hash and per kind of analysis) so that repeated analyses skip ovito computations
+
+    Parameters
+    ----------
+
+    path_cache : os.PathLike[str]
+        Path of the h5 cache file, if None the cache is only kept in memory
+
+    max_memory : int
+        Maximum number of entries kept in memory
+    """
+    def __init__(self, path_cache : os.PathLike[str] = None, max_memory : int = 64) -> None :
+        self.path_cache = path_cache
+        self.max_memory = max_memory
+        self.memory : OrderedDict[str,Dict[str,np.ndarray]] = OrderedDict()
+
+    def _remember(self, key : str, arrays : Dict[str,np.ndarray]) -> None :
+        """Add an entry in the memory cache and drop least recently used entries"""
+        self.memory[key] = arrays
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory :
+            self.memory.popitem(last=False)
+        return
+
+    @staticmethod
+    def _key(hash_config : str, kind : str) -> str :
+        return f'{hash_config}/{kind}'
+
+    def get(self, hash_config : str, kind : str) -> Dict[str,np.ndarray] | None :
+        """Get cached arrays for a given configuration and kind of analysis, None if not cached"""
+        key = self._key(hash_config, kind)
+        if key in self.memory :
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        if self.path_cache is None or not os.path.exists(self.path_cache) :
+            return None
+
+        with h5py.File(self.path_cache, 'r') as h5 :
+            if key not in h5 :
+                return None
+            arrays = {name:h5[key][name][()] for name in h5[key].keys()}
+        self._remember(key, arrays)
+        return arrays
+
+    def put(self, hash_config : str, kind : str, arrays : Dict[str,np.ndarray], persist : bool = True) -> None :
+        """Store arrays for a given configuration and kind of analysis"""
+        self.put_many({self._key(hash_config, kind):arrays}, persist=persist)
+        return
+
+    def put_many(self, dic_arrays : Dict[str,Dict[str,np.ndarray]], persist : bool = True) -> None :
+        """Store several entries at once (one opening of the h5 file), keys are built with ```_key```.
+        If persist is False entries are only kept in the memory cache"""
+        for key, arrays in dic_arrays.items() :
+            self._remember(key, arrays)
+        if not persist or self.path_cache is None or len(dic_arrays) == 0 :
+            return
+
+        with h5py.File(self.path_cache, 'a') as h5 :
+            for key, arrays in dic_arrays.items() :
+                if key in h5 :
+                    del h5[key]
+                group = h5.create_group(key)
+                for name, array in arrays.items() :
+                    group.create_dataset(name, data=array)
+        return
+
+def precompute_ovito_arrays(list_atoms : List[Atoms],
+                            kind : str = 'voronoi',
+                            cache : OvitoCache = None,
+                            njob : int = 1,
+                            rcut : float = 5.0,
+                            nb_bin : int = 100,
+                            persist : bool = True) -> List[Dict[str,np.ndarray]] :
+    """Run ovito analysis for a list of configurations in a worker pool. Configurations already
+    in cache are not recomputed and new results are written in cache by the main process
+
+    Parameters
+    ----------
+
+    list_atoms : List[Atoms]
+        List of configurations to analyse
+
+    kind : str
+        Kind of analysis : voronoi or cna
+
+    cache : OvitoCache
+        Cache for ovito arrays, if None a memory cache is used
+
+    njob : int
+        Number of workers
+
+    rcut : float
+        Cutoff radius for CNA analysis
+
+    nb_bin : int
+        Number of bins used to build the RDF histogram for CNA analysis
+
+    persist : bool
+        Write new results in the h5 file of the cache, if False they are only kept in the 
+        (bounded) memory cache, e.g. for analysed frames which are not reused
+
+    Returns:
+    --------
+
+    List[Dict[str,np.ndarray]]
+        Ovito arrays for each configuration
+    """
+    if kind == 'voronoi' :
+        name_kind, worker, worker_kwargs = kind, compute_voronoi_arrays, {}
+    elif kind == 'cna' :
+        name_kind, worker, worker_kwargs = f'cna-{rcut:.4f}-{nb_bin}', compute_cna_arrays, {'rcut':rcut, 'nb_bin':nb_bin}
+    else :
+        raise NotImplementedError(f'... Ovito analysis {kind} is not implemented ...')
+
+    cache = OvitoCache() if cache is None else cache
+    list_hash = [configuration_hash(atoms) for atoms in list_atoms]
+    list_arrays = [cache.get(hash_config, name_kind) for hash_config in list_hash]
+    # identical configurations are only computed once
+    dic_missing = {list_hash[id_config]:id_config for id_config in reversed(range(len(list_atoms))) if list_arrays[id_config] is None}
+
+    if len(dic_missing) > 0 :
+        print(f'... {kind} analysis for {len(dic_missing)} new configurations (njob = {njob}) ...')
+        list_computed = Parallel(n_jobs=njob)(delayed(worker)(list_atoms[id_config], **worker_kwargs) for id_config in dic_missing.values())
+        dic_computed = dict(zip(dic_missing.keys(), list_computed))
+        cache.put_many({cache._key(hash_config, name_kind):arrays for hash_config, arrays in dic_computed.items()}, persist=persist)
+        list_arrays = [arrays if arrays is not None else dic_computed[hash_config] for hash_config, arrays in zip(list_hash, list_arrays)]
+
+    return list_arrays
@@ -1,12 +1,13 @@
 import numpy as np
 import pickle
 import os
+import time
 from ase.io import read
 from ase import Atoms
 
 from ..metrics import MetaModel
 from ..mld import DBManager
-from .library_mcd_multi import MetricAnalysisObject
+from .library_mcd_multi import MetricAnalysisObject, DescriptorArena
 
 from ..tools import timeit
 from ..parser import BaseParser
@@ -14,6 +15,8 @@ from ..parser import BaseParser
 import matplotlib
 matplotlib.use('Agg')
 
+from joblib import Parallel, delayed
+
 from typing import Dict, Any, List, Union  
 
 
@@ -94,8 +97,182 @@ from typing import Dict, Any, List, Union
     
     
     
+def read_reference_configurations(config : dict, directory : str) -> List[Atoms] : 
+    """Read configuration files of a reference directory
+    
+    Parameters
+    ----------
+
+    config : dict
+        Reference configuration (md_format, id_atoms, selection_mask)
+
+    directory : str
+        Directory containing the configuration files
+
+    Returns
+    -------
+
+    List[Atoms]
+        List of read configurations
+    """
+    md_format = config.get('md_format', 'cfg')
+    list_config_file = [
+        os.path.join(directory, f) 
+        for f in os.listdir(directory) 
+        if f.endswith(md_format)
+    ]
+
+    #TODO_cos unify with other places 
+    # Define the allowed file extensions and a mapping to ASE read formats. 
+    #allowed_formats = {'cfg', 'poscar', 'data', 'xyz', 'dump', 'mixed', 'unseen'}
+    format_mapping = {
+        'cfg':    'cfg',  # same as before
+        'dump':   'lammps-dump-text',
+        'poscar': 'vasp',
+        'data':   'lammps-data',
+        'xyz':    'xyz',
+        ## For 'mixed' and 'unseen', you can choose the appropriate formats or default to something.
+        #'mixed':  'lammps-dump-text',  
+        #'unseen': 'lammps-dump-text'
+    }  
+
+    list_atoms = []
+    for file in list_config_file:
+        # this read_function should be improved ....  
+        if os.path.basename(file).split('.')[-1] != md_format : 
+            raise ValueError(f"Malheur: extension of {file } not match the input c{md_format} ")
+
+        try:
+            # Get the appropriate format string for ASE.read, defaulting to 'lammps-dump-text' if not mapped.
+            read_format = format_mapping.get(md_format, 'lammps-dump-text')    
+            atoms = read(file, format=read_format)
+
+            #TODO_cos we should unify selection_mask and id_atoms
+            nat = len(atoms)
+            if 'id_atoms' in config:
+               if config['id_atoms'] == 'all' : 
+                   list_selected = list(range(nat))
+               else :    
+                   list_selected = config['id_atoms']
+                                                             
+               atoms = atoms[list_selected]      
+
+            if 'selection_mask' in config:  # If using selection mask from config
+               atoms = atoms[config['selection_mask']]
+            
+            list_atoms.append(atoms)
+        except Exception as e:
+            print(f"Error reading {file}: {str(e)}")
+            continue
+
+    return list_atoms
+
+def build_reference_models(config : dict, 
+                           directory : str,
+                           species : str,
+                           name_label : str,
+                           model_kinds : List[str],
+                           name_model : str,
+                           arena : Dict[str,DescriptorArena]) -> Dict[str,Any] : 
+    """Build all models of one reference. This function is executed as an independent task : 
+    any failure is caught and reported in the returned summary
+    
+    Parameters
+    ----------
+
+    config : dict
+        Reference configuration
+
+    directory : str
+        Directory containing the configuration files
+
+    species : str
+        Species to fit
+
+    name_label : str
+        Name of the reference
+
+    model_kinds : List[str]
+        Kinds of model to build (MCD, GMM, MAHA)
+
+    name_model : str
+        Name of the model, suffixed by the kind of model if several kinds are built
+
+    arena : Dict[str,DescriptorArena]
+        Shared (read only) descriptor arena of the reference
+
+    Returns
+    -------
+
+    Dict[str,Any]
+        Summary of the task : name, models (name -> (kind, model)), timing and errors
+    """
+    summary = {'name':name_label, 'models':{}, 'timing':{}, 'errors':[]}
+    start = time.time()
+    try : 
+        if not os.path.exists(directory):
+            raise FileNotFoundError(f"Directory {directory} not found for {name_model}")
+
+        meta_metric = MetricAnalysisObject()
+        meta_metric.arena = arena
+
+        # Get model parameters from config, descriptors are read from the arena 
+        # (configurations of the directory are not parsed again)
+        model_params = config.get(name_label, {})
+    
+    except Exception as e : 
+        summary['errors'].append(f"Error preparing {name_label}: {str(e)}")
+        summary['timing']['total'] = time.time() - start
+        return summary
+
+    for model_kind in model_kinds : 
+        start_model = time.time()
+        name_model_kind = name_model if len(model_kinds) == 1 else f'{name_model}_{model_kind}'
+        try:
+            if model_kind == 'GMM':
+                meta_metric.fit_gmm_envelop(
+                    species=species,
+                    name_model=name_model_kind,
+                    nb_bin_histo=model_params.get('nb_bin_histo', 100),
+                    nb_selected=model_params.get('nb_selected', 10000),
+                    dict_gaussian=model_params.get('dic_gaussian', {
+                        'n_components': 2,
+                        'covariance_type': 'full',
+                        'init_params': 'kmeans',
+                        'max_iter': 100,
+                        'weight_concentration_prior_type':'dirichlet_process',
+                        'weight_concentration_prior':0.5
+                    }),
+                    diagnostics=model_params.get('diagnostics', False)
+                )
+            elif model_kind == 'MCD':
+                meta_metric.fit_mcd_envelop(
+                    species=species,
+                    name_model=name_model_kind,
+                    contamination=model_params.get('contamination', 0.05),
+                    nb_bin=model_params.get('nb_bin_histo', 100),
+                    nb_selected=model_params.get('nb_selected', 10000),
+                    diagnostics=model_params.get('diagnostics', False)
+                )
+                
+            elif model_kind == 'MAHA':
+                meta_metric.fit_mahalanobis_envelop(
+                    species=species,
+                    name_model=name_model_kind,
+                    diagnostics=model_params.get('diagnostics', False)
+                )
+
+            summary['models'][name_model_kind] = (model_kind, meta_metric.meta_model.meta[name_model_kind])
+            print(f"Successfully built {model_kind} model for {species} ({name_label})")
+        except Exception as e:
+            summary['errors'].append(f"Error building {model_kind} model for {name_label}: {str(e)}")
+        summary['timing'][model_kind] = time.time() - start_model
+
+    summary['timing']['total'] = time.time() - start
+    return summary
+
 class ReferenceBuilder:
-    def __init__(self, species: str,  auto_config: dict, custom_config: List[dict]) -> None:
+    def __init__(self, species: str,  auto_config: dict, custom_config: List[dict], njob : int = 1) -> None:
         """
         Initialize with configuration dictionaries from UNSEENConfigParser
         
@@ -105,13 +282,16 @@ class ReferenceBuilder:
             Dictionary containing Auto configuration
         custom_config : List[dict]
             List of dictionaries for Custom references
+        njob : int 
+            Number of processes used to build references
         """
         #TODO_cos this should be changed I keep here it in order to be compatible with the former version ... 
         self.species = species
         self.auto_config = auto_config
         self.custom_config = custom_config
-        
-        
+        self.njob = njob
+        self.arenas : Dict[str,Dict[str,DescriptorArena]] = {}
+        self.summary : List[Dict[str,Any]] = []
 
     def process_auto_config(self) -> None:
         """Process the Auto configuration from provided dictionary"""
@@ -122,23 +302,7 @@ class ReferenceBuilder:
         print("\n" + "="*50)
         print("Processing Auto Configuration".center(50))
         print("="*50)
-        
-        directory = self.auto_config['directory']
-        #TODO_cos this should be changed I keep here it in order to be compatible with the former version ... 
-        name_label = self.auto_config['name']
-        
-
-        for model_kind in ['MCD', 'GMM', 'MAHA']:
-            if self.auto_config['models'].get(model_kind, False):
-                print(f"\nBuilding {model_kind} model for {name_label}")
-                self._build_model(
-                    config=self.auto_config,
-                    directory=directory,
-                    species=self.species,
-                    name_label = name_label,
-                    model_kind = model_kind,
-                    name_model=f"Auto_{name_label}"
-                )
+        self.build_references(process_auto=True, process_custom=False)
 
     def process_custom_references(self) -> None:
         """Process all custom references from configuration list"""
@@ -149,167 +313,100 @@ class ReferenceBuilder:
         print("\n" + "="*50)
         print("Processing Custom References".center(50))
         print("="*50)
-        
-        for ref in self.custom_config:
-            print(f"\nProcessing reference: {ref['name']}")
-            directory = ref['directory']
-            #species = ref['name'].split('_')[-1]  # Extract species from name
-            name_label = ref['name']
-            for model_kind in ['MCD', 'GMM', 'MAHA']:
-                if ref['models'].get(model_kind, False):
-                    print(f"Building {model_kind} model for {name_label}")
-                    self._build_model(
-                        config=ref,
-                        directory=directory,
-                        species=self.species,
-                        name_label = name_label, 
-                        model_kind = model_kind,
-                        name_model=f"Refs_{name_label}"
-                    )
-                    
-    def _build_model(self, config: dict, directory: str, species: str,
-                    name_label: str, model_kind: str, name_model: str) -> None:
-        """Internal method to handle model building"""
-        # Validate directory exists
-        if not os.path.exists(directory):
-            raise FileNotFoundError(f"Directory {directory} not found for {name_model}")
-        
-        
-        # # Remove any trailing slashes (unless the path is just '/' itself)
-        # normalized_path = directory.rstrip(os.sep)
-        # # Get the parent directory
-        # parent = os.path.dirname(normalized_path)
-        # # Add a trailing slash if needed and if parent is not empty
-        # if parent and not parent.endswith(os.sep):
-        #     parent += os.sep
+        self.build_references(process_auto=False, process_custom=True)
+
+    def _load_arena(self, config : dict) -> Dict[str,DescriptorArena] : 
+        """Load descriptor pickle of a reference only once and build its descriptor arena"""
         file_data_pickle = os.path.join(config['directory_path'], config['pickle_data'])
-        if not os.path.exists(file_data_pickle):
-            raise FileNotFoundError(f"Data pickle file with descriptors {file_data_pickle} not found for {name_model}")
-    
-        previous_dbmodel = pickle.load(open(file_data_pickle,'rb'))
-        self.meta_metric = MetricAnalysisObject(previous_dbmodel)
+        if file_data_pickle not in self.arenas : 
+            if not os.path.exists(file_data_pickle):
+                raise FileNotFoundError(f"Data pickle file with descriptors {file_data_pickle} not found for {config['name']}")
+            previous_dbmodel = pickle.load(open(file_data_pickle,'rb'))
+            self.arenas[file_data_pickle] = MetricAnalysisObject(previous_dbmodel).arena
+        return self.arenas[file_data_pickle]
 
+    def _list_tasks(self, process_auto : bool = True, process_custom : bool = True) -> List[Dict[str,Any]] : 
+        """List independent reference tasks (one task per reference with all its model kinds)"""
+        list_config = []
+        if process_auto and self.auto_config : 
+            list_config.append((self.auto_config, f"Auto_{self.auto_config['name']}"))
+        if process_custom and self.custom_config : 
+            list_config += [(ref, f"Refs_{ref['name']}") for ref in self.custom_config]
 
-        # Get model parameters from config
-        model_params = config.get(name_label, {})
-        
-        #debig_cos print('Config', config)        
-        #debig_cos print(directory)
-        #debig_cos print(species)
-        #debig_cos print(model_kind)
-        #debig_cos print(name_model)
-        #debig_cos os.system('pwd')
-        #debig_cos exit(0) 
-        
-        # Read configuration files
-        list_config_file = [
-            os.path.join(directory, f) 
-            for f in os.listdir(directory) 
-            if f.endswith(config.get('md_format', 'cfg'))
-        ]
-        #debug_cos print('HHHH', list_config_file)
-        
+        list_tasks = []
+        for config, name_model in list_config : 
+            model_kinds = [kind for kind in ['MCD', 'GMM', 'MAHA'] if config['models'].get(kind, False)]
+            if len(model_kinds) > 0 : 
+                list_tasks.append({'config':config,
+                                   'directory':config['directory'],
+                                   'species':self.species,
+                                   'name_label':config['name'],
+                                   'model_kinds':model_kinds,
+                                   'name_model':name_model})
+        return list_tasks
+
+    def build_references(self, process_auto : bool = True, process_custom : bool = True) -> List[Dict[str,Any]] :
+        """Build auto and custom references as independent tasks in a process pool. Descriptor pickles 
+        are loaded once and shared read only between tasks, a failure in one reference does not affect the 
+        others. Models are written by the main process (one store per reference)
         
+        Parameters
+        ----------
 
-        # Read and process atoms
-        list_atoms = []
-        #TODO_cos unify with other places 
-        # Define the allowed file extensions and a mapping to ASE read formats. 
-        #allowed_formats = {'cfg', 'poscar', 'data', 'xyz', 'dump', 'mixed', 'unseen'}
-        format_mapping = {
-            'cfg':    'cfg',  # same as before
-            'dump':   'lammps-dump-text',
-            'poscar': 'vasp',
-            'data':   'lammps-data',
-            'xyz':    'xyz',
-            ## For 'mixed' and 'unseen', you can choose the appropriate formats or default to something.
-            #'mixed':  'lammps-dump-text',  
-            #'unseen': 'lammps-dump-text'
-        }  
-
-        for file in list_config_file:
-            try:
-                # this read_function should be improved ....  
-                if self._get_extension(file) != config.get('md_format', 'cfg') : 
-                    print(f"Malheur: extension of {file } not match the input c{config.get('md_format', 'cfg')} ")
-                    exit(1)
-                # Get the appropriate format string for ASE.read, defaulting to 'lammps-dump-text' if not mapped.
-                
-                read_format = format_mapping.get(config.get('md_format', 'cfg'), 'lammps-dump-text')    
-                #atoms = read(file, format=self._get_extension(file))
-                atoms = read(file, format=read_format)
-
-                #TODO_cos we should unify selection_mask and id_atoms
-                nat = len(atoms)
-                if 'id_atoms' in config:
-                   if config['id_atoms'] == 'all' : 
-                       list_selected = list(range(nat))
-                   else :    
-                       list_selected = config['id_atoms']
-                                                                 
-                   atoms = atoms[list_selected]      
-
-                if 'selection_mask' in config:  # If using selection mask from config
-                   atoms = atoms[config['selection_mask']]
-                
-                list_atoms.append(atoms)
-            except Exception as e:
-                print(f"Error reading {file}: {str(e)}")
+        process_auto : bool 
+            Build the Auto reference 
+
+        process_custom : bool 
+            Build Custom references
+
+        Returns
+        -------
+
+        List[Dict[str,Any]]
+            Summary for each reference (models, timing and errors)
+        """
+        list_tasks = []
+        list_summary = []
+        for task in self._list_tasks(process_auto=process_auto, process_custom=process_custom) : 
+            try : 
+                task['arena'] = self._load_arena(task['config'])
+                list_tasks.append(task)
+            except Exception as e : 
+                list_summary.append({'name':task['name_label'], 'models':{}, 'timing':{}, 'errors':[str(e)]})
+
+        list_summary_task = Parallel(n_jobs=self.njob)(delayed(build_reference_models)(**task) for task in list_tasks)
+
+        # single writer for model stores
+        for task, summary in zip(list_tasks, list_summary_task) : 
+            if len(summary['models']) == 0 : 
                 continue
+            where_is_the_model = os.path.join(task['config']['directory_path'],task['config']['pickle_model'])
+            meta_metric = MetricAnalysisObject()
+            for name_model, (model_kind, model) in summary['models'].items() : 
+                meta_metric.meta_model.meta[name_model] = model
+                meta_metric.meta_model._update_meta_kind(name_model, model_kind)
+            try : 
+                meta_metric.store_model(f'{where_is_the_model}')
+            except Exception as e : 
+                summary['errors'].append(f"Error writing models for {summary['name']}: {str(e)}")
 
-        #debug_cos print('HALLOOOOOOOOOOOOOOO')
-        #debug_cos print(config['id_atoms'])
-        #debug_cos print('LUUUUUUUUUL', list_config_file)
-        #debug_cos print(config)
+        list_summary += list_summary_task
+        self._print_summary(list_summary)
+        self.summary += list_summary
+        return list_summary
 
-        # Build the specified model
-        where_is_the_model = os.path.join(config['directory_path'],config['pickle_model'])
-        try:
-            if model_kind == 'GMM':
-                self.meta_metric.fit_gmm_envelop(
-                    species=species,
-                    name_model=name_model,
-                    list_atoms=list_atoms,
-                    nb_bin_histo=model_params.get('nb_bin_histo', 100),
-                    nb_selected=model_params.get('nb_selected', 10000),
-                    dict_gaussian=model_params.get('dic_gaussian', {
-                        'n_components': 2,
-                        'covariance_type': 'full',
-                        'init_params': 'kmeans',
-                        'max_iter': 100,
-                        'weight_concentration_prior_type':'dirichlet_process',
-                        'weight_concentration_prior':0.5
-                    })
-                )
-                self.meta_metric.store_model_pickle(f'{where_is_the_model}')
-            elif model_kind == 'MCD':
-                self.meta_metric.fit_mcd_envelop(
-                    species=species,
-                    name_model=name_model,
-                    list_atoms=list_atoms,
-                    contamination=model_params.get('contamination', 0.05),
-                    nb_bin=model_params.get('nb_bin_histo', 100),
-                    nb_selected=model_params.get('nb_selected', 10000)
-                )
-                self.meta_metric.store_model_pickle(f'{where_is_the_model}')    
-                
-            elif model_kind == 'MAHA':
-                self.meta_metric.fit_mahalanobis_envelop(
-                    species=species,
-                    name_model=name_model,
-                    list_atoms=list_atoms
-                )
-                self.meta_metric.store_model_pickle(f'{where_is_the_model}')
-                
-            print(f"Successfully built {model_kind} model for {species}")
-        except Exception as e:
-            print(f"Error building {model_kind} model: {str(e)}")
-        #print('Here is the exit 0)')
-        #exit(0) 
+    def _print_summary(self, list_summary : List[Dict[str,Any]]) -> None : 
+        """Print timing and errors for each reference"""
+        print("\n" + "="*50)
+        print("Reference timing summary".center(50))
+        print("="*50)
+        for summary in list_summary : 
+            timing = ' '.join([f'{key}={val:.1f}s' for key, val in summary['timing'].items()])
+            status = 'OK' if len(summary['errors']) == 0 else 'FAILED'
+            print(f"{summary['name']:<20s} {status:<7s} {timing}")
+            for error in summary['errors'] : 
+                print(f"    {error}")
+        return 
 
     def _get_extension(self, file: str) -> str:
         return os.path.basename(file).split('.')[-1]
-    
-    
-    
-    
\ No newline at end of file
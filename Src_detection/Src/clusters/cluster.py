@@ -10,11 +10,21 @@ class Cluster :
     This class contains the present list of methods
     
     - append : update defect cluster with new atom object 
+    - extend : update defect cluster with several atoms (aggregation of clusters)
     - update_extension : update the spatial extension of the cluster
     - get_volume : return the volume of the cluster
     - estimation_dfct_number : return an estimation of the number of defect inside the cluster (working for point defects...)
 
+    Center and covariance of the cluster are kept as running statistics (Welford updates). The isotropic extension 
+    is bracketed by r_ref -/+ |com - c_ref| where r_ref is the exact maximum distance of members to a reference center 
+    c_ref : the envelop uses the upper bound and the exact extension is recomputed (O(n)) only when the center drifts 
+    by more than ```tolerance_extension``` of the extension or when a membership test (```get_elliptic_distance``` 
+    with threshold) falls between the two bounds. Appending an atom costs O(1) amortised, membership decisions 
+    are the same as with the exact extension
     """
+    # relative drift of the center before the exact extension is recomputed
+    tolerance_extension = 0.05
+
     def __init__(self, atom : Atom, rcut : float, array_property : Dict[str,Any] = {}) -> None : 
         """Init method cluster class 
         
@@ -32,14 +42,65 @@ class Cluster :
 
         """
         self.array_property = array_property
-        self.atoms_dfct = Atoms()
-        self.atoms_dfct.append(atom)
         self.rcut = rcut
         self.size = rcut
         self.elliptic = (1.0/(self.size**2))*np.eye(3)
         self.backup_elliptic = (1.0/(self.size**2))*np.eye(3)
+        self._init_statistics(atom)
         self.center = self.atoms_dfct.positions
 
+    def _init_statistics(self, atom : Atom) -> None : 
+        """Initialise running statistics of the cluster with its first atom"""
+        position = np.asarray(atom.position, dtype=float).flatten()
+        self.nb_member = 1
+        self.sum_mass = atom.mass
+        self.center_of_mass = position.copy()
+        self.mean_position = position.copy()
+        self.m2_position = np.zeros((3,3))
+        self.reference_center = position.copy()
+        self.reference_radius = 0.0
+        self.isotropic = True
+
+        self._member_positions = np.empty((16,3))
+        self._member_positions[0] = position
+        self._member_symbols = [atom.symbol]
+        self._atoms_dfct = None
+        self._elliptic_factor = None
+
+    def _update_statistics(self, atom : Atom) -> None : 
+        """O(1) update of running statistics (center of mass, mean and scatter matrix)"""
+        position = np.asarray(atom.position, dtype=float).flatten()
+        if self.nb_member == self._member_positions.shape[0] : 
+            self._member_positions = np.concatenate((self._member_positions, np.empty_like(self._member_positions)), axis=0)
+        self._member_positions[self.nb_member] = position
+        self._member_symbols.append(atom.symbol)
+        self._atoms_dfct = None
+
+        # Welford update for the unweighted mean and scatter matrix
+        self.nb_member += 1
+        delta = position - self.mean_position
+        self.mean_position += delta/self.nb_member
+        self.m2_position += np.outer(delta, position - self.mean_position)
+
+        # mass weighted center
+        self.sum_mass += atom.mass
+        self.center_of_mass += (atom.mass/self.sum_mass)*(position - self.center_of_mass)
+
+        # exact maximum distance to the reference center
+        self.reference_radius = max(self.reference_radius, np.linalg.norm(position - self.reference_center))
+
+    @property
+    def atoms_dfct(self) -> Atoms : 
+        """Atoms of the cluster (built on demand)"""
+        if self._atoms_dfct is None : 
+            self._atoms_dfct = Atoms(self._member_symbols, positions=self._member_positions[:self.nb_member])
+        return self._atoms_dfct
+
+    def get_covariance(self) -> np.ndarray : 
+        """Covariance of member positions around the center of mass from running statistics"""
+        shift = self.mean_position - self.center_of_mass
+        return (self.m2_position + self.nb_member*np.outer(shift, shift))/(self.nb_member - 1)
+
     def append(self, atom : Atom, array_property : Dict[str,Any] = {}, elliptic : str ='iso') -> None : 
         """Append new atom in the cluster
         
@@ -53,25 +114,68 @@ class Cluster :
             Dictionnnary which contains additional data about atom in the cluster (atomic volume, mcd distance ...)
 
         """       
-        self.atoms_dfct.append(atom)
-        self.center = self.atoms_dfct.get_center_of_mass()
+        self._update_statistics(atom)
+        self._update_envelop(elliptic)
+        
+        for prop in array_property.keys() : 
+            self.array_property[prop] += array_property[prop]
+
+    def extend(self, atoms : Atoms, array_property : Dict[str,Any] = {}, elliptic : str ='iso') -> None : 
+        """Append several atoms in the cluster, center and envelop are updated once
+        
+        Parameters
+        ----------
+
+        atoms : Atoms 
+            New atoms to put in the cluster 
+        
+        array_property : Dict[str,Any]
+            Dictionnnary which contains additional data about atoms in the cluster (atomic volume, mcd distance ...)
+
+        elliptic : str 
+            Type of envelop : iso or aniso
+        """
+        if len(atoms) == 0 : 
+            return 
+        
+        for atom in atoms : 
+            self._update_statistics(atom)
+        self._update_envelop(elliptic)
+
+        for prop in array_property.keys() : 
+            self.array_property[prop] += array_property[prop]
+
+    def _update_envelop(self, elliptic : str) -> None : 
+        """Update center and envelop of the cluster after new members"""
+        self.center = self.center_of_mass.copy()
         if elliptic == 'iso' :
             self.size = self.update_extension()
             self._isotropic_extension()
         if elliptic == 'aniso' : 
             self._anistropic_extension()
-        
-        for prop in array_property.keys() : 
-            self.array_property[prop] += array_property[prop]
+
+    def _refresh_extension(self) -> None : 
+        """Exact extension of the cluster, the center of mass becomes the reference center (O(n))"""
+        self.reference_center = self.center_of_mass.copy()
+        self.reference_radius = np.amax(np.linalg.norm(self._member_positions[:self.nb_member] - self.reference_center, axis=1))
+
+    def get_extension_bounds(self) -> Tuple[float,float] : 
+        """Lower and upper bounds of the spatial extension of the cluster (O(1))"""
+        drift = np.linalg.norm(self.center_of_mass - self.reference_center)
+        return max(self.rcut, self.reference_radius - drift), max(self.rcut, self.reference_radius + drift)
 
     def update_extension(self) -> float : 
-        """Update the spatial extension of the cluster 
+        """Update the spatial extension of the cluster (upper bound of the maximum distance of members to the center of mass)
         Should be changed for non isotropic defects ..."""
-        return max([self.rcut, np.amax( [np.linalg.norm(pos - self.center) for pos in self.atoms_dfct.positions ] )])
+        if np.linalg.norm(self.center_of_mass - self.reference_center) > self.tolerance_extension*max(self.reference_radius, self.rcut) : 
+            self._refresh_extension()
+        return self.get_extension_bounds()[1]
 
     def _isotropic_extension(self) -> None : 
         """Distance covariance estimatior for isotropic clusters"""
         self.elliptic = (1.0/(self.size**2))*np.eye(3)
+        self.isotropic = True
+        self._elliptic_factor = None
     
     def _anistropic_extension(self, regularisation : float = 0.0) -> None : 
         """Distance covariance estimatior for anisotropic clusters
@@ -82,8 +186,9 @@ class Cluster :
         regularisation : float 
             regularisation parameter for covariance matrix pseudo inversion
         """
-        covariance = (self.atoms_dfct.positions - self.center).T@(self.atoms_dfct.positions - self.center)/(self.atoms_dfct.positions.shape[0] - 1)
+        covariance = self.get_covariance()
         self.elliptic = np.linalg.pinv(covariance + regularisation*np.eye(covariance.shape[0]))
+        self.isotropic = False
 
         # check the minimal isotropic raduis for each direction
         for i in range(self.elliptic.shape[0]) : 
@@ -91,9 +196,11 @@ class Cluster :
                 self.elliptic[i,:] = 0.0
                 self.elliptic[:,i] = 0.0
                 self.elliptic[i,i] = 1.0/(self.rcut**2)
+        self._elliptic_factor = None
 
-    def get_elliptic_distance(self, atom : Atom) -> float :
-        """Compute distance to the elliptic covariance distances envelop
+    def get_elliptic_distance(self, atom : Atom, threshold : float = None) -> float :
+        """Compute distance to the elliptic covariance distances envelop. The Cholesky factor 
+        of the elliptic matrix is cached until the envelop changes
         
         Parameters
         ----------
@@ -101,12 +208,34 @@ class Cluster :
         atom : Atom
             Atom object to compute the elliptic distance
 
+        threshold : float 
+            Membership threshold on the distance. For isotropic envelop, the exact extension is recomputed 
+            when the comparison to threshold is not decided by the extension bounds
+
         Returns:
         --------
 
         float : Elliptic distance
         """
-        return np.sqrt((atom.position.flatten()-self.center.flatten())@self.elliptic@(atom.position.flatten()- self.center.flatten()).T)
+        if threshold is not None and self.isotropic : 
+            delta = np.linalg.norm(atom.position.flatten() - np.asarray(self.center).flatten())
+            lower, _ = self.get_extension_bounds()
+            if delta < threshold*self.size and delta >= threshold*lower : 
+                self._refresh_extension()
+                self.size = self.get_extension_bounds()[1]
+                self._isotropic_extension()
+            return delta/self.size
+
+        if self._elliptic_factor is None : 
+            try : 
+                self._elliptic_factor = np.linalg.cholesky(self.elliptic)
+            except np.linalg.LinAlgError : 
+                self._elliptic_factor = False
+
+        delta = atom.position.flatten() - np.asarray(self.center).flatten()
+        if self._elliptic_factor is False : 
+            return np.sqrt(delta@self.elliptic@delta.T)
+        return np.linalg.norm(delta@self._elliptic_factor)
 
     def get_volume(self) -> float : 
         """Get an estimation of the cluster volume 
@@ -126,10 +255,10 @@ class Cluster :
 
         float : number of atom estimation
         """
-        return len(self.atoms_dfct) - self.get_volume()/mean_atomic_volume
+        return self.nb_member - self.get_volume()/mean_atomic_volume
 
 
-class NanoCluster : 
+class NanoCluster(Cluster) : 
     """Cluster class which contains all data about atomic defects found in a given configuration.
     This class contains the present list of methods
     
@@ -155,105 +284,10 @@ class NanoCluster :
             Dictionnnary which contains additional data about atom in the cluster (atomic volume, mcd distance ...)
 
         """
-        self.array_property = array_property
-        self.atoms_dfct = Atoms()
-        self.atoms_dfct.append(atom)
-        self.rcut = rcut
-        self.size = rcut
-        self.elliptic = (1.0/(self.size**2))*np.eye(3)
-        self.backup_elliptic = (1.0/(self.size**2))*np.eye(3)
-        self.center = self.atoms_dfct.positions
+        super().__init__(atom, rcut, array_property=array_property)
         print('NanoCluster created this is fake script will stop here')
         exit(0) 
 
-    def append(self, atom : Atom, array_property : Dict[str,Any] = {}, elliptic : str ='iso') -> None : 
-        """Append new atom in the cluster
-        
-        Parameters
-        ----------
-
-        atom : Atom 
-            New atom to put in the cluster 
-        
-        array_property : Dict[str,Any]
-            Dictionnnary which contains additional data about atom in the cluster (atomic volume, mcd distance ...)
-
-        """       
-        self.atoms_dfct.append(atom)
-        self.center = self.atoms_dfct.get_center_of_mass()
-        if elliptic == 'iso' :
-            self.size = self.update_extension()
-            self._isotropic_extension()
-        if elliptic == 'aniso' : 
-            self._anistropic_extension()
-        
-        for prop in array_property.keys() : 
-            self.array_property[prop] += array_property[prop]
-
-    def update_extension(self) -> float : 
-        """Update the spatial extension of the cluster 
-        Should be changed for non isotropic defects ..."""
-        return max([self.rcut, np.amax( [np.linalg.norm(pos - self.center) for pos in self.atoms_dfct.positions ] )])
-
-    def _isotropic_extension(self) -> None : 
-        """Distance covariance estimatior for isotropic clusters"""
-        self.elliptic = (1.0/(self.size**2))*np.eye(3)
-    
-    def _anistropic_extension(self, regularisation : float = 0.0) -> None : 
-        """Distance covariance estimatior for anisotropic clusters
-        
-        Parameters
-        ----------
-
-        regularisation : float 
-            regularisation parameter for covariance matrix pseudo inversion
-        """
-        covariance = (self.atoms_dfct.positions - self.center).T@(self.atoms_dfct.positions - self.center)/(self.atoms_dfct.positions.shape[0] - 1)
-        self.elliptic = np.linalg.pinv(covariance + regularisation*np.eye(covariance.shape[0]))
-
-        # check the minimal isotropic raduis for each direction
-        for i in range(self.elliptic.shape[0]) : 
-            if self.elliptic[i,i] > 1.0/(self.rcut**2) :
-                self.elliptic[i,:] = 0.0
-                self.elliptic[:,i] = 0.0
-                self.elliptic[i,i] = 1.0/(self.rcut**2)
-
-    def get_elliptic_distance(self, atom : Atom) -> float :
-        """Compute distance to the elliptic covariance distances envelop
-        
-        Parameters
-        ----------
-
-        atom : Atom
-            Atom object to compute the elliptic distance
-
-        Returns:
-        --------
-
-        float : Elliptic distance
-        """
-        return np.sqrt((atom.position.flatten()-self.center.flatten())@self.elliptic@(atom.position.flatten()- self.center.flatten()).T)
-
-    def get_volume(self) -> float : 
-        """Get an estimation of the cluster volume 
-        
-        Returns:
-        --------
-
-        float : cluster volume 
-        """
-        return np.sum(self.array_property['atomic-volume'])
-    
-    def estimate_dfct_number(self, mean_atomic_volume : float) -> float :
-        """Get an estimation of number interstitial atom inside the cluster
-        
-        Returns:
-        --------
-
-        float : number of atom estimation
-        """
-        return len(self.atoms_dfct) - self.get_volume()/mean_atomic_volume
-
 
 
 
@@ -410,8 +444,27 @@ class ClusterDislo(Cluster) :
 
         """       
         self.local_lines[id_line] = local_line
-        self.atoms_dfct.append( Atom(local_line.species, local_line.center) )
-        self.center = self.atoms_dfct.get_center_of_mass().reshape((1,3))
+        self._update_statistics( Atom(local_line.species, local_line.center) )
+        self.center = self.center_of_mass.copy().reshape((1,3))
+        self._anistropic_extension()
+        return 
+
+    def extend_dislo(self, local_lines : Dict[int,LocalLine]) -> None : 
+        """Append several ```LocalLine``` in the cluster, center and elliptic envelop are updated once
+        
+        Parameters
+        ----------
+
+        local_lines : Dict[int,LocalLine]
+            Dictionnary of ```LocalLine``` to put in the cluster
+        """
+        if len(local_lines) == 0 : 
+            return 
+        
+        self.local_lines.update(local_lines)
+        for line in local_lines.values() : 
+            self._update_statistics( Atom(line.species, line.center) )
+        self.center = self.center_of_mass.copy().reshape((1,3))
         self._anistropic_extension()
         return 
     
@@ -1,12 +1,13 @@
 import warnings
+import copy
 from typing import Dict, List, Tuple, TypedDict
 
 from ase import Atoms, Atom
 from .cluster import ClusterDislo, LocalLine
 
 import numpy as np
-from scipy.spatial import ConvexHull
-from ..tools import get_N_neighbour, merge_dict_
+from scipy.spatial import ConvexHull, cKDTree
+from ..tools import get_N_neighbour, merge_dict_, union_find_
 from ..structure import NeighboursCoordinates
 
 from ovito.io.ase import ase_to_ovito
@@ -15,6 +16,8 @@ from ovito.io import *
 
 from ovito.modifiers import VoronoiAnalysisModifier
 
+from joblib import Parallel, delayed
+
 """Disclaimer 
 Sources for Nye tensor calculation coming from : https://github.com/lmhale99/atomman
 
@@ -140,6 +143,8 @@ class DislocationObject :
                 self.__dict__[dict_equiv[lattice]] = neigh
 
         self.kind_neigh = kind_neigh
+        self.tree_system : cKDTree = None
+        self.box_system : np.ndarray = None
         self.neigh_factor = neigh_factor
         self.voro_vol = self.ComputeVoronoiVolume(self.extended_system)
 
@@ -181,8 +186,36 @@ class DislocationObject :
         composite_id_distance = [(idx, np.linalg.norm(pos - barycenter)) for idx,pos in enumerate(self.system.positions) ]
         sorting =  sorted(composite_id_distance, key=lambda x: x[1], reverse=True)
         self.system : Atoms = self.system[ [s[0] for s in sorting ] ]
+        self.tree_system = None
         return  
 
+    def _wrap_positions(self, positions : np.ndarray) -> np.ndarray : 
+        """Wrap positions in [0,L) for the periodic KD-tree"""
+        wrapped = np.mod(positions, self.box_system)
+        return np.where(wrapped >= self.box_system, 0.0, wrapped)
+
+    def get_system_tree(self) -> cKDTree : 
+        """Build (once) the KD-tree over ```system``` positions. For orthorhombic periodic cells 
+        the tree is periodic, otherwise periodic boundary conditions are ignored
+        
+        Returns:
+        --------
+
+        cKDTree
+            KD-tree over ```system``` positions
+        """
+        if self.tree_system is None : 
+            cell = self.system.cell[:]
+            is_orthorhombic = np.allclose(cell, np.diag(np.diag(cell)))
+            if np.all(self.system.pbc) and is_orthorhombic and np.all(np.diag(cell) > 0.0) : 
+                self.box_system = np.diag(cell).copy()
+                self.tree_system = cKDTree(self._wrap_positions(self.system.positions), boxsize=self.box_system)
+            else : 
+                self.box_system = None
+                self.tree_system = cKDTree(self.system.positions)
+        
+        return self.tree_system
+
     def get_convex_hull(self) -> ConvexHull :
         """Build the 3D convex hull for the whole system 
         
@@ -222,41 +255,53 @@ class DislocationObject :
         if rcut_cluster < rcut_line : 
             raise ValueError(f'Impossible to build lines with rcut_cluster {rcut_cluster} < rcut_line {rcut_line}')
 
+        positions = self.system.positions
+        symbols = self.system.get_chemical_symbols()
+
         #here is the initialisation step. We first select the farest atom to the system barycenter
         idx_dislo = 0
-        barycenter = np.mean(self.system.positions, axis=0)
-        starting_id = np.argmax( np.linalg.norm(self.system.positions - barycenter, axis=1)  )
+        barycenter = np.mean(positions, axis=0)
+        starting_id = np.argmax( np.linalg.norm(positions - barycenter, axis=1)  )
         
         self.starting_point_line = starting_id
-        self.dislocations[idx_dislo]  = ClusterDislo(LocalLine( self.system[starting_id].position, self.system[starting_id].symbol ), starting_id, rcut_cluster)  
+        self.dislocations[idx_dislo]  = ClusterDislo(LocalLine( positions[starting_id], symbols[starting_id] ), starting_id, rcut_cluster)  
+
+        # all rcut_line neighbourhoods are queried in one batch, sampled points of lines 
+        # and their ClusterDislo are stored in arrays
+        neighbour_line = cKDTree(positions).query_ball_point(positions, r=rcut_line)
+        is_sampled = np.zeros(len(positions), dtype=bool)
+        is_sampled[starting_id] = True
+        sampled_positions = np.empty((len(positions),3))
+        sampled_cluster = np.empty(len(positions), dtype=int)
+        sampled_positions[0], sampled_cluster[0], nb_sampled = positions[starting_id], idx_dislo, 1
 
         #debug
         tmp_list = [starting_id]
 
-        for id_atom_i, at_i in enumerate(self.system) : 
-            if id_atom_i == starting_id : 
+        for id_atom_i in range(len(positions)) : 
+            #at_i have to be sufficiently far from the sampled points to build an accurate dislocation line 
+            if id_atom_i == starting_id or np.any(is_sampled[neighbour_line[id_atom_i]]) : 
                 continue
+
+            #Find the nearest ClusterDislo to the at_i
+            distances = np.sum((sampled_positions[:nb_sampled] - positions[id_atom_i])**2, axis=1)
+            closest_cluster = self.dislocations[sampled_cluster[np.argmin(distances)]]
+
+            tmp_list.append(id_atom_i)
+            if closest_cluster.get_elliptic_distance(self.system[id_atom_i]) > scale_cluster :
+                idx_dislo += 1 
+                self.dislocations[idx_dislo]  = ClusterDislo(LocalLine( positions[id_atom_i], symbols[id_atom_i] ), idx_dislo, rcut_cluster)                        
+                sampled_cluster[nb_sampled] = idx_dislo
+            
+            #otherwise we aggregate at_i to the closest ClusterDislo
             else : 
-                #Find the nearest ClusterDislo to the at_i
-                min_dist_array = [ np.amin(np.linalg.norm(at_i.position - cluster.atoms_dfct.positions, axis=1)) for _,cluster in self.dislocations.items()]
-                #min_dist_array = [ np.amin(np.sum( (at_i.position - cluster.atoms_dfct.positions)**2, axis=1)) for _,cluster in self.dislocations.items()]
-                index_min_key = np.argmin(min_dist_array)
-                closest_cluster = list(self.dislocations.values())[index_min_key]
-
-                #at_i have to be sufficiently far from the cluster to build an accurate dislocation line 
-                if min_dist_array[index_min_key] > rcut_line :
-                    tmp_list.append(id_atom_i)
-                    if closest_cluster.get_elliptic_distance(at_i) > scale_cluster :
-                            idx_dislo += 1 
-                            self.dislocations[idx_dislo]  = ClusterDislo(LocalLine( at_i.position, at_i.symbol ), idx_dislo, rcut_cluster)                        
-                    
-                    #otherwise we aggregate at_i to the closest ClusterDislo
-                    else : 
-                        closest_cluster.append_dislo(LocalLine(at_i.position, at_i.symbol), id_atom_i)
-
-                else : 
-                    continue 
-        
+                closest_cluster.append_dislo(LocalLine(positions[id_atom_i], symbols[id_atom_i]), id_atom_i)
+                sampled_cluster[nb_sampled] = sampled_cluster[np.argmin(distances)]
+
+            is_sampled[id_atom_i] = True
+            sampled_positions[nb_sampled] = positions[id_atom_i]
+            nb_sampled += 1
+
         return tmp_list
 
     def AggregateTwoClusterDislo(self, slave_cluster : ClusterDislo, master_cluster : ClusterDislo) -> ClusterDislo :
@@ -278,12 +323,14 @@ class DislocationObject :
             Master ```ClusterDislo``` after aggregation
 
         """
-        for id_s, l_s in slave_cluster.local_lines.items() :
-            master_cluster.append_dislo(l_s, id_s)
+        master_cluster.extend_dislo(slave_cluster.local_lines)
         return master_cluster
 
-    def RefineSamplingLine(self, scale : float = 2.0) -> None : 
-        """Aggregate the closest ```ClusterDislo``` before build the ordering line
+    def RefineSamplingLine(self, scale : float = 2.0, union_find : bool = False) -> None : 
+        """Aggregate the closest ```ClusterDislo``` before build the ordering line. Overlapping pairs 
+        are found with a KD-tree over cluster centers. By default pairs are grouped with the historical 
+        single pass scheme (same line sets as before), with union_find all clusters linked by a chain of 
+        overlaps are merged and each group is aggregated on its first ```ClusterDislo```
         
         Parameters
         ----------
@@ -291,63 +338,80 @@ class DislocationObject :
         scale : float
             Scaling factor to consider if two ```ClusterDislo``` are overlaped
 
+        union_find : bool 
+            Group overlapping clusters by union-find (transitive merge)
+
         """
-        
+        if len(self.dislocations) < 2 : 
+            return 
+
+        list_id = list(self.dislocations.keys())
+        centers = np.array([ np.asarray(self.dislocations[id_c].center).flatten() for id_c in list_id ])
+        sizes = np.array([ self.dislocations[id_c].size for id_c in list_id ])
+
+        # candidate pairs with the largest size then exact overlap criterion
+        pairs = cKDTree(centers).query_pairs(r=2.0*scale*np.amax(sizes), output_type='ndarray')
+        r_ij = np.linalg.norm(centers[pairs[:,0]] - centers[pairs[:,1]], axis=1)
+        pairs = pairs[r_ij < scale*(sizes[pairs[:,0]] + sizes[pairs[:,1]])]
+
+        if union_find : 
+            self._union_find_aggregation(list_id, pairs)
+        else : 
+            self._single_pass_aggregation(list_id, pairs)
+        return 
+
+    def _union_find_aggregation(self, list_id : List[int], pairs : np.ndarray) -> None : 
+        """Merge groups of overlapping ```ClusterDislo``` found by union-find, each group is aggregated once on its first cluster"""
+        roots = union_find_(len(list_id), pairs)
+        dic_aggre : Dict[int, Dict[int,LocalLine]] = {}
+        for id_slave, root in enumerate(roots) : 
+            if root != id_slave : 
+                dic_aggre.setdefault(list_id[root], {}).update(self.dislocations[list_id[id_slave]].local_lines)
+                del self.dislocations[list_id[id_slave]]
+
+        # aggregate on master
+        for id_master, local_lines in dic_aggre.items() : 
+            self.dislocations[id_master].extend_dislo(local_lines)
+        return 
+
+    def _single_pass_aggregation(self, list_id : List[int], pairs : np.ndarray) -> None : 
+        """Historical grouping of overlapping ```ClusterDislo``` : overlapping pairs (id_i > id_j) are visited 
+        in the order of the former double loop over clusters and groups are built in one pass then merged 
+        with ```merge_dict_```"""
+        ordered_pairs = sorted([ (pos_a, pos_b) if list_id[pos_a] > list_id[pos_b] else (pos_b, pos_a) for pos_a, pos_b in pairs.tolist() ])
+
         dic_aggre : Dict[int, List[int]] = {}
-        for id_i, cluster_i in self.dislocations.items() :
-            #print()
-            #print('loop i',id_i,dic_aggre) 
-            for id_j, cluster_j in self.dislocations.items() : 
-                if id_i > id_j :
-                    r_ij = np.linalg.norm(cluster_i.center - cluster_j.center)
-                    #r_ijsquare = np.sum((cluster_i.center - cluster_j.center)**2)
-                    size_ij = cluster_i.size + cluster_j.size
-                    
-                    # Aggregation between the two clusters !
-                    #if r_ijsquare < (scale*size_ij)**2 :
-                    if r_ij < scale*size_ij :
-                        if id_i in dic_aggre.keys() :
-                            if id_j not in dic_aggre[id_i] :
-                                #print(f'Here id_i {id_i} append {id_j}') 
-                                dic_aggre[id_i].append(id_j)
-                        
-                        elif id_j in dic_aggre.keys() :
-                            if id_i not in dic_aggre[id_j] :
-                                #print(f'Here id_j {id_j} append {id_i}') 
-                                dic_aggre[id_j].append(id_i)
-
-                        else :     
-                            #print('Will add new key')
-                            #print(id_i, id_j)
-                            # check if we have to add a new key
-                            bool_check = True
-                            for _, val in dic_aggre.items() : 
-                                if (id_j in val) and (id_i not in val) : 
-                                    #print(val, id_i, 'i')
-                                    val.append(id_i)
-                                    bool_check = False 
-                                    break
-                                elif (id_i in val) and (id_j not in val) :
-                                    #print(val, id_j, 'j')
-                                    val.append(id_j)
-                                    bool_check = False
-                                    break
-                                
-                                elif (id_i in val) and (id_j in val) : 
-                                    bool_check = False
-                                    break
-
-                            if bool_check :
-                                #print(f'New key : {id_i} => {id_j}')
-                                dic_aggre[id_i] = [id_j]
-                
-                else :
-                    continue
+        for pos_i, pos_j in ordered_pairs : 
+            id_i, id_j = list_id[pos_i], list_id[pos_j]
+            if id_i in dic_aggre.keys() :
+                if id_j not in dic_aggre[id_i] :
+                    dic_aggre[id_i].append(id_j)
+            
+            elif id_j in dic_aggre.keys() :
+                if id_i not in dic_aggre[id_j] :
+                    dic_aggre[id_j].append(id_i)
+
+            else :     
+                # check if we have to add a new key
+                bool_check = True
+                for _, val in dic_aggre.items() : 
+                    if (id_j in val) and (id_i not in val) : 
+                        val.append(id_i)
+                        bool_check = False 
+                        break
+                    elif (id_i in val) and (id_j not in val) :
+                        val.append(id_j)
+                        bool_check = False
+                        break
+                    elif (id_i in val) and (id_j in val) : 
+                        bool_check = False
+                        break
+
+                if bool_check :
+                    dic_aggre[id_i] = [id_j]
         
         # reaggreate ...
         dic_aggre = merge_dict_(dic_aggre)
-        #print(dic_aggre)
-
         for key_id, list_to_aggr in dic_aggre.items() : 
             for id_to_aggr in list_to_aggr : 
                 try : 
@@ -361,8 +425,6 @@ class DislocationObject :
                     del self.dislocations[id_to_aggr]
                 except : 
                     warnings.warn(f'Something went wrong for {key_id} (master) / {id_to_aggr} (slave) aggregation')
-
-
         return 
 
     def StartingPointCluster(self) -> None :
@@ -375,6 +437,68 @@ class DislocationObject :
         return 
 
 
+    def _ordering_cluster(self, cluster : ClusterDislo, neighbour : np.ndarray, scale : float, descriptor : np.ndarray = None, idx_neighbor : np.ndarray = None) -> Atoms : 
+        """Order the ```LocalLine``` of one ```ClusterDislo``` (see ```BuildOrderingLine```)"""
+        barycenter_loc = Atoms()
+        weights = np.ones(neighbour.shape[1])
+        if descriptor is not None :
+            subset_descriptor = descriptor[idx_neighbor[self.starting_point_line] , :]
+            weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])
+
+        starting_point = np.average( neighbour[cluster.starting_point,:,:] + cluster.local_lines[cluster.starting_point].center, axis=0, weights=weights)
+        
+        #debug 
+        barycenter_loc.append(Atom('W',starting_point))
+
+        # updating data in local lines for the starting point!
+        cluster.local_lines[cluster.starting_point].update_center(starting_point)
+        explored_idx = [cluster.starting_point]
+        cluster.order_line = [cluster.starting_point]
+
+        key2del = []
+        bool_stop = False
+        for _ in range(len(cluster.local_lines) - 1 ) : 
+            #build the sub_local_line dictionnary which excluded the previously explored points
+            sub_local_line = {key:val for key, val in cluster.local_lines.items() if key not in explored_idx}
+            
+            composite_id_distance = [(idx, np.linalg.norm(line.center - starting_point)) for idx, line in sub_local_line.items() if np.linalg.norm(line.center - starting_point) > 0.0 ]
+            min_id, _ =  sorted(composite_id_distance, key=lambda x: x[1])[0]
+
+            if descriptor is not None : 
+                subset_descriptor = descriptor[idx_neighbor[min_id] , :]
+                weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])
+
+            #find the next previous point of the local line
+            explored_idx.append(min_id)
+            cluster.order_line.append(min_id)
+            
+            # build the new starting point for the iterative skim...
+            new_starting_point = np.average( neighbour[min_id,:,:] + cluster.local_lines[min_id].center, axis=0, weights=weights)
+
+            #debug and check ordering
+            if (np.linalg.norm(new_starting_point - starting_point) > scale*cluster.size) and (not bool_stop) :
+                barycenter_loc.append(Atom('W',new_starting_point))
+                bool_stop = True
+
+            #updating the local normal from the previous starting point and next id 
+            cluster.local_lines[explored_idx[-1]].update_normal( (new_starting_point - starting_point)/np.linalg.norm(new_starting_point - starting_point) )
+            cluster.local_lines[explored_idx[-1]].update_norm_normal( np.linalg.norm(new_starting_point - starting_point) )
+            cluster.local_lines[explored_idx[-1]].update_next( min_id )
+            
+            # remove atoms when the ordering is messy
+            if bool_stop : 
+                key2del.append(min_id)
+
+            #updating the new starting point ! 
+            starting_point = new_starting_point
+        
+        # delete messy atoms for line
+        for k_del in key2del : 
+            del cluster.local_lines[k_del]
+            cluster.order_line.remove(k_del)
+
+        return barycenter_loc
+
     def BuildOrderingLine(self, neighbour : np.ndarray, 
                           scale : float,
                           descriptor : np.ndarray = None, 
@@ -407,68 +531,49 @@ class DislocationObject :
         
         barycenter = []
         for _, cluster in self.dislocations.items():
-            barycenter_loc = Atoms()
-            weights = np.ones(neighbour.shape[1])
-            if descriptor is not None :
-                subset_descriptor = descriptor[idx_neighbor[self.starting_point_line] , :]
-                weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])
+            barycenter.append(self._ordering_cluster(cluster, neighbour, scale, descriptor=descriptor, idx_neighbor=idx_neighbor))
 
-            starting_point = np.average( neighbour[cluster.starting_point,:,:] + cluster.local_lines[cluster.starting_point].center, axis=0, weights=weights)
-            
-            #debug 
-            barycenter_loc.append(Atom('W',starting_point))
-
-            # updating data in local lines for the starting point!
-            cluster.local_lines[cluster.starting_point].update_center(starting_point)
-            explored_idx = [cluster.starting_point]
-            cluster.order_line = [cluster.starting_point]
-
-            key2del = []
-            bool_stop = False
-            for _ in range(len(cluster.local_lines) - 1 ) : 
-                #build the sub_local_line dictionnary which excluded the previously explored points
-                sub_local_line = {key:val for key, val in cluster.local_lines.items() if key not in explored_idx}
-                
-                composite_id_distance = [(idx, np.linalg.norm(line.center - starting_point)) for idx, line in sub_local_line.items() if np.linalg.norm(line.center - starting_point) > 0.0 ]
-                min_id, _ =  sorted(composite_id_distance, key=lambda x: x[1])[0]
-
-                if descriptor is not None : 
-                    subset_descriptor = descriptor[idx_neighbor[min_id] , :]
-                    weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])
-
-                #find the next previous point of the local line
-                explored_idx.append(min_id)
-                cluster.order_line.append(min_id)
-                
-                # build the new starting point for the iterative skim...
-                new_starting_point = np.average( neighbour[min_id,:,:] + cluster.local_lines[min_id].center, axis=0, weights=weights)
-
-                #debug and check ordering
-                if (np.linalg.norm(new_starting_point - starting_point) > scale*cluster.size) and (not bool_stop) :
-                    barycenter_loc.append(Atom('W',new_starting_point))
-                    bool_stop = True
-
-                #updating the local normal from the previous starting point and next id 
-                cluster.local_lines[explored_idx[-1]].update_normal( (new_starting_point - starting_point)/np.linalg.norm(new_starting_point - starting_point) )
-                cluster.local_lines[explored_idx[-1]].update_norm_normal( np.linalg.norm(new_starting_point - starting_point) )
-                cluster.local_lines[explored_idx[-1]].update_next( min_id )
-                
-                # remove atoms when the ordering is messy
-                if bool_stop : 
-                    key2del.append(min_id)
-
-                #updating the new starting point ! 
-                starting_point = new_starting_point
-            
-            # delete messy atoms for line
-            for k_del in key2del : 
-                del cluster.local_lines[k_del]
-                cluster.order_line.remove(k_del)
+        return barycenter
 
-            barycenter.append(barycenter_loc)
 
-        return barycenter
+    def _smoothing_cluster(self, cluster : ClusterDislo, nb_averaging_window : int = 2) -> Atoms : 
+        """Smooth the dislocation line of one ```ClusterDislo``` (see ```LineSmoothing```)"""
+        barycenter_loc = Atoms()
+
+        #build the smoothed local line !INDEXES ARE CHANGED AT THIS POINT!
+        for k in range(len(cluster.order_line) - nb_averaging_window) : 
+            species = cluster.local_lines[cluster.order_line[k]].species
+            new_k = int(0.5*(2*k+nb_averaging_window)) if nb_averaging_window%2 == 0 else int(0.5*(2*k+nb_averaging_window)) + 1
+            all_window_positions = np.array([ cluster.local_lines[cluster.order_line[i]].center for i in range(k+1,k+1+nb_averaging_window) ])
+            av_localline_obj = LocalLine( np.mean(all_window_positions, axis=0), species)
+            
+            #debug
+            barycenter_loc.append(Atom(symbol=species, position= np.mean(all_window_positions, axis=0)))
+     
+            #smooth line is updated
+            cluster.smooth_local_lines[new_k] = av_localline_obj
+            cluster.smooth_order_line.append( cluster.order_line[new_k] )
+
+        #tmp = [key for key, val in cluster.smooth_local_lines.items()]
+        #tmp.sort()
+        #print(tmp)
+
+        #time to update every normal ...
+        shift_av = int(0.5*nb_averaging_window) if nb_averaging_window%2 == 0 else int(0.5*nb_averaging_window) + 1
+        for k in range(shift_av, len(cluster.smooth_local_lines) + shift_av - 1) :
+            local_smooth_normal = (cluster.smooth_local_lines[k+1].center - cluster.smooth_local_lines[k].center)/np.linalg.norm(cluster.smooth_local_lines[k+1].center - cluster.smooth_local_lines[k].center)
+            cluster.smooth_local_lines[k].update_normal( local_smooth_normal )
+            cluster.smooth_local_lines[k].update_norm_normal(np.linalg.norm(cluster.smooth_local_lines[k+1].center - cluster.smooth_local_lines[k].center))
+            cluster.smooth_local_lines[k].update_next(k+1)
+        
+        #last one to update ! 
+        previous_normal = cluster.smooth_local_lines[len(cluster.smooth_local_lines) -2 + shift_av].local_normal
+        previous_norm = cluster.smooth_local_lines[len(cluster.smooth_local_lines) -2 + shift_av].norm_normal
+        cluster.smooth_local_lines[len(cluster.smooth_local_lines) -1 + shift_av].update_normal( previous_normal )
+        cluster.smooth_local_lines[len(cluster.smooth_local_lines) -1 + shift_av].update_norm_normal( previous_norm )
+        cluster.smooth_local_lines[len(cluster.smooth_local_lines) -1 + shift_av].update_next(None)
 
+        return barycenter_loc
 
     def LineSmoothing(self, nb_averaging_window : int = 2) -> List[Atoms] : 
         """Allows to smooth the dislocation line based on BuildOrderingLine method. 
@@ -491,46 +596,71 @@ class DislocationObject :
         
         barycenter = []
         for _, cluster in self.dislocations.items():
-            barycenter_loc = Atoms()
-
-            #build the smoothed local line !INDEXES ARE CHANGED AT THIS POINT!
-            for k in range(len(cluster.order_line) - nb_averaging_window) : 
-                species = cluster.local_lines[cluster.order_line[k]].species
-                new_k = int(0.5*(2*k+nb_averaging_window)) if nb_averaging_window%2 == 0 else int(0.5*(2*k+nb_averaging_window)) + 1
-                all_window_positions = np.array([ cluster.local_lines[cluster.order_line[i]].center for i in range(k+1,k+1+nb_averaging_window) ])
-                av_localline_obj = LocalLine( np.mean(all_window_positions, axis=0), species)
-                
-                #debug
-                barycenter_loc.append(Atom(symbol=species, position= np.mean(all_window_positions, axis=0)))
-         
-                #smooth line is updated
-                cluster.smooth_local_lines[new_k] = av_localline_obj
-                cluster.smooth_order_line.append( cluster.order_line[new_k] )
-
-            #tmp = [key for key, val in cluster.smooth_local_lines.items()]
-            #tmp.sort()
-            #print(tmp)
-
-            #time to update every normal ...
-            shift_av = int(0.5*nb_averaging_window) if nb_averaging_window%2 == 0 else int(0.5*nb_averaging_window) + 1
-            for k in range(shift_av, len(cluster.smooth_local_lines) + shift_av - 1) :
-                local_smooth_normal = (cluster.smooth_local_lines[k+1].center - cluster.smooth_local_lines[k].center)/np.linalg.norm(cluster.smooth_local_lines[k+1].center - cluster.smooth_local_lines[k].center)
-                cluster.smooth_local_lines[k].update_normal( local_smooth_normal )
-                cluster.smooth_local_lines[k].update_norm_normal(np.linalg.norm(cluster.smooth_local_lines[k+1].center - cluster.smooth_local_lines[k].center))
-                cluster.smooth_local_lines[k].update_next(k+1)
-            
-            #last one to update ! 
-            previous_normal = cluster.smooth_local_lines[len(cluster.smooth_local_lines) -2 + shift_av].local_normal
-            previous_norm = cluster.smooth_local_lines[len(cluster.smooth_local_lines) -2 + shift_av].norm_normal
-            cluster.smooth_local_lines[len(cluster.smooth_local_lines) -1 + shift_av].update_normal( previous_normal )
-            cluster.smooth_local_lines[len(cluster.smooth_local_lines) -1 + shift_av].update_norm_normal( previous_norm )
-            cluster.smooth_local_lines[len(cluster.smooth_local_lines) -1 + shift_av].update_next(None)
-            barycenter.append(barycenter_loc)
+            barycenter.append(self._smoothing_cluster(cluster, nb_averaging_window=nb_averaging_window))
 
         return barycenter
 
+    def FindAtomsLocalLinesBatch(self, local_lines : List[LocalLine], rcut_burger : float) -> Tuple[np.ndarray, np.ndarray, np.ndarray] : 
+        """Build subsets of index of ```Atoms``` which are part of each ```LocalLine```. All radius queries 
+        are done in one batch on the (periodic) KD-tree of ```system``` and subsets are returned in CSR format : 
+        atoms of local_lines[k] are indices[indptr[k]:indptr[k+1]]
+        
+        Parameters
+        ----------
+
+        local_lines : List[```LocalLine```]
+            ```LocalLine``` to compute local ```Atoms```
+
+        rcut_burger : float 
+            Cutoff raduis for surface integration (in AA)
+
+        Returns
+        -------
+
+        np.ndarray
+            Pointer array (L+1,)
+
+        np.ndarray
+            Subset of indexes in ```Atoms``` system 
+
+        np.ndarray 
+            Maximum projected distance on local line for selected atoms (L,)
+        """
+        tree = self.get_system_tree()
+        centers = np.array([ np.asarray(line.center, dtype=float).flatten() for line in local_lines ]).reshape(-1,3)
+        directions = np.array([ np.full(3, np.nan) if line.local_normal is None else np.asarray(line.local_normal, dtype=float).flatten() 
+                                for line in local_lines ]).reshape(-1,3)
+        norms = np.array([ line.norm_normal for line in local_lines ], dtype=float)
+
+        query_centers = centers if self.box_system is None else self._wrap_positions(centers)
+        neighbours = tree.query_ball_point(query_centers, r=rcut_burger, return_sorted=True)
+        counts = np.array([ len(neigh) for neigh in neighbours ], dtype=int)
+        indices = np.concatenate([ np.asarray(neigh, dtype=int) for neigh in neighbours ] + [np.zeros(0, dtype=int)])
+        rows = np.repeat(np.arange(len(local_lines)), counts)
+
+        # minimum image displacements to the line centers
+        displacements = self.system.positions[indices] - centers[rows]
+        if self.box_system is not None : 
+            displacements -= self.box_system*np.round(displacements/self.box_system)
+        
+        projections = np.sum(displacements*directions[rows], axis=1)
+        mask = (np.sum(displacements**2, axis=1) < rcut_burger**2) & (np.abs(projections) < 0.5*norms[rows]) # projection around burger and on line
+        indices, rows, projections = indices[mask], rows[mask], projections[mask]
+
+        counts = np.bincount(rows, minlength=len(local_lines))
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        
+        # maximum pairwise projected distance is the spread of projections
+        max_distance = np.zeros(len(local_lines))
+        not_empty = counts > 0
+        if np.any(not_empty) : 
+            max_distance[not_empty] = np.maximum.reduceat(projections, indptr[:-1][not_empty]) - np.minimum.reduceat(projections, indptr[:-1][not_empty])
+
+        return indptr, indices, max_distance
+
     def FindAtomsLocalLines(self, local_line : LocalLine, rcut_burger : float) -> Tuple[List[int], float] : 
-        """Build subset of index of ```Atoms``` which are part of a given ```LocalLine```
+        """Build subset of index of ```Atoms``` which are part of a given ```LocalLine``` 
+        (see ```FindAtomsLocalLinesBatch```)
         
         Parameters
         ----------
@@ -550,28 +680,32 @@ class DislocationObject :
         float 
             Maximum projected distance on local line for selected atoms
         """
-        center_line = local_line.center
-        local_direction = local_line.local_normal
-        local_norm = local_line.norm_normal
-
-        id2keep = [id for id, atom in enumerate(self.system) 
-                    if np.sum((atom.position - center_line)**2) < rcut_burger**2 # projection around burger
-                    and np.abs(np.dot(atom.position - center_line,local_direction)) < 0.5*local_norm ] # projection on line
-        
-        pos_local = self.system[id2keep].positions
-
-        mask = np.triu(np.ones((pos_local.shape[0], pos_local.shape[0]), dtype=bool), k=1)
-        # Use broadcasting to calculate all pairwise differences
-        differences = pos_local[:, np.newaxis, :] - pos_local[np.newaxis, :, :]
-        # Apply the mask and reshape the result
-        array_rij = differences[mask]
-        if len(array_rij) == 0 : 
-            max_distance = 0.0
-        else :
-            max_distance = np.amax(np.abs(array_rij@local_direction))
-        
-        return id2keep, max_distance
+        _, indices, max_distance = self.FindAtomsLocalLinesBatch([local_line], rcut_burger)
+        return indices.tolist(), float(max_distance[0])
+
+
+    def _burger_cluster_draft(self, cluster : ClusterDislo, rcut_burger : float, nye_tensor : np.ndarray, descriptor : np.ndarray = None) -> None : 
+        """Compute the local burger vector for each point of the ```local_line``` of one ```ClusterDislo``` (see ```ComputeBurgerOnLineDraft```)"""
+        list_id_line = list(cluster.local_lines.keys())
+        indptr, indices, _ = self.FindAtomsLocalLinesBatch([cluster.local_lines[id_line] for id_line in list_id_line], rcut_burger)
+        for k, id_line in enumerate(list_id_line) : 
+            id_at2keep = indices[indptr[k]:indptr[k+1]]
 
+            weights = np.ones(len(id_at2keep))
+            if descriptor is not None :
+                subset_descriptor = descriptor[id_at2keep , :]
+                weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])   
+
+            nye_tensor_id_line = np.average( nye_tensor[id_at2keep], weights=weights*self.voro_vol[id_at2keep], axis=0 )
+            sub_convex_hull = np.sum(self.voro_vol[id_at2keep])
+
+            local_norm = cluster.local_lines[id_line].norm_normal
+            scaling_factor = min(1.0, self.neigh_factor/len(id_at2keep))
+            
+            burger_vector_line = scaling_factor*cluster.local_lines[id_line].local_normal@nye_tensor_id_line*sub_convex_hull/(0.5*local_norm)
+            cluster.local_lines[id_line].update_burger(burger_vector_line)
+
+        return 
 
     def ComputeBurgerOnLineDraft(self, rcut_burger : float, 
                                  nye_tensor : np.ndarray, 
@@ -593,24 +727,54 @@ class DislocationObject :
 
         """
         for _, cluster in self.dislocations.items():
-            for id_line in cluster.local_lines.keys() : 
-                id_at2keep, _ = self.FindAtomsLocalLines(cluster.local_lines[id_line], rcut_burger)
+            self._burger_cluster_draft(cluster, rcut_burger, nye_tensor, descriptor=descriptor)
+
+        return 
 
-                weights = np.ones(len(id_at2keep))
-                if descriptor is not None :
-                    subset_descriptor = descriptor[id_at2keep , :]
-                    weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])   
+    def _burger_cluster_smooth(self, cluster : ClusterDislo, rcut_burger : float, nye_tensor : np.ndarray, descriptor : np.ndarray = None) -> Atoms : 
+        """Compute the local burger vector for each point of the ```smooth_local_line``` of one ```ClusterDislo``` (see ```ComputeBurgerOnLineSmooth```)"""
+        
+        barycenter_loc = Atoms()
+        array_caracter = []
+        list_id_line = list(cluster.smooth_local_lines.keys())
+        indptr, indices, array_max_d = self.FindAtomsLocalLinesBatch([cluster.smooth_local_lines[id_line] for id_line in list_id_line], rcut_burger)
+        for k, id_line in enumerate(list_id_line) : 
+            id_at2keep, max_d = indices[indptr[k]:indptr[k+1]], array_max_d[k]
+            
+            weights = np.ones(len(id_at2keep))
+            if descriptor is not None :
+                subset_descriptor = descriptor[id_at2keep , :]
+                weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])   
 
-                nye_tensor_id_line = np.average( nye_tensor[id_at2keep], weights=weights*self.voro_vol[id_at2keep], axis=0 )
+            # averaging depending on the local Voronoi volume
+            try : 
+                nye_tensor_id_line = np.average( nye_tensor[id_at2keep], weights=weights*self.voro_vol[id_at2keep], axis=0 ) 
                 sub_convex_hull = np.sum(self.voro_vol[id_at2keep])
 
-                local_norm = cluster.local_lines[id_line].norm_normal
-                scaling_factor = min(1.0, self.neigh_factor/len(id_at2keep))
-                
-                burger_vector_line = scaling_factor*cluster.local_lines[id_line].local_normal@nye_tensor_id_line*sub_convex_hull/(0.5*local_norm)
-                cluster.local_lines[id_line].update_burger(burger_vector_line)
-                
-        return 
+
+                # computing burger vector from Nye tensor
+                local_norm = cluster.smooth_local_lines[id_line].norm_normal
+                scaling_factor = min(1.0, self.neigh_factor/(len(id_at2keep)))
+                burger_vector_line = scaling_factor*cluster.smooth_local_lines[id_line].local_normal@nye_tensor_id_line*sub_convex_hull/(0.5*local_norm)
+
+            except : 
+                warnings.warn(f'Something wrong with burger calculations for id_line : {id_line}')
+                local_norm = cluster.smooth_local_lines[id_line].norm_normal
+                burger_vector_line = np.zeros(3)
+            
+            #debug
+            print(burger_vector_line,'b')
+            print(cluster.smooth_local_lines[id_line].local_normal,id_line,id_at2keep,local_norm,max_d,'local')
+            cluster.smooth_local_lines[id_line].update_burger(burger_vector_line)
+
+            # debug
+            barycenter_loc.append( Atom('H', cluster.smooth_local_lines[id_line].center))
+            array_caracter.append( np.dot(burger_vector_line, cluster.smooth_local_lines[id_line].local_normal)/(np.linalg.norm(burger_vector_line)))
+
+        array_caracter_r = np.array(np.abs(array_caracter)).reshape(-1,1)
+        barycenter_loc.set_array('caracter', array_caracter_r, dtype=float)
+
+        return barycenter_loc
 
     def ComputeBurgerOnLineSmooth(self, rcut_burger : float, nye_tensor : np.ndarray, descriptor : np.ndarray = None) -> List[Atoms] : 
         """Compute the local burger vector for each point of the ```smooth_local_line```. If descriptor is not None, the 
@@ -632,45 +796,7 @@ class DislocationObject :
         
         barycenter = []
         for id_c, cluster in self.dislocations.items():
-            
-            barycenter_loc = Atoms()
-            array_caracter = []
-            for id_line in cluster.smooth_local_lines.keys() : 
-                id_at2keep, max_d = self.FindAtomsLocalLines(cluster.smooth_local_lines[id_line], rcut_burger)
-                
-                weights = np.ones(len(id_at2keep))
-                if descriptor is not None :
-                    subset_descriptor = descriptor[id_at2keep , :]
-                    weights = np.array([ np.exp(desc)/np.exp(np.sum(subset_descriptor,axis=0)) for desc in subset_descriptor ])   
-
-                # averaging depending on the local Voronoi volume
-                try : 
-                    nye_tensor_id_line = np.average( nye_tensor[id_at2keep], weights=weights*self.voro_vol[id_at2keep], axis=0 ) 
-                    sub_convex_hull = np.sum(self.voro_vol[id_at2keep])
-
-
-                    # computing burger vector from Nye tensor
-                    local_norm = cluster.smooth_local_lines[id_line].norm_normal
-                    scaling_factor = min(1.0, self.neigh_factor/(len(id_at2keep)))
-                    burger_vector_line = scaling_factor*cluster.smooth_local_lines[id_line].local_normal@nye_tensor_id_line*sub_convex_hull/(0.5*local_norm)
-
-                except : 
-                    warnings.warn(f'Something wrong with burger calculations for id_line : {id_line}')
-                    local_norm = cluster.smooth_local_lines[id_line].norm_normal
-                    burger_vector_line = np.zeros(3)
-                
-                #debug
-                print(burger_vector_line,'b')
-                print(cluster.smooth_local_lines[id_line].local_normal,id_line,id_at2keep,local_norm,max_d,'local')
-                cluster.smooth_local_lines[id_line].update_burger(burger_vector_line)
-
-                # debug
-                barycenter_loc.append( Atom('H', cluster.smooth_local_lines[id_line].center))
-                array_caracter.append( np.dot(burger_vector_line, cluster.smooth_local_lines[id_line].local_normal)/(np.linalg.norm(burger_vector_line)))
-
-            array_caracter_r = np.array(np.abs(array_caracter)).reshape(-1,1)
-            barycenter_loc.set_array('caracter', array_caracter_r, dtype=float)
-            barycenter.append(barycenter_loc)
+            barycenter.append(self._burger_cluster_smooth(cluster, rcut_burger, nye_tensor, descriptor=descriptor))
         
         return barycenter
 
@@ -835,13 +961,44 @@ class DislocationObject :
         return nye, array_neighbour, index_array, array_neighbour_ext, index_array_ext
 
 
+    def _build_cluster_dislocation(self, cluster : ClusterDislo, 
+                                   neighbour : np.ndarray, 
+                                   idx_neighbor : np.ndarray,
+                                   nye_tensor : np.ndarray,
+                                   rcut_burger : float,
+                                   scale_cluster : float,
+                                   descriptor : np.ndarray = None,
+                                   smoothing_line : dict = None) -> ClusterDislo : 
+        """Ordering, smoothing and burger vector evaluation for one ```ClusterDislo```, clusters 
+        are independent at this point (see ```BuildDislocations```)"""
+        self._ordering_cluster(cluster, neighbour, scale_cluster, descriptor=descriptor, idx_neighbor=idx_neighbor)
+        if smoothing_line is not None : 
+            self._smoothing_cluster(cluster, nb_averaging_window=smoothing_line['nb_averaging_window'])
+            self._burger_cluster_smooth(cluster, rcut_burger, nye_tensor, descriptor=descriptor)
+        else :
+            self._burger_cluster_draft(cluster, rcut_burger, nye_tensor, descriptor=descriptor)
+        
+        return cluster
+
+    def _get_worker_copy(self) -> 'DislocationObject' : 
+        """Light copy of ```DislocationObject``` sent to workers : buffer systems, convex hull and clusters are not copied"""
+        self.get_system_tree()
+        worker = copy.copy(self)
+        worker.extended_system, worker.full_system, worker.convex_hull = None, None, None
+        worker.dislocations = {}
+        return worker
+
     def BuildDislocations(self, rcut_line : float, 
                          rcut_burger : float, 
                          rcut_cluster : float,
                          scale_cluster : float,
                          descritpor : np.ndarray = None, 
-                         smoothing_line : dict = None) -> None :
-        """Full procedure method to build all the local dislocation properties...
+                         smoothing_line : dict = None,
+                         njob : int = 1) -> None :
+        """Full procedure method to build all the local dislocation properties... Once clusters are known, 
+        ordering, smoothing and burger vector evaluation of each ```ClusterDislo``` are dispatched to ```njob``` 
+        worker processes (large arrays as Nye tensor are shared as read-only memory maps) and 
+        merged back in the cluster order
         
         Parameters
         ----------
@@ -863,20 +1020,31 @@ class DislocationObject :
 
         smoothing_line : dict 
             If smoothing line is not None, smoothing procedure is used and need nb_averaging_window key (see LineSmoothing method)
+
+        njob : int 
+            Number of worker processes for the per cluster procedure
         """
 
         Nye_tensor, _, _, array_neighbour_ext, index_neighbour_ext = self.NyeTensor()
         self.BuildSamplingLine(rcut_line=rcut_line, rcut_cluster=rcut_cluster, scale_cluster=scale_cluster)
         self.StartingPointCluster()
         self.RefineSamplingLine(scale=scale_cluster)
-        self.BuildOrderingLine(array_neighbour_ext,
-                               scale_cluster, 
-                               descriptor=descritpor, 
-                               idx_neighbor=index_neighbour_ext)
-        if smoothing_line is not None : 
-            self.LineSmoothing(nb_averaging_window=smoothing_line['nb_averaging_window'])
-            self.ComputeBurgerOnLineSmooth(rcut_burger, Nye_tensor, descriptor=descritpor)
-        else :
-            self.ComputeBurgerOnLineDraft(rcut_burger, Nye_tensor, descriptor=descritpor)
+
+        list_id = list(self.dislocations.keys())
+        kwargs_cluster = {'neighbour':array_neighbour_ext,
+                          'idx_neighbor':index_neighbour_ext,
+                          'nye_tensor':Nye_tensor,
+                          'rcut_burger':rcut_burger,
+                          'scale_cluster':scale_cluster,
+                          'descriptor':descritpor,
+                          'smoothing_line':smoothing_line}
         
-        return 
+        if njob == 1 or len(list_id) < 2 : 
+            list_cluster = [ self._build_cluster_dislocation(self.dislocations[id_c], **kwargs_cluster) for id_c in list_id ]
+        else : 
+            worker = self._get_worker_copy()
+            list_cluster = Parallel(n_jobs=njob, mmap_mode='r')(delayed(worker._build_cluster_dislocation)(self.dislocations[id_c], **kwargs_cluster) 
+                                                                for id_c in list_id)
+        
+        self.dislocations = {id_c:cluster for id_c, cluster in zip(list_id, list_cluster)}
+        return
@@ -1,6 +1,8 @@
 from .gmm_metrics import GMM, GMMModel
 from .mcd_metrics import MCD, MCDModel
 from .pca_metrics import PCA_, PCAModel
-from .logistic_metric import Logistic, LogisticRegressor
+from .logistic_metric import Logistic, LogisticRegressor, stack_properties
 from .maha_metrics import Mahalanobis, MahalanobisModel
-from .meta_metrics import MetaModel
\ No newline at end of file
+from .meta_metrics import MetaModel
+from .compact_models import CompactKDE, CompactMCD, CompactGMM, CompactLogistic, CompactPCA, LazyModels, write_models_h5, read_models_h5, list_models_h5, first_model_h5, check_models_h5, is_h5_file
+from .grid_density import GridKDE
@@ -0,0 +1,424 @@
+import os
+import json
+import numpy as np
+import h5py
+
+from scipy.special import logsumexp, expit, softmax
+from collections.abc import MutableMapping
+
+from .grid_density import GridKDE
+from typing import Dict, List, Tuple, Any, Callable
+
+#######################################################
+## PARAMETERS ONLY MODELS
+#######################################################
+class CompactKDE :
+    """Gaussian kernel density estimation rebuilt from its support points.
+    Same conventions as ```sklearn.neighbors.KernelDensity``` (log density)"""
+    def __init__(self, support : np.ndarray, bandwidth : float = 1.0) -> None :
+        self.support = support.reshape(support.shape[0],-1)
+        self.bandwidth_ = bandwidth
+
+    def score_samples(self, X : np.ndarray) -> np.ndarray :
+        """Log density for each sample of X (n_sample, n_feature)"""
+        X = np.asarray(X, dtype=float).reshape(-1,self.support.shape[1])
+        nb_support, dim = self.support.shape
+        log_norm = np.log(nb_support) + dim*np.log(self.bandwidth_) + 0.5*dim*np.log(2.0*np.pi)
+
+        # chunks to keep (chunk x nb_support) matrices small
+        size_chunk = max(1, int(1e7//nb_support))
+        log_density = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], size_chunk) :
+            X_chunk = X[start:start+size_chunk]
+            square_dist = np.sum((X_chunk[:,None,:] - self.support[None,:,:])**2, axis=2)
+            log_density[start:start+size_chunk] = logsumexp(-0.5*square_dist/self.bandwidth_**2, axis=1) - log_norm
+        return log_density
+
+    def score(self, X : np.ndarray) -> float :
+        """Total log likelihood of X"""
+        return np.sum(self.score_samples(X))
+
+class CompactMCD :
+    """Robust covariance model rebuilt from location, covariance and precision"""
+    def __init__(self, location : np.ndarray, covariance : np.ndarray, precision : np.ndarray) -> None :
+        self.location_ = location
+        self.covariance_ = covariance
+        self.precision_ = precision
+
+    def mahalanobis(self, X : np.ndarray) -> np.ndarray :
+        """Squared Mahalanobis distances (same convention as ```sklearn.covariance.MinCovDet```)"""
+        X_centered = X - self.location_
+        return np.sum((X_centered@self.precision_) * X_centered, axis=1)
+
+class CompactGMM :
+    """Gaussian mixture rebuilt from weights, means, covariances and precisions"""
+    def __init__(self, weights : np.ndarray, means : np.ndarray, covariances : np.ndarray, precisions : np.ndarray) -> None :
+        self.weights_ = weights
+        self.means_ = means
+        self.covariances_ = covariances
+        self.precisions_ = precisions
+        self.n_components = len(weights)
+
+class CompactLogistic :
+    """Logistic regression rebuilt from coefficients, intercepts and classes (multinomial for more than 2 classes)"""
+    def __init__(self, coef : np.ndarray, intercept : np.ndarray, classes : np.ndarray) -> None :
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def decision_function(self, X : np.ndarray) -> np.ndarray :
+        return X@self.coef_.T + self.intercept_
+
+    def predict_proba(self, X : np.ndarray) -> np.ndarray :
+        decision = self.decision_function(X)
+        if decision.shape[1] == 1 :
+            proba = expit(decision[:,0])
+            return np.stack((1.0 - proba, proba), axis=1)
+        return softmax(decision, axis=1)
+
+    def predict(self, X : np.ndarray) -> np.ndarray :
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def score(self, X : np.ndarray, Y : np.ndarray) -> float :
+        return np.mean(self.predict(X) == Y)
+
+class CompactPCA :
+    """PCA projection rebuilt from mean, components and explained variance"""
+    def __init__(self, mean : np.ndarray, components : np.ndarray, explained_variance : np.ndarray, whiten : bool = False) -> None :
+        self.mean_ = mean
+        self.components_ = components
+        self.explained_variance_ = explained_variance
+        self.whiten = whiten
+
+    def transform(self, X : np.ndarray) -> np.ndarray :
+        X_transformed = (X - self.mean_)@self.components_.T
+        if self.whiten :
+            X_transformed /= np.sqrt(self.explained_variance_)
+        return X_transformed
+
+#######################################################
+## CONVERSION TOOLS
+#######################################################
+def _kde_to_columns(kde : Any) -> Tuple[np.ndarray, float] :
+    """Extract support points and bandwidth from sklearn or compact kde"""
+    if isinstance(kde, GridKDE) :
+        kde = kde.kde
+    if isinstance(kde, CompactKDE) :
+        return kde.support, kde.bandwidth_
+    return np.asarray(kde.tree_.data), float(getattr(kde, 'bandwidth_', kde.bandwidth))
+
+def _kde_from_columns(datasets : Dict[str,np.ndarray], attrs : Dict[str,Any], k : int) -> CompactKDE | GridKDE :
+    """Rebuild kde k (with its interpolation grid if stored)"""
+    kde = CompactKDE(datasets[f'kde_support_{k}'], attrs[f'kde_bandwidth_{k}'])
+    if f'kde_grid_{k}' in datasets :
+        return GridKDE(kde,
+                       grid=datasets[f'kde_grid_{k}'],
+                       log_pdf=datasets[f'kde_log_pdf_{k}'],
+                       max_error=attrs[f'kde_max_error_{k}'])
+    return kde
+
+def _entry_to_columns(kind : str, entry : Dict[str,Any]) -> Tuple[Dict[str,np.ndarray], Dict[str,Any]] :
+    """Convert the species entry of a model into datasets and attributes
+
+    Parameters
+    ----------
+
+    kind : str
+        Kind of model (MCD, GMM, MAHA, LOGISTIC or PCA)
+
+    entry : Dict[str,Any]
+        Species entry of the ```models``` dictionnary of the model
+
+    Returns
+    -------
+
+    Dict[str,np.ndarray]
+        Datasets to write
+
+    Dict[str,Any]
+        Attributes to write
+    """
+    datasets : Dict[str,np.ndarray] = {}
+    attrs : Dict[str,Any] = {}
+    list_kde = []
+    if kind == 'MCD' :
+        datasets['location'] = entry['mcd'].location_
+        datasets['covariance'] = entry['mcd'].covariance_
+        datasets['precision'] = entry['mcd'].precision_
+        list_kde = [entry['distribution']]
+
+    elif kind == 'MAHA' :
+        datasets['mean_vector'] = entry['mean_vector']
+        datasets['inv_covariance_matrix'] = entry['inv_covariance_matrix']
+        list_kde = [entry['distribution']]
+
+    elif kind == 'GMM' :
+        datasets['weights'] = entry['gmm'].weights_
+        datasets['means'] = entry['gmm'].means_
+        datasets['covariances'] = entry['gmm'].covariances_
+        datasets['precisions'] = entry['gmm'].precisions_
+        list_kde = entry['distribution'] if entry['distribution'] is not None else []
+
+    elif kind == 'LOGISTIC' :
+        datasets['coef'] = entry['logistic_regressor'].coef_
+        datasets['intercept'] = entry['logistic_regressor'].intercept_
+        datasets['classes'] = entry['logistic_regressor'].classes_
+        attrs['metadata'] = json.dumps(entry['metadata'])
+
+    elif kind == 'PCA' :
+        datasets['mean'] = entry['PCA'].mean_
+        datasets['components'] = entry['PCA'].components_
+        datasets['explained_variance'] = entry['PCA'].explained_variance_
+        attrs['whiten'] = bool(entry['PCA'].whiten)
+
+    else :
+        raise NotImplementedError(f'... Model type {kind} is not implemented ...')
+
+    list_kde = [kde for kde in list_kde if kde is not None]
+    attrs['nb_kde'] = len(list_kde)
+    for k, kde in enumerate(list_kde) :
+        datasets[f'kde_support_{k}'], attrs[f'kde_bandwidth_{k}'] = _kde_to_columns(kde)
+        if isinstance(kde, GridKDE) :
+            datasets[f'kde_grid_{k}'], datasets[f'kde_log_pdf_{k}'] = kde.grid, kde.log_pdf
+            attrs[f'kde_max_error_{k}'] = kde.max_error
+
+    return datasets, attrs
+
+def _entry_from_columns(kind : str, datasets : Dict[str,np.ndarray], attrs : Dict[str,Any]) -> Dict[str,Any] :
+    """Inverse of ```_entry_to_columns```, build the species entry with compact models"""
+    list_kde = [_kde_from_columns(datasets, attrs, k) for k in range(attrs['nb_kde'])]
+    if kind == 'MCD' :
+        return {'mcd':CompactMCD(datasets['location'], datasets['covariance'], datasets['precision']),
+                'distribution':list_kde[0] if len(list_kde) > 0 else None}
+
+    elif kind == 'MAHA' :
+        return {'mean_vector':datasets['mean_vector'],
+                'inv_covariance_matrix':datasets['inv_covariance_matrix'],
+                'distribution':list_kde[0] if len(list_kde) > 0 else None}
+
+    elif kind == 'GMM' :
+        return {'gmm':CompactGMM(datasets['weights'], datasets['means'], datasets['covariances'], datasets['precisions']),
+                'distribution':list_kde if len(list_kde) > 0 else None}
+
+    elif kind == 'LOGISTIC' :
+        return {'logistic_regressor':CompactLogistic(datasets['coef'], datasets['intercept'], datasets['classes']),
+                'metadata':json.loads(attrs['metadata'])}
+
+    elif kind == 'PCA' :
+        return {'PCA':CompactPCA(datasets['mean'], datasets['components'], datasets['explained_variance'], attrs['whiten'])}
+
+    else :
+        raise NotImplementedError(f'... Model type {kind} is not implemented ...')
+
+#######################################################
+## H5 STORE
+#######################################################
+def write_models_h5(path_writing : os.PathLike[str],
+                    name_model : str,
+                    kind : str,
+                    models : Dict[str,Dict[str,Any]],
+                    extra_attrs : Dict[str,Any] = {},
+                    check : bool = False) -> None :
+    """Write (or replace) one model in the columnar h5 store. Only fitted parameters are written :
+    one group per model name, one sub-group per species and one dataset per parameter
+
+    Parameters
+    ----------
+
+    path_writing : os.PathLike[str]
+        Path to the h5 store
+
+    name_model : str
+        Name of the model (group name)
+
+    kind : str
+        Kind of model (MCD, GMM, MAHA, LOGISTIC or PCA)
+
+    models : Dict[str,Dict[str,Any]]
+        ```models``` dictionnary of the model object
+
+    extra_attrs : Dict[str,Any]
+        Additional attributes for the model group
+
+    check : bool
+        Read back the model after writing and compare stored columns to models (see ```check_models_h5```),
+        this reads the whole model again and is intended for debugging
+    """
+    with h5py.File(path_writing, 'a') as h5 :
+        if name_model in h5 :
+            del h5[name_model]
+        group = h5.create_group(name_model)
+        group.attrs['kind'] = kind
+        for key, val in extra_attrs.items() :
+            group.attrs[key] = val
+
+        for species, entry in models.items() :
+            datasets, attrs = _entry_to_columns(kind, entry)
+            species_group = group.create_group(species)
+            for key, data in datasets.items() :
+                species_group.create_dataset(key, data=np.asarray(data))
+            for key, val in attrs.items() :
+                species_group.attrs[key] = val
+
+    if check :
+        check_models_h5(path_writing, name_model, kind, models)
+    return
+
+def check_models_h5(path_reading : os.PathLike[str],
+                    name_model : str,
+                    kind : str,
+                    models : Dict[str,Dict[str,Any]]) -> None :
+    """Write/read round-trip check : the stored model is read back and its columns are compared
+    to the columns of models, ValueError is raised on any difference
+
+    Parameters
+    ----------
+
+    path_reading : os.PathLike[str]
+        Path to the h5 store
+
+    name_model : str
+        Name of the model to check
+
+    kind : str
+        Kind of model (MCD, GMM, MAHA, LOGISTIC or PCA)
+
+    models : Dict[str,Dict[str,Any]]
+        Reference ```models``` dictionnary
+    """
+    kind_read, models_read, _ = read_models_h5(path_reading, name_model)
+    if kind_read != kind or set(models_read.keys()) != set(models.keys()) :
+        raise ValueError(f'... Round-trip check failed for {name_model} : kind or species differ ...')
+
+    for species, entry in models.items() :
+        datasets, attrs = _entry_to_columns(kind, entry)
+        datasets_read, attrs_read = _entry_to_columns(kind, models_read[species])
+        if datasets.keys() != datasets_read.keys() or attrs.keys() != attrs_read.keys() :
+            raise ValueError(f'... Round-trip check failed for {name_model}/{species} : missing parameters ...')
+        for key, data in datasets.items() :
+            if not np.array_equal(np.asarray(data), np.asarray(datasets_read[key])) :
+                raise ValueError(f'... Round-trip check failed for {name_model}/{species} : {key} differs ...')
+        for key, val in attrs.items() :
+            if val != attrs_read[key] :
+                raise ValueError(f'... Round-trip check failed for {name_model}/{species} : {key} differs ...')
+    return
+
+def read_models_h5(path_reading : os.PathLike[str], name_model : str) -> Tuple[str, Dict[str,Dict[str,Any]], Dict[str,Any]] :
+    """Read only one model from the columnar h5 store
+
+    Parameters
+    ----------
+
+    path_reading : os.PathLike[str]
+        Path to the h5 store
+
+    name_model : str
+        Name of the model to read
+
+    Returns
+    -------
+
+    str
+        Kind of the model
+
+    Dict[str,Dict[str,Any]]
+        ```models``` dictionnary built with compact models
+
+    Dict[str,Any]
+        Attributes of the model group
+    """
+    with h5py.File(path_reading, 'r') as h5 :
+        group = h5[name_model]
+        kind = str(group.attrs['kind'])
+        group_attrs = {key:val for key, val in group.attrs.items() if key != 'kind'}
+        models = {}
+        for species, species_group in group.items() :
+            datasets = {key:species_group[key][()] for key in species_group.keys()}
+            attrs = {key:val for key, val in species_group.attrs.items()}
+            models[species] = _entry_from_columns(kind, datasets, attrs)
+
+    return kind, models, group_attrs
+
+def is_h5_file(path : os.PathLike[str]) -> bool :
+    """Check if path is an existing h5 file"""
+    return os.path.isfile(path) and h5py.is_hdf5(path)
+
+def list_models_h5(path_reading : os.PathLike[str], kind : str = None) -> Dict[str,Dict[str,Any]] :
+    """List models stored in the h5 store without reading parameters
+
+    Parameters
+    ----------
+
+    path_reading : os.PathLike[str]
+        Path to the h5 store
+
+    kind : str
+        If not None, only models of this kind are listed
+
+    Returns
+    -------
+
+    Dict[str,Dict[str,Any]]
+        Dictionnary name -> attributes of the model group (containing at least ```kind```)
+    """
+    with h5py.File(path_reading, 'r') as h5 :
+        dic_attrs = {name:{key:val for key, val in group.attrs.items()} for name, group in h5.items()}
+
+    if kind is not None :
+        dic_attrs = {name:attrs for name, attrs in dic_attrs.items() if attrs['kind'] == kind}
+    return dic_attrs
+
+def first_model_h5(path_reading : os.PathLike[str], kind : str) -> str :
+    """Name of the first model of a given kind in the h5 store
+
+    Parameters
+    ----------
+
+    path_reading : os.PathLike[str]
+        Path to the h5 store
+
+    kind : str
+        Kind of model (MCD, GMM, MAHA, LOGISTIC or PCA)
+
+    Returns
+    -------
+
+    str
+        Name of the model
+    """
+    list_names = list(list_models_h5(path_reading, kind=kind).keys())
+    if len(list_names) == 0 :
+        raise ValueError(f'... No {kind} model in h5 store {path_reading} ...')
+    return list_names[0]
+
+class LazyModels(MutableMapping) :
+    """Dictionnary name -> model where stored models are only read at first access"""
+    def __init__(self, path_h5 : os.PathLike[str],
+                 names : List[str],
+                 builder : Callable[[os.PathLike[str], str], Any]) -> None :
+        self.path_h5 = path_h5
+        self.builder = builder
+        self.names = list(names)
+        self.loaded : Dict[str,Any] = {}
+
+    def __getitem__(self, name : str) -> Any :
+        if name not in self.loaded :
+            if name not in self.names :
+                raise KeyError(name)
+            self.loaded[name] = self.builder(self.path_h5, name)
+        return self.loaded[name]
+
+    def __setitem__(self, name : str, model : Any) -> None :
+        if name not in self.names :
+            self.names.append(name)
+        self.loaded[name] = model
+
+    def __delitem__(self, name : str) -> None :
+        self.names.remove(name)
+        self.loaded.pop(name, None)
+
+    def __iter__(self) :
+        return iter(self.names)
+
+    def __len__(self) -> int :
+        return len(self.names)
@@ -4,6 +4,9 @@ import numpy as np
 from sklearn.mixture import BayesianGaussianMixture
 from sklearn.neighbors import KernelDensity
 
+from .grid_density import GridKDE
+from .compact_models import write_models_h5, read_models_h5, first_model_h5, is_h5_file
+
 from ase import Atoms
 from typing import TypedDict, List, Dict
 
@@ -12,8 +15,10 @@ class GMM(TypedDict) :
     distribution : List[KernelDensity]
 
 class GMMModel :
-    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing') : 
-        if os.path.exists(path_pkl) : 
+    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing', name_model : str = None) : 
+        if is_h5_file(path_pkl) : 
+            self._load_h5(path_pkl, name_model)
+        elif os.path.exists(path_pkl) : 
             self._load_pkl(path_pkl)
         else : 
             self.models : Dict[str, GMM] = {}
@@ -68,7 +73,7 @@ class GMMModel :
         self.n_components = dict_gaussian['n_components']
         return 
     
-    def _fit_gmm_distribution(self, gmm_distances : np.ndarray, species : str) -> None :
+    def _fit_gmm_distribution(self, gmm_distances : np.ndarray, species : str, nb_grid : int = 4096) -> None :
         """Build KDE estimation for a given species
         
         Parameters
@@ -80,15 +85,18 @@ class GMMModel :
         species : str
             Selected species 
 
+        nb_grid : int 
+            Number of points of the interpolation grid for each density 
+
         """      
         self.models[species]['distribution'] = []
         for k in range(gmm_distances.shape[1]) : 
             mask = k == np.argmin(gmm_distances, axis = 1)
-            self.models[species]['distribution'] += [KernelDensity(kernel='gaussian')]
-            self.models[species]['distribution'][-1].fit( gmm_distances[:,k][mask].reshape(-1,1) )
+            kde = KernelDensity(kernel='gaussian').fit( gmm_distances[:,k][mask].reshape(-1,1) )
+            self.models[species]['distribution'] += [GridKDE(kde, nb_grid=nb_grid)]
         return 
     
-    def _predict_gmm_probability(self, gmm_distances : np.ndarray, species : str) -> np.ndarray : 
+    def _predict_gmm_probability(self, gmm_distances : np.ndarray, species : str, exact : bool = False) -> np.ndarray : 
         """Compute probability of a given mcd_distances vector based on MCD distances kde estimation
         
         Parameters
@@ -100,6 +108,9 @@ class GMMModel :
         species : str
             Selected species 
 
+        exact : bool 
+            If True the exact kde is used instead of the interpolation grid
+
         Returns
         -------
 
@@ -113,6 +124,8 @@ class GMMModel :
         for k in range(n_components):
             distances_k = gmm_distances[:, k].reshape(-1, 1)
             kde = self.models[species]['distribution'][k]
+            if exact and isinstance(kde, GridKDE) : 
+                kde = kde.kde
             probabilities[:, k] = kde.score_samples(distances_k)
         
         return probabilities
@@ -206,4 +219,36 @@ class GMMModel :
         """
         pkl = pickle.load(open(path_reading,'rb'))
         self.__dict__.update(pkl.__dict__)
-        return 
\ No newline at end of file
+        return
+
+    def _write_h5(self, path_writing : os.PathLike[str] = './gmm.h5') -> None : 
+        """Write only fitted parameters of ```GMMModel``` in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_writing : os.PathLike[str]
+            Writing path for h5 store (model is added or replaced under its name)
+        """
+        write_models_h5(path_writing, self.name, 'GMM', self.models,
+                        extra_attrs={'n_components':self.n_components})
+        return 
+
+    def _load_h5(self, path_reading : os.PathLike[str], name_model : str = None) -> None : 
+        """Reading ```GMMModel``` from the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_reading : os.PathLike[str] 
+            Reading path for h5 store
+
+        name_model : str 
+            Name of the model to read, if None the first GMM model of the store is read
+        """
+        if name_model is None : 
+            name_model = first_model_h5(path_reading, 'GMM')
+        _, self.models, attrs = read_models_h5(path_reading, name_model)
+        self.name = name_model
+        self.n_components = int(attrs['n_components'])
+        return 
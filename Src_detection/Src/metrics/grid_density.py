@@ -0,0 +1,143 @@
+import numpy as np
+
+from sklearn.neighbors import KernelDensity
+from typing import Any
+
+class GridKDE :
+    """1-D distance density tabulated on a fine grid. The log density of the fitted kde is
+    evaluated once on the grid and queries are linearly interpolated. The grid covers the support 
+    points padded by ```nb_bandwidth``` bandwidths (one piece per group of close support points) with a 
+    spacing of at most bandwidth/```nb_per_bandwidth```, points outside of the grid pieces are evaluated 
+    with the exact kde (fallback). If the interpolation error on the grid exceeds ```tolerance```, 
+    all queries use the exact kde. Same API as ```KernelDensity``` (log density)
+
+    Parameters
+    ----------
+
+    kde : KernelDensity | CompactKDE
+        Fitted 1-D kde
+
+    nb_grid : int
+        Number of grid points of a uniform grid over the whole support (the spacing is the 
+        smallest of this spacing and bandwidth/nb_per_bandwidth)
+
+    nb_bandwidth : float
+        Padding of the grid around the support points (in bandwidth units)
+
+    nb_per_bandwidth : float
+        Minimal number of grid points per bandwidth
+
+    tolerance : float
+        Maximum absolute error on log density for the interpolation
+
+    grid : np.ndarray
+        Precomputed grid, if None the grid is built from kde support points
+
+    log_pdf : np.ndarray
+        Precomputed log density on grid
+
+    max_error : float
+        Precomputed accuracy bound
+    """
+    def __init__(self, kde : KernelDensity | Any,
+                 nb_grid : int = 4096,
+                 nb_bandwidth : float = 6.0,
+                 nb_per_bandwidth : float = 32.0,
+                 tolerance : float = 1e-2,
+                 grid : np.ndarray = None,
+                 log_pdf : np.ndarray = None,
+                 max_error : float = None) -> None :
+        self.kde = kde
+        if grid is None :
+            grid = self._build_grid(self._get_support(kde), self._get_bandwidth(kde), nb_grid, nb_bandwidth, nb_per_bandwidth)
+            log_pdf = kde.score_samples(grid.reshape(-1,1))
+
+        self.grid = grid
+        self.log_pdf = log_pdf
+        # segments between two grid pieces
+        spacing = np.diff(grid)
+        self.gap = spacing > 1.5*np.min(spacing)
+        self.cdf = self._build_cdf(grid, log_pdf)
+        self.max_error = self._accuracy_bound() if max_error is None else max_error
+        self.tolerance = tolerance
+        self.interpolated = self.max_error <= tolerance
+        if not self.interpolated :
+            print(f'... Interpolation error of the density grid is {self.max_error:.2e}, exact kde is used ...')
+
+    @staticmethod
+    def _get_support(kde : KernelDensity | Any) -> np.ndarray :
+        if hasattr(kde, 'support') :
+            return kde.support.flatten()
+        return np.asarray(kde.tree_.data).flatten()
+
+    @staticmethod
+    def _get_bandwidth(kde : KernelDensity | Any) -> float :
+        return float(getattr(kde, 'bandwidth_', getattr(kde, 'bandwidth', 1.0)))
+
+    @staticmethod
+    def _build_grid(support : np.ndarray, bandwidth : float, nb_grid : int, nb_bandwidth : float, nb_per_bandwidth : float) -> np.ndarray :
+        """Piecewise uniform grid : one piece for each group of support points closer than 
+        2*nb_bandwidth bandwidths, pieces are separated by more than one spacing"""
+        support = np.unique(support)
+        lower = support - nb_bandwidth*bandwidth
+        upper = support + nb_bandwidth*bandwidth
+        spacing = min((upper[-1] - lower[0])/(nb_grid - 1), bandwidth/nb_per_bandwidth)
+
+        id_start = np.flatnonzero(lower[1:] > upper[:-1] + 2.0*spacing) + 1
+        starts = np.concatenate(([0], id_start))
+        ends = np.concatenate((id_start - 1, [len(support) - 1]))
+        return np.concatenate([ lower[start] + spacing*np.arange(int(np.ceil((upper[end] - lower[start])/spacing)) + 1)
+                                for start, end in zip(starts, ends) ])
+
+    @staticmethod
+    def _build_cdf(grid : np.ndarray, log_pdf : np.ndarray) -> np.ndarray :
+        """Monotone cumulative distribution on grid (trapezoidal rule)"""
+        pdf = np.exp(log_pdf - log_pdf.max())
+        cdf = np.concatenate(([0.0], np.cumsum(0.5*(pdf[1:] + pdf[:-1])*np.diff(grid))))
+        return np.maximum.accumulate(cdf/cdf[-1])
+
+    def _accuracy_bound(self) -> float :
+        """Maximum absolute error on log density between interpolation and exact kde
+        (evaluated at grid mid points)"""
+        mid_points = 0.5*(self.grid[1:] + self.grid[:-1])[~self.gap]
+        return float(np.max(np.abs(self._interpolate(mid_points) - self.kde.score_samples(mid_points.reshape(-1,1)))))
+
+    def _interpolate(self, X : np.ndarray) -> np.ndarray :
+        """Interpolated log density, exact kde outside of the grid pieces"""
+        log_density = np.interp(X, self.grid, self.log_pdf)
+        segment = np.clip(np.searchsorted(self.grid, X) - 1, 0, len(self.gap) - 1)
+        outside = (X < self.grid[0]) | (X > self.grid[-1]) | self.gap[segment]
+        if np.any(outside) :
+            log_density[outside] = self.kde.score_samples(X[outside].reshape(-1,1))
+        return log_density
+
+    def score_samples(self, X : np.ndarray, exact : bool = False) -> np.ndarray :
+        """Log density for each sample of X
+
+        Parameters
+        ----------
+
+        X : np.ndarray
+            Distances (n_sample,) or (n_sample,1)
+
+        exact : bool
+            If True the exact kde is used
+
+        Returns
+        -------
+
+        np.ndarray
+            Log density (n_sample,)
+        """
+        X = np.asarray(X, dtype=float).flatten()
+        if exact or not self.interpolated :
+            return self.kde.score_samples(X.reshape(-1,1))
+        return self._interpolate(X)
+
+    def score(self, X : np.ndarray, exact : bool = False) -> float :
+        """Total log likelihood of X"""
+        return np.sum(self.score_samples(X, exact=exact))
+
+    def cumulative(self, X : np.ndarray) -> np.ndarray :
+        """Cumulative distribution function for each sample of X"""
+        return np.interp(np.asarray(X, dtype=float).flatten(), self.grid, self.cdf, left=0.0, right=1.0)
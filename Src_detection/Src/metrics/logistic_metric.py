@@ -3,6 +3,8 @@ import pickle
 import numpy as np
 from sklearn.linear_model import LogisticRegression
 
+from .compact_models import write_models_h5, read_models_h5, first_model_h5, is_h5_file
+
 from ase import Atoms
 from typing import TypedDict, List, Dict
 
@@ -10,9 +12,29 @@ class Logistic(TypedDict) :
     logistic_regressor : LogisticRegression
     metadata : List[str]
 
+def stack_properties(list_properties : List[np.ndarray]) -> np.ndarray : 
+    """Build the feature matrix (N,F) from per atom property arrays, each array (N,...) is flattened per atom 
+    and properties are concatenated in the given order
+    
+    Parameters
+    ----------
+
+    list_properties : List[np.ndarray]
+        List of per atom arrays with the same first dimension N
+
+    Returns:
+    --------
+
+    np.ndarray 
+        Feature matrix (N,F)
+    """
+    return np.concatenate([ np.asarray(prop, dtype=float).reshape(len(prop),-1) for prop in list_properties ], axis=1)
+
 class LogisticRegressor : 
-    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing') : 
-        if os.path.exists(path_pkl) : 
+    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing', name_model : str = None) : 
+        if is_h5_file(path_pkl) : 
+            self._load_h5(path_pkl, name_model)
+        elif os.path.exists(path_pkl) : 
             self._load_pkl(path_pkl)
         else : 
             self.models : Dict[str, Logistic] = {}
@@ -89,6 +111,47 @@ class LogisticRegressor :
             Associated logistic score probabilities array (M,N_c) where N_c is the number of logistic classes
         """
         return self.models[species]['logistic_regressor'].predict_proba(array_desc)
+
+    def _get_global_classes(self) -> np.ndarray : 
+        """Sorted union of the logistic classes of all species, columns of ```_predict_logistic_batch```"""
+        return np.unique(np.concatenate([np.asarray(val['logistic_regressor'].classes_) for val in self.models.values()]))
+
+    def _predict_logistic_batch(self, symbols : List[str] | np.ndarray, array_desc : np.ndarray, size_chunk : int = 100000) -> np.ndarray : 
+        """Predict the logistic score for a whole configuration : atoms are grouped by species and 
+        each species is predicted with one matrix level call per chunk. Columns follow the global 
+        classes (see ```_get_global_classes```) : probabilities of each species model are written in the 
+        columns of its own classes and other columns are set to 0
+        
+        Parameters
+        ----------
+
+        symbols : List[str] | np.ndarray
+            Species of each atom (M,)
+
+        array_desc : np.ndarray 
+            Descriptor array (M,D)
+
+        size_chunk : int 
+            Maximum number of atoms predicted in one call (memory limit), if None all atoms 
+            of a species are predicted at once 
+
+        Returns:
+        --------
+
+        np.ndarray 
+            Associated logistic score probabilities array (M,N_c) where N_c is the number of global logistic classes
+        """
+        symbols = np.asarray(symbols)
+        global_classes = self._get_global_classes()
+        logistic_score = np.zeros((array_desc.shape[0], len(global_classes)))
+        for species in np.unique(symbols).tolist() : 
+            index_species = np.flatnonzero(symbols == species)
+            column_classes = np.searchsorted(global_classes, np.asarray(self.models[species]['logistic_regressor'].classes_))
+            size_species = len(index_species) if size_chunk is None else size_chunk
+            for start in range(0, len(index_species), size_species) : 
+                index_chunk = index_species[start:start+size_species]
+                logistic_score[np.ix_(index_chunk, column_classes)] = self._predict_logistic(species, array_desc[index_chunk])
+        return logistic_score
     
     def _write_pkl(self, path_writing : os.PathLike[str] = './mcd.pkl') -> None : 
         """Write pickle file for ```MCDModel``` object
@@ -113,4 +176,34 @@ class LogisticRegressor :
         """
         pkl = pickle.load(open(path_reading,'rb'))
         self.__dict__.update(pkl.__dict__)
-        return 
\ No newline at end of file
+        return
+
+    def _write_h5(self, path_writing : os.PathLike[str] = './logistic.h5') -> None : 
+        """Write only fitted parameters of ```LogisticRegressor``` in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_writing : os.PathLike[str]
+            Writing path for h5 store (model is added or replaced under its name)
+        """
+        write_models_h5(path_writing, self.name, 'LOGISTIC', self.models)
+        return 
+
+    def _load_h5(self, path_reading : os.PathLike[str], name_model : str = None) -> None : 
+        """Reading ```LogisticRegressor``` from the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_reading : os.PathLike[str] 
+            Reading path for h5 store
+
+        name_model : str 
+            Name of the model to read, if None the first LOGISTIC model of the store is read
+        """
+        if name_model is None : 
+            name_model = first_model_h5(path_reading, 'LOGISTIC')
+        _, self.models, attrs = read_models_h5(path_reading, name_model)
+        self.name = name_model
+        return 
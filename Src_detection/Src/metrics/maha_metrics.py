@@ -4,6 +4,8 @@ import numpy as np
 from sklearn.neighbors import KernelDensity
 
 from ..tools import timeit
+from .grid_density import GridKDE
+from .compact_models import write_models_h5, read_models_h5, first_model_h5, is_h5_file
 
 from ase import Atoms
 from typing import TypedDict, List, Dict
@@ -14,8 +16,10 @@ class Mahalanobis(TypedDict) :
     distribution : KernelDensity
 
 class MahalanobisModel : 
-    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing') : 
-        if os.path.exists(path_pkl) : 
+    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing', name_model : str = None) : 
+        if is_h5_file(path_pkl) : 
+            self._load_h5(path_pkl, name_model)
+        elif os.path.exists(path_pkl) : 
             self._load_pkl(path_pkl)
         else : 
             self.models : Dict[str, Mahalanobis] = {}
@@ -60,7 +64,7 @@ class MahalanobisModel :
         self.models[species]['inv_covariance_matrix'] = inv_covmat
         return 
     
-    def _fit_mahalanobis_distribution(self, mcd_distances : np.ndarray, species : str) -> None :
+    def _fit_mahalanobis_distribution(self, mcd_distances : np.ndarray, species : str, nb_grid : int = 4096) -> None :
         """Build KDE estimation for a given species
         
         Parameters
@@ -72,12 +76,15 @@ class MahalanobisModel :
         species : str
             Selected species 
 
+        nb_grid : int 
+            Number of points of the interpolation grid for the density 
+
         """      
-        self.models[species]['distribution'] = KernelDensity(kernel='gaussian')
-        self.models[species]['distribution'].fit(mcd_distances.reshape(len(mcd_distances),1))
+        kde = KernelDensity(kernel='gaussian').fit(mcd_distances.reshape(len(mcd_distances),1))
+        self.models[species]['distribution'] = GridKDE(kde, nb_grid=nb_grid)
         return 
     
-    def _predict_mahalanobis_probability(self, mcd_distances : np.ndarray, species : str) -> np.ndarray : 
+    def _predict_mahalanobis_probability(self, mcd_distances : np.ndarray, species : str, exact : bool = False) -> np.ndarray : 
         """Compute probability of a given mcd_distances vector based on MCD distances kde estimation
         
         Parameters
@@ -89,13 +96,19 @@ class MahalanobisModel :
         species : str
             Selected species 
 
+        exact : bool 
+            If True the exact kde is used instead of the interpolation grid
+
         Returns
         -------
 
         np.ndarray : 
             Probability vector
         """     
-        return self.models[species]['distribution'].score(mcd_distances.reshape(len(mcd_distances),1))
+        distribution = self.models[species]['distribution']
+        if exact and isinstance(distribution, GridKDE) : 
+            distribution = distribution.kde
+        return distribution.score(mcd_distances.reshape(len(mcd_distances),1))
 
     def _get_mahalanobis_distance(self, list_atoms : List[Atoms], species : str) -> List[Atoms] :
         """Compute mcd distances based for a given species and return updated Atoms objected with new array : mcd-distance
@@ -159,4 +172,34 @@ class MahalanobisModel :
         """
         pkl = pickle.load(open(path_reading,'rb'))
         self.__dict__.update(pkl.__dict__)
-        return
\ No newline at end of file
+        return
+
+    def _write_h5(self, path_writing : os.PathLike[str] = './mahalanobis.h5') -> None : 
+        """Write only fitted parameters of ```MahalanobisModel``` in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_writing : os.PathLike[str]
+            Writing path for h5 store (model is added or replaced under its name)
+        """
+        write_models_h5(path_writing, self.name, 'MAHA', self.models)
+        return 
+
+    def _load_h5(self, path_reading : os.PathLike[str], name_model : str = None) -> None : 
+        """Reading ```MahalanobisModel``` from the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_reading : os.PathLike[str] 
+            Reading path for h5 store
+
+        name_model : str 
+            Name of the model to read, if None the first MAHA model of the store is read
+        """
+        if name_model is None : 
+            name_model = first_model_h5(path_reading, 'MAHA')
+        _, self.models, attrs = read_models_h5(path_reading, name_model)
+        self.name = name_model
+        return 
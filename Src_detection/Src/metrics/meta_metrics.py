@@ -1,19 +1,53 @@
 import numpy as np
 import os
+import json
 import pickle
 
 from .gmm_metrics import GMM, GMMModel
 from .maha_metrics import Mahalanobis, MahalanobisModel
 from .mcd_metrics import MCD, MCDModel
+from .compact_models import write_models_h5, list_models_h5, is_h5_file, LazyModels
 
 from ..tools import timeit
 
 from ase import Atoms
 from typing import List, Dict, Any
 
+def squared_mahalanobis_block(X : np.ndarray, location : np.ndarray, precision : np.ndarray) -> np.ndarray : 
+    """Squared Mahalanobis distances for a block of descriptors. The precision matrix is factorised 
+    (P = L L^T) so that distances are the squared norms of (X - location) L, evaluated with one matrix product. 
+    Precision matrices which are not positive definite (pseudo-inverse) use the explicit quadratic form
+
+    Parameters
+    ----------
+
+    X : np.ndarray
+        Descriptor block (N,D)
+
+    location : np.ndarray
+        Center of the distribution (D,)
+
+    precision : np.ndarray
+        Precision matrix (D,D)
+
+    Returns
+    -------
+
+    np.ndarray
+        Squared distances (N,)
+    """
+    X_centered = X - location.reshape(1,-1)
+    try : 
+        cholesky_precision = np.linalg.cholesky(precision)
+        return np.sum((X_centered@cholesky_precision)**2, axis=1)
+    except np.linalg.LinAlgError : 
+        return np.sum((X_centered@precision)*X_centered, axis=1)
+
 class MetaModel : 
     def __init__(self, path_pkl : os.PathLike[str] = 'Nothing') : 
-        if os.path.exists(path_pkl) : 
+        if is_h5_file(path_pkl) : 
+            self._load_h5(path_pkl)
+        elif os.path.exists(path_pkl) : 
             self._load_pkl(path_pkl)
         else : 
             self.meta : Dict[str, GMMModel | MahalanobisModel | MCDModel] = {}
@@ -98,8 +132,9 @@ class MetaModel :
     def _fit_distribution(self, distances : np.ndarray, 
                           name_model : str,
                           kind : str,
-                          species : str) -> None :
-        """Build KDE estimation for a given species
+                          species : str,
+                          nb_grid : int = 4096) -> None :
+        """Build KDE estimation for a given species, the density is tabulated on an interpolation grid
         
         Parameters
         ----------
@@ -110,25 +145,32 @@ class MetaModel :
         species : str
             Selected species 
 
+        nb_grid : int 
+            Number of points of the interpolation grid
+
         """      
 
         self._sanity_check(kind)
         if kind == 'GMM' : 
             self.meta[name_model]._fit_gmm_distribution(distances,
-                                                        species)
+                                                        species,
+                                                        nb_grid=nb_grid)
         elif kind == 'MCD' :
             self.meta[name_model]._fit_mcd_distribution(distances,
-                                                        species) 
+                                                        species,
+                                                        nb_grid=nb_grid) 
         elif kind == 'MAHA' : 
             self.meta[name_model]._fit_mahalanobis_distribution(distances,
-                                                                species)
+                                                                species,
+                                                                nb_grid=nb_grid)
 
         return 
     
     def _predict_probability(self, distances : np.ndarray, 
                           name_model : str,
                           kind : str,
-                          species : str) -> np.ndarray : 
+                          species : str,
+                          exact : bool = False) -> np.ndarray : 
         """Compute probability of a given mcd_distances vector based on MCD distances kde estimation
         
         Parameters
@@ -140,6 +182,9 @@ class MetaModel :
         species : str
             Selected species 
 
+        exact : bool 
+            If True the exact kde is used instead of the interpolation grid
+
         Returns
         -------
 
@@ -149,26 +194,84 @@ class MetaModel :
 
         self._sanity_check(kind)
         if kind == 'GMM' : 
-            return self.meta[name_model]._predict_gmm_probability(distances, species)
+            return self.meta[name_model]._predict_gmm_probability(distances, species, exact=exact)
         
         elif kind == 'MCD' :
-            return self.meta[name_model]._predict_mcd_probability(distances, species)
+            return self.meta[name_model]._predict_mcd_probability(distances, species, exact=exact)
+        
+        elif kind == 'MAHA' : 
+            return self.meta[name_model]._predict_mahalanobis_probability(distances, species, exact=exact)
+
+
+    def _get_statistical_distances_array(self, desc_block : np.ndarray, 
+                                         name_model : str,
+                                         kind : str,
+                                         species : str) -> np.ndarray :
+        """Compute statistical distances for a block of descriptors in one batch
+        
+        Parameters
+        ----------
+
+        desc_block : np.ndarray
+            Descriptor block (N,D)
+
+        name_model : str
+            Name of the model
+
+        kind : str
+            Kind of model (GMM, MCD or MAHA)
+
+        species : str
+            Species associated to the descriptors
+
+        Returns:
+        --------
+
+        np.ndarray
+            Distances (N,) for MCD and MAHA, (N,n_component) for GMM
+        """
+        self._sanity_check(kind)
+        model = self.meta[name_model]
+
+        if kind == 'GMM' :
+            gmm = model.models[species]['gmm']
+            distances = np.empty((desc_block.shape[0], gmm.means_.shape[0]))
+            for k in range(distances.shape[1]) : 
+                distances[:,k] = squared_mahalanobis_block(desc_block, gmm.means_[k,:], gmm.precisions_[k,:,:])
+            distances = np.where(distances <= 0.0, 0.0, np.sqrt(distances))
         
+        elif kind == 'MCD' :
+            mcd = model.models[species]['mcd']
+            distances = squared_mahalanobis_block(desc_block, mcd.location_, mcd.precision_)
+            distances = np.sqrt(np.where(distances < 0.0, 0.0, distances))
+
         elif kind == 'MAHA' : 
-            return self.meta[name_model]._predict_mahalanobis_probability(distances, species)
+            distances = squared_mahalanobis_block(desc_block, 
+                                                  model.models[species]['mean_vector'][:,0], 
+                                                  model.models[species]['inv_covariance_matrix'])
+            distances = np.sign(distances) * np.sqrt(np.abs(distances))
 
+        return distances
 
     def _get_statistical_distances(self, list_atoms : List[Atoms], 
                                   name_model : str,
                                   kind : str,
                                   species : str) -> List[Atoms] :
-        """Compute mcd distances based for a given species and return updated Atoms objected with new array : mcd-distance
+        """Compute statistical distances for a given species and return updated Atoms objects with new array : 
+        mcd-distance, gmm-distance or mahalanobis-distance. Descriptors of all configurations are concatenated 
+        into one block, distances are evaluated in one batch and scattered back by offsets 
         
         Parameters
         ----------
 
         list_atoms : List[Atoms]
-            List of Atoms objects where mcd distance will be computed
+            List of Atoms objects where distances will be computed
+
+        name_model : str
+            Name of the model
+
+        kind : str
+            Kind of model (GMM, MCD or MAHA)
 
         species : str
             Species associated to list_atoms
@@ -178,23 +281,24 @@ class MetaModel :
         --------
 
         List[Atoms]
-            Updated List of Atoms with the new array "mcd-distance"
+            Updated List of Atoms with the new distance array
         """
         
         self._sanity_check(kind)
-        if kind == 'GMM' :
-            return self.meta[name_model]._get_gmm_distance(list_atoms,
-                                                           species)
-        
-        elif kind == 'MCD' :
-            return self.meta[name_model]._get_mcd_distance(list_atoms,
-                                                           species)
+        if len(list_atoms) == 0 : 
+            return list_atoms
 
-        elif kind == 'MAHA' : 
-            return self.meta[name_model]._get_mahalanobis_distance(list_atoms,
-                                                                   species)  
+        offsets = np.cumsum([0] + [len(atoms) for atoms in list_atoms])
+        desc_block = np.concatenate([atoms.get_array('milady-descriptors') for atoms in list_atoms], axis=0)
+        distances = self._get_statistical_distances_array(desc_block, name_model, kind, species)
+        name_array = {'GMM':'gmm-distance', 'MCD':'mcd-distance', 'MAHA':'mahalanobis-distance'}[kind]
+        name_array = f'{name_array}-{self.meta[name_model].name}'
+
+        for id_atoms, atoms in enumerate(list_atoms) : 
+            atoms.set_array(name_array, distances[offsets[id_atoms]:offsets[id_atoms+1]], dtype=float)
+
+        return list_atoms
 
-    
     def _write_pkl(self, path_writing : os.PathLike[str] = './meta_models.pkl') -> None : 
         """Write pickle file for ```MCDModel``` object
         
@@ -218,4 +322,45 @@ class MetaModel :
         """
         pkl = pickle.load(open(path_reading,'rb'))
         self.__dict__.update(pkl.__dict__)
-        return
\ No newline at end of file
+        return
+
+    def _write_h5(self, path_writing : os.PathLike[str] = './meta_models.h5') -> None : 
+        """Write only fitted parameters of all models in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_writing : os.PathLike[str]
+            Writing path for h5 store
+        """
+        for name_model, model in self.meta.items() : 
+            extra_attrs = {'meta_data':json.dumps(self.meta_data.get(name_model), default=str)}
+            if self.meta_kind[name_model] == 'GMM' : 
+                extra_attrs['n_components'] = model.n_components
+            write_models_h5(path_writing, name_model, self.meta_kind[name_model], model.models, extra_attrs=extra_attrs)
+        return 
+
+    def _load_h5(self, path_reading : os.PathLike[str]) -> None : 
+        """Reading models from the columnar h5 store. Parameters of each model are 
+        only read when the model is used for the first time
+        
+        Parameters
+        ----------
+
+        path_reading : os.PathLike[str] 
+            Reading path for h5 store
+        """
+        implemented_models = {'GMM':GMMModel, 'MCD':MCDModel, 'MAHA':MahalanobisModel}
+        dic_attrs = {name:attrs for name, attrs in list_models_h5(path_reading).items() 
+                     if attrs['kind'] in implemented_models.keys()}
+        
+        def build_model(path_h5 : os.PathLike[str], name_model : str) -> GMMModel | MahalanobisModel | MCDModel : 
+            model = implemented_models[self.meta_kind[name_model]]()
+            model._load_h5(path_h5, name_model)
+            return model
+
+        self.meta_kind = {name:str(attrs['kind']) for name, attrs in dic_attrs.items()}
+        self.meta_data = {name:json.loads(attrs['meta_data']) if 'meta_data' in attrs else None 
+                          for name, attrs in dic_attrs.items()}
+        self.meta = LazyModels(path_reading, list(dic_attrs.keys()), build_model)
+        return
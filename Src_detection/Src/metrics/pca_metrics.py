@@ -3,6 +3,8 @@ import pickle
 import numpy as np
 from sklearn.decomposition import PCA
 
+from .compact_models import write_models_h5, read_models_h5, first_model_h5, is_h5_file
+
 from ase import Atoms
 from typing import TypedDict, List, Dict
 
@@ -10,8 +12,10 @@ class PCA_(TypedDict) :
     PCA : PCA
 
 class PCAModel :
-    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing') : 
-        if os.path.exists(path_pkl) : 
+    def __init__(self, path_pkl : os.PathLike[str] = 'Nothing', name_model : str = None) : 
+        if is_h5_file(path_pkl) : 
+            self._load_h5(path_pkl, name_model)
+        elif os.path.exists(path_pkl) : 
             self._load_pkl(path_pkl)
         else : 
             self.models : Dict[str, PCA_] = {}
@@ -30,11 +34,14 @@ class PCAModel :
         self.name = name 
         return 
 
-    def _get_pca_model(self, list_atoms : List[Atoms], species : str, n_component : int = 2) -> np.ndarray : 
-        """Build PCA model from data"""
+    def _get_pca_model(self, list_atoms : List[Atoms] | np.ndarray, species : str, n_component : int = 2) -> np.ndarray : 
+        """Build PCA model from data (list of Atoms or descriptor array)"""
         self.models[species] = {'PCA':None}
         self.models[species]['PCA'] = PCA(n_components=n_component)
-        descriptors_array = np.concatenate([ atoms.get_array('milady-descriptors') for atoms in list_atoms ], axis=0)
+        if isinstance(list_atoms, np.ndarray) : 
+            descriptors_array = list_atoms
+        else : 
+            descriptors_array = np.concatenate([ atoms.get_array('milady-descriptors') for atoms in list_atoms ], axis=0)
         return self.models[species]['PCA'].fit_transform(descriptors_array)
     
     def _write_pkl(self, path_writing : os.PathLike[str] = './mcd.pkl') -> None : 
@@ -60,4 +67,34 @@ class PCAModel :
         """
         pkl = pickle.load(open(path_reading,'rb'))
         self.__dict__.update(pkl.__dict__)
-        return 
\ No newline at end of file
+        return
+
+    def _write_h5(self, path_writing : os.PathLike[str] = './pca.h5') -> None : 
+        """Write only fitted parameters of ```PCAModel``` in the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_writing : os.PathLike[str]
+            Writing path for h5 store (model is added or replaced under its name)
+        """
+        write_models_h5(path_writing, self.name, 'PCA', self.models)
+        return 
+
+    def _load_h5(self, path_reading : os.PathLike[str], name_model : str = None) -> None : 
+        """Reading ```PCAModel``` from the columnar h5 store
+        
+        Parameters
+        ----------
+
+        path_reading : os.PathLike[str] 
+            Reading path for h5 store
+
+        name_model : str 
+            Name of the model to read, if None the first PCA model of the store is read
+        """
+        if name_model is None : 
+            name_model = first_model_h5(path_reading, 'PCA')
+        _, self.models, attrs = read_models_h5(path_reading, name_model)
+        self.name = name_model
+        return 
@@ -1,11 +1,212 @@
+import os
+import re
 import numpy as np
 import mmap
 
+from collections import OrderedDict
 from ase.io import read 
-from typing import List, Tuple
+from ase.units import GPa
+from typing import List, Tuple, Dict, Any
 
 dic_el = {"H":1.008,"He":4.003,"Li":6.941,"Be":9.012,"B":10.811,"C":12.011,"N ":14.007,"O":15.999,"F":18.998,"Ne":20.180,"Na":22.990,"Mg":24.305,"Al":26.982,"Si":28.086,"P":30.974,"S":32.065,"Cl":35.453,"Ar":39.948,"K":39.098,"Ca":40.078,"Sc":44.956,"Ti":47.867,"V":50.942,"Cr":51.996,"Mn":54.938,"Fe":55.845,"Co":58.933,"Ni":58.693,"Cu":63.546,"Zn":65.390,"Ga":69.723,"Ge":72.640,"As":74.922,"Se":78.960,"Br":79.904,"Kr":83.800,"Rb":85.468,"Sr":87.620,"Y":88.906,"Zr":91.224,"Nb":92.906,"Mo":95.940,"Tc":98.000,"Ru":101.070,"Rh":102.906,"Pd":106.420,"Ag":107.868,"Cd":112.411,"In":114.818,"Sn":118.710,"Sb":121.760,"Te":127.600,"I":126.905,"Xe":131.293,"Cs":132.906,"Ba":137.327,"La":138.906,"Ce":140.116,"Pr":140.908,"Nd":144.240,"Pm":145.000,"Sm":150.360,"Eu":151.964,"Gd":157.250,"Tb":158.925,"Dy":162.500,"Ho":164.930,"Er":167.259,"Tm":168.934,"Yb":173.040,"Lu":174.967,"Hf":178.490,"Ta":180.948,"W":183.840,"Re":186.207,"Os":190.230,"Ir":192.217,"Pt":195.078,"Au":196.967,"Hg":200.590,"Tl":204.383,"Pb":207.200,"Bi":208.980,"Po":209.000,"At":210.000,"Rn":222.000,"Fr":223.000,"Ra":226.000,"Ac":227.000,"Th":232.038,"Pa":231.036,"U ":238.029,"Np":237.000,"Pu":244.000,"Am":243.000,"Cm":247.000,"Bk":247.000,"Cf":251.000,"Es":252.000,"Fm":257.000,"Md":258.000,"No":259.000,"Lr":262.000,"Rf":261.000,"Db":262.000,"Sg":266.000,"Bh":264.000,"Hs":277.000,"Mt":268.000}
 
+
+class OutcarIndex :
+    """Single pass index of a VASP OUTCAR file.
+
+    The OUTCAR is scanned once through ``mmap`` to record the byte offsets of
+    every block needed by the getters of this module (cell, positions/forces,
+    stress, magnetisation and energies) for each completed ionic step. 
+    Quantities of a given ionic step are only parsed (and then cached) when they 
+    are requested, so that extracting energy, forces, stress and magnetisation 
+    from a large relaxation costs one scan plus a few small reads. Parsing 
+    conventions follow the ASE OUTCAR reader (units, stress ordering, ``energy`` 
+    extrapolated to sigma -> 0).
+
+    Parameters
+    ----------
+
+    outVASP : str 
+        Path to the VASP OUTCAR file
+
+    """
+    _markers = re.compile(rb'POTCAR:|ions per type|Iteration|direct lattice vectors|POSITION          |in kB |number of electron[^\n]*magnetization|magnetization \(x\)|FREE ENERGIE OF THE ION-ELECTRON SYSTEM')
+
+    def __init__(self, outVASP : str) -> None :
+        self.path = outVASP
+        self.species : List[str] = []
+        self.ions_per_type : List[int] = []
+        self.steps : List[Dict[str,int]] = []
+        self._cache : Dict[int,Dict[str,Any]] = {}
+        self._scan()
+
+    def _scan(self) -> None :
+        """Build the offsets table of the OUTCAR in one pass"""
+        with open(self.path,'rb') as f :
+            if os.fstat(f.fileno()).st_size == 0 :
+                return
+            m = mmap.mmap(f.fileno(),0,prot=mmap.PROT_READ)
+            try :
+                in_header = True
+                current_step : Dict[str,int] = {}
+                for match in self._markers.finditer(m) :
+                    key = match.group(0)
+                    if in_header :
+                        if key == b'POTCAR:' :
+                            self.species.append(self._read_species(m, match.start()))
+                        elif key == b'ions per type' :
+                            self.ions_per_type = [int(n) for n in self._line_at(m, match.start()).split()[4:]]
+                        elif key == b'Iteration' :
+                            in_header = False
+                        continue
+
+                    if key == b'Iteration' : 
+                        continue
+                    elif key == b'FREE ENERGIE OF THE ION-ELECTRON SYSTEM' :
+                        current_step['energy'] = match.start()
+                        self.steps.append(current_step)
+                        current_step = {}
+                    elif key.startswith(b'number of electron') :
+                        current_step['magmom'] = match.start()
+                    else :
+                        current_step[key.decode().strip()] = match.start()
+            finally :
+                m.close()
+
+        # POTCAR lines are written twice in the header
+        self.species = self.species[:sum(divmod(len(self.species),2))]
+
+    @staticmethod
+    def _line_at(m : mmap.mmap, offset : int) -> str :
+        """Return the full line containing offset"""
+        start = m.rfind(b'\n',0,offset) + 1
+        end = m.find(b'\n',offset)
+        return m[start:end if end > -1 else len(m)].decode()
+
+    @staticmethod
+    def _read_species(m : mmap.mmap, offset : int) -> str :
+        """Extract element symbol from a POTCAR line of the OUTCAR header"""
+        line = OutcarIndex._line_at(m, offset)
+        parts = line.split()
+        sym = parts[1] if '1/r potential' in line else parts[2]
+        return ''.join([s for s in sym.split('_')[0] if s.isalpha()])
+
+    def _lines_from(self, f, offset : int, nb_lines : int) -> List[str] :
+        """Read nb_lines lines starting from the line containing offset"""
+        f.seek(offset)
+        return [f.readline().decode() for _ in range(nb_lines)]
+
+    def is_valid(self) -> bool :
+        """Return True if the file is a readable OUTCAR with at least one complete ionic step"""
+        return len(self.steps) > 0 and len(self.ions_per_type) == len(self.species) > 0
+
+    @property
+    def natoms(self) -> int :
+        return sum(self.ions_per_type)
+
+    @property
+    def symbols(self) -> List[str] :
+        return [sym for n, sym in zip(self.ions_per_type,self.species) for _ in range(n)]
+
+    def get_step(self, step : int = -1) -> Dict[str,Any] :
+        """Materialise (and cache) all the quantities of a given ionic step
+
+        Parameters
+        ----------
+
+        step : int
+            Index of the ionic step (default is the last one)
+
+        Returns
+        -------
+
+        Dict[str,Any]
+            Dictionnary containing cell, positions, forces, stress, magmom, magmoms, 
+            free_energy and energy (when present in the OUTCAR)
+
+        """
+        step = range(len(self.steps))[step]
+        if step in self._cache :
+            return self._cache[step]
+
+        offsets = self.steps[step]
+        natoms = self.natoms
+        data : Dict[str,Any] = {}
+        with open(self.path,'rb') as f :
+            if 'direct lattice vectors' in offsets :
+                lines = self._lines_from(f, offsets['direct lattice vectors'], 4)
+                data['cell'] = np.array([[float(x) for x in l.split()[0:3]] for l in lines[1:]])
+
+            if 'POSITION' in offsets :
+                lines = self._lines_from(f, offsets['POSITION'], natoms + 2)
+                pos_forces = np.array([[float(x) for x in l.split()[0:6]] for l in lines[2:]])
+                data['positions'], data['forces'] = pos_forces[:,:3], pos_forces[:,3:]
+
+            if 'in kB' in offsets :
+                stress = [float(x) for x in self._lines_from(f, offsets['in kB'], 1)[0].split()[2:]]
+                data['stress'] = -np.array(stress)[[0, 1, 2, 4, 5, 3]] * 1e-1 * GPa
+
+            if 'magmom' in offsets :
+                line = self._lines_from(f, offsets['magmom'], 1)[0].split()
+                magmom = line[line.index('magnetization') + 1:]
+                data['magmom'] = float(magmom[0]) if len(magmom) == 1 else np.array([float(x) for x in magmom])
+
+            if 'magnetization (x)' in offsets :
+                lines = self._lines_from(f, offsets['magnetization (x)'], natoms + 4)
+                data['magmoms'] = np.array([float(l.split()[-1]) for l in lines[4:]])
+
+            lines = self._lines_from(f, offsets['energy'], 5)
+            data['free_energy'] = float(lines[2].split()[4])
+            data['energy'] = float(lines[4].split()[6])
+
+        self._cache[step] = data
+        return data
+
+    def get_volume(self, step : int = -1) -> float :
+        return abs(np.linalg.det(self.get_step(step)['cell']))
+
+
+# least recently used indexes are dropped above this size
+max_outcar_indexes = 32
+_outcar_indexes : OrderedDict[str,Tuple[Tuple[float,int],OutcarIndex]] = OrderedDict()
+
+def GetOutcarIndex(outVASP : str) -> OutcarIndex | None :
+    """Return the (cached) OutcarIndex of a VASP output file. The index is rebuilt 
+    only if the file has been modified since the last scan, at most ```max_outcar_indexes```
+    indexes (the most recently used) are kept in cache
+    
+    Parameters
+    ----------
+
+    outVASP : str 
+        Path to the VASP output file 
+
+    Returns
+    -------
+
+    OutcarIndex | None
+        Index of the file, None if the file is not an OUTCAR (e.g. POSCAR)
+
+    """
+    path = os.path.realpath(outVASP)
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+    if path in _outcar_indexes and _outcar_indexes[path][0] == key :
+        index = _outcar_indexes[path][1]
+        _outcar_indexes.move_to_end(path)
+    else :
+        try :
+            index = OutcarIndex(path)
+        except (ValueError, IndexError) :
+            return None
+        _outcar_indexes[path] = (key, index)
+        _outcar_indexes.move_to_end(path)
+        while len(_outcar_indexes) > max_outcar_indexes :
+            _outcar_indexes.popitem(last=False)
+
+    return index if index.is_valid() else None
+
+
 def GetElementsFromVasp(VASP_file : str) -> Tuple[List[str],List[int]] :
     """Get the element list and number from VASP
     
@@ -25,15 +226,18 @@ def GetElementsFromVasp(VASP_file : str) -> Tuple[List[str],List[int]] :
         Corresponding number of element in the system
 
     """
-    ase_object = read(VASP_file)
-    full_list_el = [s for s in ase_object.symbols]
+    index = GetOutcarIndex(VASP_file)
+    if index is not None :
+        full_list_el = index.symbols
+    else :
+        full_list_el = [s for s in read(VASP_file).symbols]
     dic_el = {}
     for el in full_list_el : 
         if el in dic_el.keys() : 
             dic_el[el] += 1
         
         else :
-            dic_el[el] = 0
+            dic_el[el] = 1
 
     return [key for key in dic_el], [dic_el[key] for key in dic_el]
 
@@ -54,8 +258,10 @@ def GetMagnetisation(outVASP : str) -> np.ndarray :
         Magentisation vector
 
     """
-    ase_object = read(outVASP)
-    return ase_object.get_magnetic_moment()
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        return index.get_step()['magmom']
+    return read(outVASP).get_magnetic_moment()
 
 
 def CheckConvergence(outVASP : str) -> Tuple[bool,bool]:
@@ -105,8 +311,10 @@ def GetEnergyFromVasp(outVASP : str) -> float :
         Energy of the system
 
     """  
-    ase_object = read(outVASP)
-    return ase_object.get_potential_energy()
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        return index.get_step()['energy']
+    return read(outVASP).get_potential_energy()
 
 
 
@@ -126,8 +334,10 @@ def GetNatomFromVasp(outVASP : str) :
         Number of atom in the system
 
     """  
-    ase_object = read(outVASP)
-    return ase_object.positions.shape[0]
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        return index.natoms
+    return read(outVASP).positions.shape[0]
 
 
 def ForcesAndPosFromVasp(outVASP : str) -> Tuple[np.ndarray, np.ndarray]:
@@ -149,6 +359,10 @@ def ForcesAndPosFromVasp(outVASP : str) -> Tuple[np.ndarray, np.ndarray]:
         Force array of the system
 
     """  
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        data = index.get_step()
+        return data['positions'], data['forces']
     ase_object = read(outVASP)
     return ase_object.positions, ase_object.get_forces()
 
@@ -169,8 +383,10 @@ def GetStressFromVASP(outVASP : str) -> np.ndarray :
         Stress matrix
 
     """  
-    ase_object = read(outVASP)
-    return ase_object.get_stress()
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        return index.get_step()['stress']
+    return read(outVASP).get_stress()
 
 
 def GetVolumeFromVASP(outVASP : str) -> float :
@@ -189,8 +405,10 @@ def GetVolumeFromVASP(outVASP : str) -> float :
         Volume of the system
 
     """  
-    ase_object = read(outVASP)
-    return ase_object.get_volume()
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        return index.get_volume()
+    return read(outVASP).get_volume()
 
 
 def WritePoscarMilady(outVASP : str, path : str) -> None :
@@ -207,12 +425,17 @@ def WritePoscarMilady(outVASP : str, path : str) -> None :
     
     """    
     list_el, nb_at = GetElementsFromVasp(outVASP)
-    ase_object = read(outVASP)
-    energy = ase_object.get_potential_energy()
-    cell = ase_object.cell[:]
-    pos = ase_object.positions
-    forces = ase_object.get_forces()
-    stress = ase_object.get_stress()
+    index = GetOutcarIndex(outVASP)
+    if index is not None :
+        data = index.get_step()
+        energy, cell, pos, forces, stress = data['energy'], data['cell'], data['positions'], data['forces'], data['stress']
+    else :
+        ase_object = read(outVASP)
+        energy = ase_object.get_potential_energy()
+        cell = ase_object.cell[:]
+        pos = ase_object.positions
+        forces = ase_object.get_forces()
+        stress = ase_object.get_stress()
 
     w_poscar = open(path,'w')
     first_line = '111 %2d '%(len(list_el))
@@ -4,6 +4,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from scipy.linalg import null_space
+from scipy.optimize import linprog
+from scipy.spatial import HalfspaceIntersection, ConvexHull
 
 from typing import List, Dict, Tuple, TypedDict
 
@@ -17,6 +19,12 @@ class DictIntersection(TypedDict) :
     intersection_point : np.ndarray
     inter_2D : None | np.ndarray
 
+class DictStabilityDomain(TypedDict) : 
+    vertices : np.ndarray
+    barycenter : np.ndarray
+    volume : float
+    boundaries : Dict[str,np.ndarray]
+
 
 class IntersectionObject : 
     """Initialisation of the intersection object"""
@@ -469,6 +477,263 @@ def RecursiveMuGrid(list_vect : List[np.ndarray], list_id : List[int], dimension
 
 
 
+def BuildMuGrid(dic_bounds_slab : Dict[str,List[float]], discr_per_mu : int = 100, indexing : str = 'ij') -> List[np.ndarray] : 
+    """Build the N-multidimensionnal chemical potential grid with meshgrid
+    
+    Parameters 
+    ----------
+
+    dic_bounds_slab : Dict[str,List[float]]
+        Bounds of each chemical potential for a given slab system
+
+    discr_per_mu : int 
+        Number of discretisation point on each dimension of the chemical potential grid
+
+    indexing : str 
+        Indexing convention of np.meshgrid ('xy' is used for 2D plots)
+
+    Returns 
+    -------
+
+    List[np.ndarray]
+        List of N arrays of shape (discr_per_mu,...,discr_per_mu) containing each chemical potential coordinate 
+    """
+    list_discret_vector = [ np.linspace(bounds[0],bounds[1],num=discr_per_mu) for bounds in dic_bounds_slab.values() ]
+    return np.meshgrid(*list_discret_vector, indexing=indexing)
+
+
+def ComputeStableHyperplaneGrid(list_normal_vect : List[np.ndarray], mu_grid : List[np.ndarray], vector_constraint : np.ndarray, size_chunk : int = 10000000) -> Tuple[np.ndarray,np.ndarray] : 
+    """Find the hyperplane with the lowest surface energy on a full chemical potential grid. Surface energies of all slabs 
+    are evaluated as one matrix product (by chunks of grid points) and points outside of the chemical potential domain 
+    are masked
+    
+    Parameters 
+    ----------
+
+    list_normal_vect : List[np.ndarray]
+        List of normal vectors (\mu_1, ..., \mu_N, gamma, offset) of each slab 
+
+    mu_grid : List[np.ndarray]
+        Chemical potential grid (see ```BuildMuGrid```)
+
+    vector_constraint : np.ndarray 
+        Normal vector for definition domain, points with (\mu, 1).vector_constraint < 0 are excluded
+
+    size_chunk : int 
+        Maximum number of (grid point, slab) surface energies evaluated at once
+
+    Returns 
+    -------
+
+    np.ndarray 
+        Index of the lowest surface energy slab for each grid point (-1 outside of the domain)
+
+    np.ndarray 
+        Lowest surface energy for each grid point (nan outside of the domain)
+    """
+    shape_grid = mu_grid[0].shape
+    mu_points = np.stack([mu.ravel() for mu in mu_grid], axis=1)
+    matrix_normal = np.array([vect[:-2] for vect in list_normal_vect])
+    offset_normal = np.array([vect[-1] for vect in list_normal_vect])
+    in_domain = mu_points@vector_constraint[:-1] + vector_constraint[-1] >= 0.0
+
+    id_stable = np.full(mu_points.shape[0], -1, dtype=int)
+    gamma_stable = np.full(mu_points.shape[0], np.nan)
+    id_domain = np.flatnonzero(in_domain)
+    size_block = max(1, size_chunk//len(list_normal_vect))
+    for start in range(0, len(id_domain), size_block) : 
+        id_block = id_domain[start:start+size_block]
+        gamma_block = np.abs(mu_points[id_block]@matrix_normal.T + offset_normal)
+        id_stable[id_block] = np.argmin(gamma_block, axis=1)
+        gamma_stable[id_block] = gamma_block[np.arange(len(id_block)), id_stable[id_block]]
+
+    return id_stable.reshape(shape_grid), gamma_stable.reshape(shape_grid)
+
+
+
+def BuildDomainHalfspaces(dic_bounds_slab : Dict[str,List[float]], vector_constraint : np.ndarray) -> np.ndarray : 
+    """Build the half-spaces A \mu + b <= 0 of the chemical potential domain (bounds and constraint on removed element)
+    
+    Parameters 
+    ----------
+
+    dic_bounds_slab : Dict[str,List[float]]
+        Bounds of each chemical potential for a given slab system
+
+    vector_constraint : np.ndarray 
+        Normal vector for definition domain, the domain is (\mu, 1).vector_constraint >= 0
+
+    Returns 
+    -------
+
+    np.ndarray 
+        Half-spaces [A, b] with scipy convention (M,N+1)
+    """
+    dimension = len(dic_bounds_slab)
+    list_halfspaces = []
+    for id_mu, bounds in enumerate(dic_bounds_slab.values()) : 
+        unit_vector = np.zeros(dimension)
+        unit_vector[id_mu] = 1.0
+        list_halfspaces.append(np.r_[-unit_vector, bounds[0]])
+        list_halfspaces.append(np.r_[unit_vector, -bounds[1]])
+    list_halfspaces.append(-np.asarray(vector_constraint, dtype=float))
+    return np.array(list_halfspaces)
+
+
+def ChebyshevCenter(halfspaces : np.ndarray) -> Tuple[np.ndarray,float] : 
+    """Find the center of the largest ball inside the polytope A \mu + b <= 0 (linear programming)
+    
+    Parameters 
+    ----------
+
+    halfspaces : np.ndarray 
+        Half-spaces [A, b] with scipy convention (M,N+1)
+
+    Returns 
+    -------
+
+    np.ndarray 
+        Center of the ball (None if the polytope is empty)
+
+    float 
+        Radius of the ball (0.0 if the polytope is empty)
+    """
+    A, b = halfspaces[:,:-1], halfspaces[:,-1]
+    norm_A = np.linalg.norm(A, axis=1).reshape(-1,1)
+    cost = np.zeros(A.shape[1]+1)
+    cost[-1] = -1.0
+    bounds = [(None,None) for _ in range(A.shape[1])] + [(0.0,None)]
+    solution = linprog(cost, A_ub=np.hstack((A, norm_A)), b_ub=-b, bounds=bounds, method='highs')
+    if solution.status != 0 : 
+        return None, 0.0
+    return solution.x[:-1], solution.x[-1]
+
+
+def ComputeStabilityDomains(list_slab : List[str], dic_vect : Dict[str,np.ndarray], dic_bounds_slab : Dict[str,List[float]], vector_constraint : np.ndarray, tolerance : float = 1e-9) -> Dict[str,DictStabilityDomain] : 
+    """Compute exactly the stability domain of each slab as the part of the chemical potential domain where its surface 
+    energy gamma_k(\mu) = (a_k.\mu + d_k)/c_k is the lowest one (lower envelope of affine functions). Each domain is a convex 
+    polytope given by the half-space intersection of domain half-spaces and gamma_k - gamma_j <= 0 for all other slabs, 
+    boundaries between two domains are the facets where gamma_k = gamma_j. Surface energies are assumed to be positive on 
+    the domain so that gamma_k = |a_k.\mu + d_k| as in ```ComputeStableHyperplaneGrid``` (c_k = 1 in normal vector files)
+    
+    Parameters 
+    ----------
+
+    list_slab : List[str]
+        List of slab systems to compare
+
+    dic_vect : Dict[str,np.ndarray]
+        Dictionnary containing all normal vectors associated to slab systems (a_k, c_k, d_k) = (\mu_1, ..., \mu_N, gamma, offset)
+
+    dic_bounds_slab : Dict[str,List[float]]
+        Bounds of each chemical potential
+
+    vector_constraint : np.ndarray 
+        Normal vector for definition domain, the domain is (\mu, 1).vector_constraint >= 0
+
+    tolerance : float 
+        Numerical tolerance for empty domains and boundary vertices
+
+    Returns 
+    -------
+
+    Dict[str,DictStabilityDomain]
+        Stability domain of each stable slab : vertices (ordered in 2D), barycenter, volume (area in 2D) 
+        and vertices of the boundary with each neighbouring slab
+    """
+    dimension = len(dic_bounds_slab)
+    gamma_slope = np.array([dic_vect[slab][:-2]/dic_vect[slab][-2] for slab in list_slab])
+    gamma_offset = np.array([dic_vect[slab][-1]/dic_vect[slab][-2] for slab in list_slab])
+    domain_halfspaces = BuildDomainHalfspaces(dic_bounds_slab, vector_constraint)
+    scale = max(1.0, np.amax(np.abs(domain_halfspaces)))
+
+    dic_domains : Dict[str,DictStabilityDomain] = {}
+    for k, slab in enumerate(list_slab) : 
+        envelope_halfspaces = np.hstack((gamma_slope[k] - gamma_slope, (gamma_offset[k] - gamma_offset).reshape(-1,1)))
+        envelope_halfspaces = np.delete(envelope_halfspaces, k, axis=0)
+        # identical slopes : the slab is either never or always below the other one
+        flat = np.linalg.norm(envelope_halfspaces[:,:-1], axis=1) < tolerance
+        if np.any(envelope_halfspaces[flat,-1] > tolerance) : 
+            continue
+        halfspaces = np.vstack((domain_halfspaces, envelope_halfspaces[~flat]))
+
+        interior_point, radius = ChebyshevCenter(halfspaces)
+        if interior_point is None or radius < tolerance*scale : 
+            continue
+
+        if dimension == 1 : 
+            slope, offset = halfspaces[:,0], halfspaces[:,1]
+            vertices = np.array([[np.amax(-offset[slope < 0.0]/slope[slope < 0.0])], 
+                                 [np.amin(-offset[slope > 0.0]/slope[slope > 0.0])]])
+            volume = float(vertices[1,0] - vertices[0,0])
+            barycenter = np.mean(vertices, axis=0)
+        else : 
+            vertices = HalfspaceIntersection(halfspaces, interior_point).intersections
+            hull = ConvexHull(vertices)
+            vertices = vertices[hull.vertices]
+            volume = float(hull.volume)
+            if dimension == 2 : 
+                # ordered polygon : area weighted barycenter
+                next_vertices = np.roll(vertices, -1, axis=0)
+                cross = vertices[:,0]*next_vertices[:,1] - next_vertices[:,0]*vertices[:,1]
+                barycenter = np.sum((vertices + next_vertices)*cross.reshape(-1,1), axis=0)/(3.0*np.sum(cross))
+            else : 
+                barycenter = np.mean(vertices, axis=0)
+
+        boundaries : Dict[str,np.ndarray] = {}
+        for j, other_slab in enumerate(list_slab) : 
+            if j == k : 
+                continue
+            difference = vertices@(gamma_slope[k] - gamma_slope[j]) + gamma_offset[k] - gamma_offset[j]
+            on_boundary = np.abs(difference) < tolerance*scale*max(1.0, np.linalg.norm(gamma_slope[k] - gamma_slope[j]))
+            if np.sum(on_boundary) >= dimension : 
+                boundaries[other_slab] = vertices[on_boundary]
+
+        dic_domains[slab] = {'vertices':vertices, 'barycenter':barycenter, 'volume':volume, 'boundaries':boundaries}
+
+    return dic_domains
+
+
+def CheckStabilityDomains(dic_domains : Dict[str,DictStabilityDomain], list_slab : List[str], dic_vect : Dict[str,np.ndarray], vector_constraint : np.ndarray) -> bool : 
+    """Check exact stability domains against ```ComputeStableHyperplaneGrid``` : the lowest surface energy slab 
+    at the barycenter of each domain has to be the slab of the domain
+    
+    Parameters 
+    ----------
+
+    dic_domains : Dict[str,DictStabilityDomain]
+        Stability domains (see ```ComputeStabilityDomains```)
+
+    list_slab : List[str]
+        List of compared slab systems
+
+    dic_vect : Dict[str,np.ndarray]
+        Dictionnary containing all normal vectors associated to slab systems (\mu_1, ..., \mu_N, gamma, offset)
+
+    vector_constraint : np.ndarray 
+        Normal vector for definition domain, the domain is (\mu, 1).vector_constraint >= 0
+
+    Returns 
+    -------
+
+    bool 
+        True if all domains agree with the grid evaluation
+    """
+    if len(dic_domains) == 0 : 
+        return True
+
+    list_domain = list(dic_domains.keys())
+    barycenters = np.array([dic_domains[slab]['barycenter'] for slab in list_domain])
+    id_stable, _ = ComputeStableHyperplaneGrid([dic_vect[slab] for slab in list_slab], list(barycenters.T), vector_constraint)
+    consistent = True
+    for slab, id_slab in zip(list_domain, id_stable) : 
+        if id_slab < 0 or list_slab[id_slab] != slab : 
+            print('... Stability domain of %s is not consistent with the grid evaluation ...'%(slab))
+            consistent = False
+    return consistent
+
+
+
 class DictStability(TypedDict) : 
     compt : float
     stat : float
@@ -494,6 +759,27 @@ class MostStableSurface :
         else : 
             self.dic[slab]['compt'] += 1.0
 
+    #########################################################
+    def update_dic_array(self, list_slab : List[str], id_stable : np.ndarray) -> None : 
+        """Updating dictionnary for slab counting from an array of slab index (negative index are ignored)
+        
+        Parameters 
+        ----------
+
+        list_slab : List[str]
+            Name of the slab systems
+
+        id_stable : np.ndarray
+            Index of the stable slab for each grid point
+        """
+        counts = np.bincount(id_stable[id_stable >= 0], minlength=len(list_slab))
+        for id_slab in np.flatnonzero(counts) : 
+            slab = list_slab[id_slab]
+            if not slab in self.dic.keys() : 
+                self.dic[slab] = {'compt':float(counts[id_slab]),'stat':None}
+            else : 
+                self.dic[slab]['compt'] += float(counts[id_slab])
+
     #########################################################
     def sum_all(self) -> int : 
         """Sum everything !"""
@@ -538,29 +824,13 @@ def RelativeStabilityOnGrid(dic_bounds : Dict[str,Dict[str,List[float]]], list_s
         Number of discretisation point on each dimension of the chemical potential grid
     """
 
-    list_normal_vect = []
-    for slab in list_slab : 
-        list_normal_vect.append(dic_vect[slab])
-
-    list_discret_vector = []
-    for mu_el in dic_bounds[list_slab[0]].keys() :
-        vector_bound_mu = np.linspace(dic_bounds[list_slab[0]][mu_el][0],dic_bounds[list_slab[0]][mu_el][1],num=discr_per_mu)
-        list_discret_vector.append(vector_bound_mu)
-
-    mu_grid = []
-    RecursiveMuGrid(len(list_discret_vector),0,list_discret_vector,[],mu_grid)
+    list_normal_vect = [dic_vect[slab] for slab in list_slab]
+    mu_grid = BuildMuGrid(dic_bounds[list_slab[0]], discr_per_mu=discr_per_mu)
 
     """the mu grid is now built :)"""
+    id_stable, _ = ComputeStableHyperplaneGrid(list_normal_vect, mu_grid, dic_constraint[list_slab[0]][1])
     stable_object = MostStableSurface()
-    for coord_mu in mu_grid :
-        mu_check_constraint = np.asarray([el for el in coord_mu] + [1.0])
-        coord_mu = np.asarray([el for el in coord_mu] + [0.0])
-        vector_constraint = dic_constraint[list_slab[0]][1]
-        if mu_check_constraint@vector_constraint < 0.0 : 
-            continue 
-        else :
-            nearest_plane, _ = ComputeNearestHyperplane(list_slab,list_normal_vect,coord_mu) 
-            stable_object.update_dic(nearest_plane)
+    stable_object.update_dic_array(list_slab, id_stable)
     
     stable_object.proba_stability() 
 
@@ -603,34 +873,12 @@ def RelativeStabilityOnGrid2DPlot(dic_bounds : Dict[str,Dict[str,List[float]]],
         Filled IntersectionObject
 
     """
-    list_normal_vect = []
-    for slab in list_slab : 
-        list_normal_vect.append(dic_vect[slab])
-
-    list_discret_vector = []
-    for mu_el in dic_bounds[list_slab[0]].keys() :
-        vector_bound_mu = np.linspace(dic_bounds[list_slab[0]][mu_el][0],dic_bounds[list_slab[0]][mu_el][1],num=discr_per_mu)
-        list_discret_vector.append(vector_bound_mu)
-    
-    grid_gamma = np.zeros((discr_per_mu,discr_per_mu))
-    MU_1, MU_2 = np.meshgrid(list_discret_vector[0],list_discret_vector[1])
-
+    list_normal_vect = [dic_vect[slab] for slab in list_slab]
+    MU_1, MU_2 = BuildMuGrid(dic_bounds[list_slab[0]], discr_per_mu=discr_per_mu, indexing='xy')
 
     """the mu grid is now built :)"""
-    nearest_plane_list = []
-
-    for id1 in range(discr_per_mu) :
-        for id2 in range(discr_per_mu) :
-            coord_mu = np.asarray([MU_1[id1,id2], MU_2[id1,id2]] + [0.0])
-
-            vector_constraint = dic_constraint[list_slab[0]][1]
-            if np.asarray([MU_1[id1,id2], MU_2[id1,id2]] + [1.0])@vector_constraint < 0.0 : 
-                grid_gamma[id1,id2] = None
-
-            else : 
-                nearest_plane, distance = ComputeNearestHyperplane(list_slab,list_normal_vect,coord_mu) 
-                grid_gamma[id1,id2] = distance
-                nearest_plane_list.append([nearest_plane,[id1,id2]])
+    id_stable, grid_gamma = ComputeStableHyperplaneGrid(list_normal_vect, [MU_1, MU_2], dic_constraint[list_slab[0]][1])
+    nearest_plane_list = [ [list_slab[id_stable[id1,id2]],[id1,id2]] for id1, id2 in np.argwhere(id_stable >= 0) ]
 
     """building od different slab list stabilty"""
     different_slab = []
@@ -670,7 +918,11 @@ def PlotProjectionHyperplaneInto2D(file_to_read : str, slab_to_plot : List[str],
     dic_vect, dic_mu, dic_bounds, dic_constraint = ReadFileNormalVector(file_to_read)
     name = [key for key in dic_mu.keys()][0]
 
-    gamma, mu1, mu2, inter_object = RelativeStabilityOnGrid2DPlot(dic_bounds,slab_to_plot,dic_vect,dic_constraint,grid_mu)
+    list_normal_vect = [dic_vect[slab] for slab in slab_to_plot]
+    mu1, mu2 = BuildMuGrid(dic_bounds[slab_to_plot[0]], discr_per_mu=grid_mu, indexing='xy')
+    _, gamma = ComputeStableHyperplaneGrid(list_normal_vect, [mu1, mu2], dic_constraint[slab_to_plot[0]][1])
+    dic_domains = ComputeStabilityDomains(slab_to_plot, dic_vect, dic_bounds[slab_to_plot[0]], dic_constraint[slab_to_plot[0]][1])
+    CheckStabilityDomains(dic_domains, slab_to_plot, dic_vect, dic_constraint[slab_to_plot[0]][1])
     
     gamma = np.ma.masked_invalid(gamma)
     ax.patch.set(color='grey', edgecolor='grey',zorder=1000)
@@ -681,23 +933,19 @@ def PlotProjectionHyperplaneInto2D(file_to_read : str, slab_to_plot : List[str],
     
     plt.contourf(mu1,mu2,gamma,1000,cmap=Cmap1)
 
-    if not inter_object.dic_intersection['empty'] : 
-        for key_inter in inter_object.dic_intersection.keys() : 
-            if key_inter != 'empty' : 
-                intersection_point = inter_object.dic_intersection[key_inter]['intersection_point']
-                line2D = inter_object.dic_intersection[key_inter]['inter_2D']
-                if intersection_point is not None :
-                    mu2_line0 = intersection_point[1] - line2D[0]/line2D[1]*intersection_point[0]
-                    mu1_line = mu1[0,:]
-                    mu2_line = mu2_line0 + line2D[0]/line2D[1]*mu1_line
-                    mu1_line_patch, mu2_line_patch = inter_object.apply_constraint(mu1_line,mu2_line,key_inter.split('@')[0])
-                    plt.plot(mu1_line_patch,mu2_line_patch,linestyle='dashed',color='black',zorder=10)
-                else : 
-                    print('I have troube to find an intersection point (%s) for relativty stabiltiy :('%(key_inter))
-
+    """exact boundaries between stability domains (each boundary is drawn once)"""
+    list_stable = list(dic_domains.keys())
+    for id_slab, slab in enumerate(list_stable) : 
+        for other_slab, boundary in dic_domains[slab]['boundaries'].items() : 
+            if other_slab in list_stable[:id_slab] : 
+                continue
+            direction = boundary - boundary[0]
+            projection = direction@direction[np.argmax(np.linalg.norm(direction, axis=1))]
+            segment = boundary[[np.argmin(projection), np.argmax(projection)]]
+            plt.plot(segment[:,0],segment[:,1],linestyle='dashed',color='black',zorder=10)
 
-    for key_plane in inter_object.dic_plane.keys() : 
-        bary_plane = inter_object.dic_plane[key_plane]['bary']
+    for key_plane in dic_domains.keys() : 
+        bary_plane = dic_domains[key_plane]['barycenter']
         name_slab = r'$\mathcal{M}_{[%s]}^{%s}$'%(key_plane.split('_')[0],key_plane[-1])
         plt.text(bary_plane[0],bary_plane[1],name_slab,fontsize=14,horizontalalignment='center',verticalalignment='center')
 
@@ -1,5 +1,7 @@
 import os
+import mmap
 from .ExtractAllFromVASP import *
+from ..tools.tools import ScanDirectories
 
 from typing import List
 
@@ -78,7 +80,7 @@ def RecursiveCheck(path : str, list : List[str], file2find : str = 'OUTCAR') ->
 
 
 
-def RecursiveChecker(root_dir_check : str, log_file : str, file2find : str = 'OUTCAR') -> List[str] :
+def RecursiveChecker(root_dir_check : str, log_file : str, file2find : str = 'OUTCAR', index_file : str = None) -> List[str] :
     """Recursively check the convergence of all calculations directory and return the list of unconverged
     directory
     
@@ -94,6 +96,10 @@ def RecursiveChecker(root_dir_check : str, log_file : str, file2find : str = 'OU
     file2find : str
         Name of the file to find 
 
+    index_file : str
+        Path to the json index of the tree (see ```ScanDirectories```), if None 
+        the tree is fully traversed with the recursive serial scheme
+
     Returns 
     -------
 
@@ -105,9 +111,8 @@ def RecursiveChecker(root_dir_check : str, log_file : str, file2find : str = 'OU
         os.system('rm %s'%(log_file))
 
     WritingLog('ini',log_file)
-    list_path_outcar = []
+    list_path_outcar = RecursiveBuilder(root_dir_check,file2find,index_file=index_file)
     list_non_converged_outcar = []
-    RecursiveCheck(root_dir_check,list_path_outcar,file2find)
 
     for path_outcar in list_path_outcar :
         log_text = 'Directory %s ==> '%(path_outcar)
@@ -139,7 +144,7 @@ def RecursiveChecker(root_dir_check : str, log_file : str, file2find : str = 'OU
     return list_non_converged_outcar
 
 
-def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR') -> List[str] :
+def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR', index_file : str = None, nb_workers : int = None) -> List[str] :
     """Build recursively the list of all file2find paths
     
     Parameters 
@@ -151,6 +156,13 @@ def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR') -> List[s
     file2find : str
         Name of the file to find   
 
+    index_file : str
+        Path to the json index of the tree (see ```ScanDirectories```), if None 
+        the tree is fully traversed with the recursive serial scheme
+
+    nb_workers : int 
+        Number of threads used for the concurrent scan when index_file is given
+
     Returns 
     -------
 
@@ -158,6 +170,9 @@ def RecursiveBuilder(root_dir_check : str, file2find : str = 'OUTCAR') -> List[s
         List of all file2find paths
 
     """
+    if index_file is not None : 
+        return [path for path, _ in ScanDirectories(root_dir_check, file2find=file2find, index_file=index_file, nb_workers=nb_workers)]
+
     list_path_outcar = []
     RecursiveCheck(root_dir_check,list_path_outcar,file2find)
 
@@ -183,12 +198,13 @@ def FindPattern(file : str, pattern : str) -> bool :
         True if the pattern is found and False otherwise
 
     """
-    bool = False
-    r = open(file,'r').readlines()
-    for l in r :
-        if pattern in l :
-            bool = True
-            break
+    if os.path.getsize(file) == 0 :
+        return False
+
+    with open(file,'rb') as f :
+        m = mmap.mmap(f.fileno(),0,prot=mmap.PROT_READ)
+        bool = m.find(pattern.encode()) > -1
+        m.close()
 
     return bool
 
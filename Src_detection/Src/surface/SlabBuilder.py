@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.spatial import cKDTree
 from .SurfaceRemesh import SurfaceRemesher
 
 # ase time + pymatgen
@@ -12,7 +13,8 @@ try:
 except ImportError:
     raise ImportError('No pymatgen :( I can not continue')
 
-from typing import List, Tuple, TypedDict
+from typing import List, Tuple, TypedDict, Dict
+from joblib import Parallel, delayed
 
 dic_radius = {'Ac': 1.95, 'Ag': 1.6, 'Al': 1.25, 'Am': 1.75, 'Ar': 0.71, 'As': 1.15, 'At': 'no data', 'Au': 1.35, 'B': 0.85, 'Ba': 2.15, 'Be': 1.05, 'Bi': 1.6, 'Bk': 'no data', 'Br': 1.15, 'C': 0.7, 'Ca': 1.8, 'Cd': 1.55, 'Ce': 1.85, 'Cf': 'no data', 'Cl': 1.0, 'Cm': 'no data', 'Co': 1.35, 'Cr': 1.4, 'Cs': 2.6, 'Cu': 1.35, 'Dy': 1.75, 'Er': 1.75, 'Es': 'no data', 'Eu': 1.85, 'F': 0.5, 'Fe': 1.4, 'Fm': 'no data', 'Fr': 'no data', 'Ga': 1.3, 'Gd': 1.8, 'Ge': 1.25, 'H': 0.25, 'He': 'no data', 'Hf': 1.55, 'Hg': 1.5, 'Ho': 1.75, 'I': 1.4, 'In': 1.55, 'Ir': 1.35, 'K': 2.2, 'Kr': 'no data', 'La': 1.95, 'Li': 1.45, 'Lr': 'no data', 'Lu': 1.75,
               'Md': 'no data', 'Mg': 1.5, 'Mn': 1.4, 'Mo': 1.45, 'N': 0.65, 'Na': 1.8, 'Nb': 1.45, 'Nd': 1.85, 'Ne': 'no data', 'Ni': 1.35, 'No': 'no data', 'Np': 1.75, 'O': 0.6, 'Os': 1.3, 'P': 1.0, 'Pa': 1.8, 'Pb': 1.8, 'Pd': 1.4, 'Pm': 1.85, 'Po': 1.9, 'Pr': 1.85, 'Pt': 1.35, 'Pu': 1.75, 'Ra': 2.15, 'Rb': 2.35, 'Re': 1.35, 'Rh': 1.35, 'Rn': 'no data', 'Ru': 1.3, 'S': 1.0, 'Sb': 1.45, 'Sc': 1.6, 'Se': 1.15, 'Si': 1.1, 'Sm': 1.85, 'Sn': 1.45, 'Sr': 2.0, 'Ta': 1.45, 'Tb': 1.75, 'Tc': 1.35, 'Te': 1.4, 'Th': 1.8, 'Ti': 1.4, 'Tl': 1.9, 'Tm': 1.75, 'U': 1.75, 'V': 1.35, 'W': 1.35, 'Xe': 'no data', 'Y': 1.8, 'Yb': 1.75, 'Zn': 1.35, 'Zr': 1.55}
@@ -170,7 +172,57 @@ def CompositionFromBulk(file: str) -> List[str]:
     return composition
 
 
-def BuildCompositionDistanceVectorSlab(composition: List[str], slab: Atoms, terminaison='haut', tolerance=1e-2, sym_check: DictSym = {'bool':False,'replica':1, 'rcut':3.0}, alpha_list: List[float] = None, remesher: DictRemesh = {'bool': False, 'rcut': 0.0, 'beta': 1.0}) -> Tuple[List[float], List[float], List[Atom]]:
+def ComputeRadialDescriptor(list_position: np.ndarray, cell: np.ndarray, sym_check: DictSym, alpha_list: List[float] = None) -> List[float]:
+    """Compute the radial descriptor of a termination from in-plane positions. All pairs closer than 
+    sym_check['rcut'] are found once with a KDTree and the same distance array is used for all alpha powers
+
+    Parameters
+    ----------
+
+    list_position : np.ndarray
+        In-plane positions of the atoms in the terminaison (N,2)
+
+    cell : np.ndarray
+        In-plane cell of the slab (2,2)
+
+    sym_check : Dict[bool,List[float]]
+        Dictionnary to build replication in order to take into account periodic boundary condition
+        List contains number of replica and rcut for descriptor in AA
+
+    alpha_list : List[float]
+        List of alpha power for radial descriptor of termination
+
+    Returns
+    -------
+
+    List[float]
+        List that gives sum of interatomic distances in the terminaison for each power (first element is alpha = 1)
+    """
+    rcut = sym_check['rcut']
+    if sym_check['bool']:
+        repli = sym_check['replica']
+        range_replica = np.arange(-int((repli-1)/2), int((repli-1)/2)+1)
+        shifts = np.array([[e1, e2] for e1 in range_replica for e2 in range_replica])@cell
+        list_position_neighbour = (list_position[:, np.newaxis, :] + shifts[np.newaxis, :, :]).reshape(-1, 2)
+    else:
+        list_position_neighbour = list_position
+
+    list_neighbour = cKDTree(list_position_neighbour).query_ball_point(list_position, rcut)
+    id_i = np.repeat(np.arange(len(list_position)), [len(neigh) for neigh in list_neighbour])
+    id_j = np.fromiter((idx for neigh in list_neighbour for idx in neigh), dtype=int, count=len(id_i))
+    distances = np.linalg.norm(list_position[id_i] - list_position_neighbour[id_j], axis=1)
+    distances = distances[distances < rcut]
+
+    # normalisation : number of pairs in the cutoff with replica, N_tot(terminaison)^2 otherwise
+    normalisation = len(distances) if sym_check['bool'] else len(list_position)**2
+    sum_distance = [float(np.sum(distances))]
+    if alpha_list is not None:
+        sum_distance += [float(np.sum(distances**alpha)) for alpha in alpha_list]
+
+    return [el/normalisation for el in sum_distance]
+
+
+def BuildCompositionDistanceVectorSlab(composition: List[str], slab: Atoms, terminaison='haut', tolerance=1e-2, sym_check: DictSym = {'bool':False,'replica':1, 'rcut':3.0}, alpha_list: List[float] = None, remesher: DictRemesh = {'bool': False, 'rcut': 0.0, 'beta': 1.0}, active_atoms: np.ndarray = None) -> Tuple[List[float], List[float], List[Atom]]:
     """Build 2 vectors for one of the terminaison of the slab (you can choose the terminaison by
     changing terminaison key word : haut and bas)
     - list_compo ==> is a list that gives the composition of each element (N_el(terminaison)/N_tot(terminaison))
@@ -204,6 +256,9 @@ def BuildCompositionDistanceVectorSlab(composition: List[str], slab: Atoms, term
     remesher : DictRemesh 
         Dictionnary containing data for remeshing on rough surfaces
 
+    active_atoms : np.ndarray
+        Boolean mask of atoms of the slab to consider, if None all atoms are considered
+
     Returns
     -------
 
@@ -219,29 +274,25 @@ def BuildCompositionDistanceVectorSlab(composition: List[str], slab: Atoms, term
         List of Atom objects corresponding to the atoms in the terminaison        
 
     """
+    positions = slab.get_positions()
+    if active_atoms is None:
+        active_atoms = np.ones(len(slab), dtype=bool)
+
     extremum_z_position = None
     if terminaison == 'haut':
-        extremum_z_position = np.amax(slab.get_positions()[:, 2])
+        extremum_z_position = np.amax(positions[active_atoms, 2])
     if terminaison == 'bas':
-        extremum_z_position = np.amin(slab.get_positions()[:, 2])
-
-    list_compo: List[float] = [0.0 for k in range(len(composition))]
-    list_position: List[float] = []
-    list_atom_surface: List[Atom] = []
+        extremum_z_position = np.amin(positions[active_atoms, 2])
 
-    sum_compo = 0.0
-    if alpha_list is None:
-        sum_distance = 0.0
-    else:
-        sum_distance = [0.0 for k in range(len(alpha_list)+1)]
+    id_surface = np.flatnonzero(active_atoms & (np.abs(positions[:, 2] - extremum_z_position) < tolerance))
+    symbols_surface = np.array(slab.get_chemical_symbols())[id_surface]
+    list_atom_surface: List[Atom] = [slab[idx] for idx in id_surface]
+    list_position = positions[id_surface, :2]
 
-    for atom in slab:
-        if abs(atom.position[2] - extremum_z_position) < tolerance:
-            el_atom = atom.symbol
-            sum_compo += 1
-            list_compo[composition.index(el_atom)] += 1
-            list_position.append(atom.position[:2])
-            list_atom_surface.append(atom)
+    sum_compo = float(len(id_surface))
+    list_compo: List[float] = [0.0 for k in range(len(composition))]
+    for el_atom, count in zip(*np.unique(symbols_surface, return_counts=True)):
+        list_compo[composition.index(el_atom)] += float(count)
 
     if remesher['bool']:
         local_remesh = SurfaceRemesher(list_atom_surface, remesher['rcut'])
@@ -250,59 +301,8 @@ def BuildCompositionDistanceVectorSlab(composition: List[str], slab: Atoms, term
         if card_remesh > 0:
             list_atom_surface = list_atom_surface_remesh
 
-    """build the replicated position to take into account translation symmetries"""
-
-    if sym_check['bool']:
-        cell = slab.cell[:2, :2]
-        list_position_replicated = []
-        repli = sym_check['replica']
-        rcut = sym_check['rcut']
-        for proj_pos in list_position:
-            for e1 in range(-int((repli-1)/2), int((repli-1)/2)+1):
-                for e2 in range(-int((repli-1)/2), int((repli-1)/2)+1):
-                    list_position_replicated.append(
-                        proj_pos + (np.asarray([e1, e2]))@cell)
-
-        list_compo = [el/sum_compo for el in list_compo]
-        compt = 0
-        for pos_i in list_position:
-            for pos_j in list_position_replicated:
-                if np.linalg.norm(pos_i-pos_j) < rcut:
-                    if alpha_list is None:
-                        sum_distance += np.linalg.norm(pos_i-pos_j)
-                    else:
-                        sum_distance[0] += np.linalg.norm(pos_i-pos_j)
-                        for id_alpha, alpha in enumerate(alpha_list):
-                            sum_distance[id_alpha +
-                                         1] += np.linalg.norm(pos_i-pos_j)**alpha
-                    compt += 1
-
-        if alpha_list is None:
-            sum_distance *= 1.0/compt
-            sum_distance: List[float] = [sum_distance]
-        else:
-            sum_distance: List[float] = [
-                el/float(compt) for el in sum_distance]
-
-    else:
-        list_compo = [el/sum_compo for el in list_compo]
-        for pos_i in list_position:
-            for pos_j in list_position:
-                if np.linalg.norm(pos_i-pos_j) < rcut:
-                    if alpha_list is None:
-                        sum_distance += np.linalg.norm(pos_i-pos_j)
-                    else:
-                        sum_distance[0] += np.linalg.norm(pos_i-pos_j)
-                        for id_alpha, alpha in enumerate(alpha_list):
-                            sum_distance[id_alpha +
-                                         1] += np.linalg.norm(pos_i-pos_j)**alpha
-
-        if alpha_list is None:
-            sum_distance *= 1.0/(len(list_position)**2)
-            sum_distance: List[float] = [sum_distance]
-        else:
-            sum_distance: List[float] = [
-                el/float(len(list_position)**2) for el in sum_distance]
+    list_compo = [el/sum_compo for el in list_compo]
+    sum_distance = ComputeRadialDescriptor(list_position, slab.cell[:2, :2], sym_check, alpha_list=alpha_list)
 
     return list_compo, sum_distance, list_atom_surface
 
@@ -387,35 +387,28 @@ def DeepLevelTerminaison(niveau: int, composition: List[str], slab: Atoms, termi
     """
     list_composition: List[List[float]] = []
     list_sum: List[List[float]] = []
-    slab_to_work = slab.copy()
+    # levels are removed from a mask instead of successive copies of the slab
+    active_atoms = np.ones(len(slab), dtype=bool)
     for k in range(niveau):
         list_compo_k, sum_dis_k, index_atom = BuildCompositionDistanceVectorSlab(
-            composition, slab_to_work, terminaison, tolerance, sym_check=sym, alpha_list=alpha_list, remesher=remesher)
+            composition, slab, terminaison, tolerance, sym_check=sym, alpha_list=alpha_list, remesher=remesher, active_atoms=active_atoms)
         list_composition.append(list_compo_k)
         list_sum += sum_dis_k
 
-        slab_to_work = AtomDeleter(slab_to_work, index_atom, copy=False)
+        active_atoms[[atom.index for atom in index_atom]] = False
 
     return list_composition, list_sum
 
 
-def BuilderSurfaceOriented(path_bulk_file: str, 
-                           orientation: List[float], 
-                           h_slab: float, 
-                           vaccum: float, 
-                           composition: List[str], 
-                           niveau: int, 
-                           z_slab_ang: float, 
-                           tolerance_z: float, 
-                           path_writing: str, 
-                           tolerance_surface: float = 1e-2, 
-                           check_sym : DictSym = {'bool':False, 'replica':1, 'rcut':3.0}, 
-                           alpha_list: List[float] = None, 
-                           tolerance_descripteur: float = 1e-2, 
-                           dense_check: DictDense = {'bool': False, 'tolerance': None, 'compacity': None}, 
-                           remesher: DictRemesh = {'bool': False, 'rcut': 0.0, 'beta': 1.0},
-                           tolerance_pymatgen : float = 1e-12) -> None:
-    """Build inequivalent slabs from a given bulk file for a given set of Miller indexes (orientation)
+class DictSlabResult(TypedDict):
+    status: str
+    slab: Atoms
+    composition: List[List[float]]
+    distance: List[float]
+
+
+def GenerateSlabsOriented(path_bulk_file: str, orientation: List[float], h_slab: float, vaccum: float, tolerance_pymatgen: float = 1e-12) -> List[Atoms]:
+    """Generate all slabs from a given bulk file for a given set of Miller indexes with pymatgen
 
     Parameters 
     ----------
@@ -432,6 +425,156 @@ def BuilderSurfaceOriented(path_bulk_file: str,
     vaccum : float
         Size of the vaccum generated by pymatgen
 
+    tolerance_pymatgen : float 
+        Tolerance used by pymatgen to find inequivalent slabs
+
+    Returns 
+    -------
+
+    List[Atoms]
+        List of wrapped ASE slabs
+    """
+    bulk = io.read(path_bulk_file)
+    bulk_pymatgen = AseAtomsAdaptor.get_structure(bulk)
+    gen = SlabGenerator(bulk_pymatgen, orientation, h_slab, vaccum, lll_reduce=False,
+                        center_slab=True, in_unit_planes=True, max_normal_search=10)
+
+    """here tol have to be really small to ensure the convergence of the method"""
+    list_slabs = gen.get_slabs(ftol=1e-3, tol=tolerance_pymatgen)  # keep these values !
+    list_aseslabs: List[Atoms] = []
+    for slab in list_slabs:
+        aseslab = AseAtomsAdaptor.get_atoms(slab)
+        aseslab.wrap(pbc=[1, 1, 1])
+        list_aseslabs.append(aseslab)
+
+    return list_aseslabs
+
+
+def SymmetriseSlab(aseslab: Atoms,
+                   composition: List[str],
+                   niveau: int,
+                   z_slab_ang: float,
+                   tolerance_z: float,
+                   vaccum: float,
+                   tolerance_surface: float = 1e-2,
+                   check_sym: DictSym = {'bool':False, 'replica':1, 'rcut':3.0},
+                   alpha_list: List[float] = None,
+                   dense_check: DictDense = {'bool': False, 'tolerance': None, 'compacity': None},
+                   remesher: DictRemesh = {'bool': False, 'rcut': 0.0, 'beta': 1.0}) -> DictSlabResult:
+    """Build the dense high termination (if needed) and remove low terminations of one slab until 
+    both terminations have the same descriptors and the slab heigh fulfills the constraint 
+
+    Parameters 
+    ----------
+
+    aseslab : Atoms 
+        ASE object containing the slab system
+
+    composition : List[str]
+        List of elements in the bulk system
+
+    niveau : int
+        Number of termination levels to compare inequivalent terminations
+
+    z_slab_ang : float 
+        Constraint on slab heigh after symmetrisation procedure
+
+    tolerance_z : float
+        Heigh tolerance for an atom to be considered in the surface
+
+    vaccum : float
+        Size of the vaccum around the final slab
+
+    check_sym : Dict[bool, List[float]]
+        Dictionnary to build replication in order to take into account periodic boundary condition
+        List contains number of replica and rcut for descriptor in AA
+
+    alpha_list : List[float]
+        List of alpha power for radial descriptor of termination
+
+    dense_check: DictDense
+        Dictionnnary containing data for dense termination constraints
+
+    remesher : DictRemesh 
+        Dictionnary containing data for remeshing on rough surfaces
+
+    Returns 
+    -------
+
+    DictSlabResult
+        status ('ok', 'density' or 'size'), symmetrised slab and descriptors of the high termination
+    """
+    if dense_check['bool']:
+        aseslab, bool_density = BuildDenseHighTermination(
+            composition, aseslab, tolerance_surface, check_sym, alpha_list, dense_check['tolerance'], dense_check['compacity'], remesher=remesher)
+        if not bool_density:
+            return {'status':'density', 'slab':None, 'composition':None, 'distance':None}
+
+    high_compo_haut, high_distance_haut = DeepLevelTerminaison(
+        niveau, composition, aseslab, terminaison='haut', tolerance=tolerance_surface, sym=check_sym, alpha_list=alpha_list)
+
+    symetric_slab = False
+    while not symetric_slab:
+        try:
+            _, _, atom_bas = BuildCompositionDistanceVectorSlab(
+                composition, aseslab, terminaison='bas', tolerance=tolerance_surface, sym_check=check_sym, alpha_list=alpha_list, remesher=remesher)
+            high_compo_bas, high_distance_bas = DeepLevelTerminaison(
+                niveau, composition, aseslab, terminaison='bas', tolerance=tolerance_surface, sym=check_sym, alpha_list=alpha_list)
+
+        except:
+            return {'status':'size', 'slab':None, 'composition':None, 'distance':None}
+
+        size_slab = np.amax(aseslab.get_positions()[
+                            :, 2]) - np.amin(aseslab.get_positions()[:, 2])
+
+        norm_distance = np.sum([abs(high_distance_bas[k]-high_distance_haut[k])
+                               for k in range(len(high_distance_haut))])/len(high_distance_haut)
+
+        if high_compo_bas == high_compo_haut and norm_distance < 1e-2 and abs(size_slab - z_slab_ang) < tolerance_z:
+            symetric_slab = True
+        else:
+            aseslab = AtomDeleter(aseslab, atom_bas, copy=False)
+
+    aseslab.center(vacuum=vaccum, axis=2)
+    return {'status':'ok', 'slab':aseslab, 'composition':high_compo_haut, 'distance':high_distance_haut}
+
+
+def BuilderSurfaceOrientations(path_bulk_file: str, 
+                               list_orientation: List[List[float]], 
+                               h_slab: float, 
+                               vaccum: float, 
+                               composition: List[str], 
+                               niveau: int, 
+                               z_slab_ang: float, 
+                               tolerance_z: float, 
+                               path_writing: str, 
+                               tolerance_surface: float = 1e-2, 
+                               check_sym : DictSym = {'bool':False, 'replica':1, 'rcut':3.0}, 
+                               alpha_list: List[float] = None, 
+                               tolerance_descripteur: float = 1e-2, 
+                               dense_check: DictDense = {'bool': False, 'tolerance': None, 'compacity': None}, 
+                               remesher: DictRemesh = {'bool': False, 'rcut': 0.0, 'beta': 1.0},
+                               tolerance_pymatgen : float = 1e-12,
+                               njob : int = 1) -> Dict[str,List[Atoms]]:
+    """Build inequivalent slabs from a given bulk file for a list of Miller indexes. Slabs of all orientations 
+    are generated and symmetrised in a pool of workers, inequivalent terminations of each orientation are then 
+    selected with a table of rounded descriptors
+
+    Parameters 
+    ----------
+
+    path_bulk_file : str 
+        Path to the bulk file 
+
+    list_orientation : List[List[float]]
+        List of HKL indexes for slab orientations
+
+    h_slab : float
+        Slab heigh generated by pymatgen
+
+    vaccum : float
+        Size of the vaccum generated by pymatgen
+
     composition : List[str]
         List of elements in the bulk system
 
@@ -460,94 +603,129 @@ def BuilderSurfaceOriented(path_bulk_file: str,
     remesher : DictRemesh 
         Dictionnary containing data for remeshing on rough surfaces
 
+    tolerance_pymatgen : float 
+        Tolerance used by pymatgen to find inequivalent slabs
+
+    njob : int 
+        Number of workers
+
+    Returns 
+    -------
+
+    Dict[str,List[Atoms]]
+        Inequivalent slabs for each orientation
     """
-    bulk = io.read(path_bulk_file)
-    bulk_pymatgen = AseAtomsAdaptor.get_structure(bulk)
-    gen = SlabGenerator(bulk_pymatgen, orientation, h_slab, vaccum, lll_reduce=False,
-                        center_slab=True, in_unit_planes=True, max_normal_search=10)
-    print('Slab is generated')
+    list_name_orientation = [ ''.join(['%s' % (str(value)) for value in orientation]) for orientation in list_orientation ]
+    list_slabs_orientation: List[List[Atoms]] = Parallel(n_jobs=njob)(
+        delayed(GenerateSlabsOriented)(path_bulk_file, orientation, h_slab, vaccum, tolerance_pymatgen=tolerance_pymatgen) 
+        for orientation in list_orientation)
+    for orientation, list_slabs in zip(list_orientation, list_slabs_orientation):
+        print('==> I found %s slabs for orientation (%s)' % (str(len(list_slabs)), ','.join([str(value) for value in orientation])))
+
+    list_pairs = [ (id_orientation, j) for id_orientation, list_slabs in enumerate(list_slabs_orientation) for j in range(len(list_slabs)) ]
+    list_results: List[DictSlabResult] = Parallel(n_jobs=njob)(
+        delayed(SymmetriseSlab)(list_slabs_orientation[id_orientation][j], composition, niveau, z_slab_ang, tolerance_z, vaccum,
+                                tolerance_surface=tolerance_surface, check_sym=check_sym, alpha_list=alpha_list, 
+                                dense_check=dense_check, remesher=remesher)
+        for id_orientation, j in list_pairs)
+
+    # inequivalent terminations : one slab per (orientation, rounded descriptors)
+    decimale = int(-np.log10(tolerance_descripteur))
+    descriptor_table: Dict[Tuple, Tuple[int,int]] = {}
+    slab_to_keep: Dict[str,List[Atoms]] = {name:[] for name in list_name_orientation}
+    for (id_orientation, j), result in zip(list_pairs, list_results):
+        if result['status'] == 'density':
+            print('The something wrong with the surface density of the slab... (orientation %s, index %s)' % (list_name_orientation[id_orientation], str(j)))
+            continue
+        if result['status'] == 'size':
+            print('The something wrong with the size of the slab... (orientation %s, index %s)' % (list_name_orientation[id_orientation], str(j)))
+            continue
 
-    """here tol have to be really small to ensure the convergence of the method"""
-    list_slabs: List[Atoms] = gen.get_slabs(
-        ftol=1e-3, tol=tolerance_pymatgen)  # keep these values !
-    print('==> I found %s slabs' % (str(len(list_slabs))))
+        key_descriptor = (id_orientation, 
+                          tuple([round(compo, decimale) for compo_level in result['composition'] for compo in compo_level]),
+                          tuple([round(dis, decimale) for dis in result['distance']]))
+        if key_descriptor not in descriptor_table:
+            descriptor_table[key_descriptor] = (id_orientation, j)
+            slab_to_keep[list_name_orientation[id_orientation]].append(result['slab'])
 
-    slab_to_keep: List[Atoms] = []
-    global_compo: List[List[List[float]]] = []
-    global_distance: List[List[float]] = []
+    for name_orientation, list_slabs in slab_to_keep.items():
+        print('==> Reducting to %s non equivalent slabs for orientation %s !' % (str(len(list_slabs)), name_orientation))
+        for id_slab, slab in enumerate(list_slabs):
+            ase.io.write('%s/%s_model%s.POSCAR' % (path_writing, name_orientation,
+                         str(id_slab)), slab, sort=True, vasp5=True, direct=True, format='vasp')
 
-    for j, slab in enumerate(list_slabs):
-        symetric_slab = False
-        aseslab = AseAtomsAdaptor.get_atoms(slab)
-        aseslab.wrap(pbc=[1, 1, 1])
+    return slab_to_keep
 
-        if dense_check['bool']:
-            aseslab, bool_density = BuildDenseHighTermination(
-                composition, aseslab, tolerance_surface, check_sym, alpha_list, dense_check['tolerance'], dense_check['compacity'], remesher=remesher)
-            if not bool_density:
-                print(
-                    'The something wrong with the surface density of the slab... (index %s)' % (str(j)))
-                continue
 
-        _, _, _ = BuildCompositionDistanceVectorSlab(
-            composition, aseslab, terminaison='haut', tolerance=tolerance_surface, sym_check=check_sym, alpha_list=alpha_list, remesher=remesher)
-        high_compo_haut, high_distance_haut = DeepLevelTerminaison(
-            niveau, composition, aseslab, terminaison='haut', tolerance=tolerance_surface, sym=check_sym, alpha_list=alpha_list)
+def BuilderSurfaceOriented(path_bulk_file: str, 
+                           orientation: List[float], 
+                           h_slab: float, 
+                           vaccum: float, 
+                           composition: List[str], 
+                           niveau: int, 
+                           z_slab_ang: float, 
+                           tolerance_z: float, 
+                           path_writing: str, 
+                           tolerance_surface: float = 1e-2, 
+                           check_sym : DictSym = {'bool':False, 'replica':1, 'rcut':3.0}, 
+                           alpha_list: List[float] = None, 
+                           tolerance_descripteur: float = 1e-2, 
+                           dense_check: DictDense = {'bool': False, 'tolerance': None, 'compacity': None}, 
+                           remesher: DictRemesh = {'bool': False, 'rcut': 0.0, 'beta': 1.0},
+                           tolerance_pymatgen : float = 1e-12,
+                           njob : int = 1) -> None:
+    """Build inequivalent slabs from a given bulk file for a given set of Miller indexes (orientation), 
+    see ```BuilderSurfaceOrientations```
 
-        bool_size = True
+    Parameters 
+    ----------
 
-        while not symetric_slab:
-            try:
-                _, _, atom_bas = BuildCompositionDistanceVectorSlab(
-                    composition, aseslab, terminaison='bas', tolerance=tolerance_surface, sym_check=check_sym, alpha_list=alpha_list, remesher=remesher)
-                high_compo_bas, high_distance_bas = DeepLevelTerminaison(
-                    niveau, composition, aseslab, terminaison='bas', tolerance=tolerance_surface, sym=check_sym, alpha_list=alpha_list)
+    path_bulk_file : str 
+        Path to the bulk file 
 
-            except:
-                bool_size = False
-                break
+    orientation : List[float]
+        HKL indexes for slab orientation
 
-            size_slab = np.amax(aseslab.get_positions()[
-                                :, 2]) - np.amin(aseslab.get_positions()[:, 2])
+    h_slab : float
+        Slab heigh generated by pymatgen
 
-            norm_distance = np.sum([abs(high_distance_bas[k]-high_distance_haut[k])
-                                   for k in range(len(high_distance_haut))])/len(high_distance_haut)
+    vaccum : float
+        Size of the vaccum generated by pymatgen
 
-            if high_compo_bas == high_compo_haut and norm_distance < 1e-2 and abs(size_slab - z_slab_ang) < tolerance_z:
-                symetric_slab = True
-            else:
-                aseslab = AtomDeleter(aseslab, atom_bas, copy=False)
+    composition : List[str]
+        List of elements in the bulk system
 
-        if not bool_size:
-            print(
-                'The something wrong with the size of the slab... (index %s)' % (str(j)))
-            continue
+    niveau : int
+        Number of termination levels to compare inequivalent terminations
 
-        aseslab.center(vacuum=vaccum, axis=2)
-        slab_to_keep.append(aseslab)
+    z_slab_ang : float 
+        Constraint on slab heigh after symmetrisation procedure
 
-        decimale = int(-np.log10(tolerance_descripteur))
-        if high_compo_haut not in global_compo:
-            global_compo.append(high_compo_haut)
-            slab_to_keep.append(aseslab)
-            global_distance.append([round(dis, decimale)
-                                   for dis in high_distance_haut])
+    tolerance_z : float
+        Heigh tolerance for an atom to be considered in the surface
 
-        else:
-            round_high_distance_haut = [
-                round(dis, decimale) for dis in high_distance_haut]
-            if round_high_distance_haut not in global_distance:
-                global_distance.append(round_high_distance_haut)
-                slab_to_keep.append(aseslab)
-
-    print('==> Reducting to %s non equivalent slabs !' %
-          (str(len(slab_to_keep))))
-    name_orientation = ''
-    for value in orientation:
-        name_orientation += '%s' % (str(value))
-
-    for id_slab, slab in enumerate(slab_to_keep):
-        ase.io.write('%s/%s_model%s.POSCAR' % (path_writing, name_orientation,
-                     str(id_slab)), slab, sort=True, vasp5=True, direct=True, format='vasp')
+    check_sym : Dict[bool, List[float]]
+        Dictionnary to build replication in order to take into account periodic boundary condition
+        List contains number of replica and rcut for descriptor in AA
+
+    alpha_list : List[float]
+        List of alpha power for radial descriptor of termination
 
+    tolerance_descriptor : float
+        Tolerance to consider that two surface descriptors are different
+
+    dense_check: DictDense
+        Dictionnnary containing data for dense termination constraints
+
+    remesher : DictRemesh 
+        Dictionnary containing data for remeshing on rough surfaces
+
+    njob : int 
+        Number of workers used for the slabs of the orientation
+
+    """
+    BuilderSurfaceOrientations(path_bulk_file, [orientation], h_slab, vaccum, composition, niveau, z_slab_ang, tolerance_z, path_writing,
+                               tolerance_surface=tolerance_surface, check_sym=check_sym, alpha_list=alpha_list, 
+                               tolerance_descripteur=tolerance_descripteur, dense_check=dense_check, remesher=remesher,
+                               tolerance_pymatgen=tolerance_pymatgen, njob=njob)
     return
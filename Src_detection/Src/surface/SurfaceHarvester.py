@@ -0,0 +1,311 @@
+import os
+import numpy as np
+import h5py
+import ase.io
+
+from joblib import Parallel, delayed
+from typing import List, Dict, Tuple, TypedDict
+
+from .ExtractAllFromVASP import GetOutcarIndex, CheckConvergence
+from .DataSurfaceObject import DataSurface
+from .SlabBuilder import BuildCompositionDistanceVectorSlab
+from ..tools.tools import ScanDirectories
+
+class DictHarvest(TypedDict) :
+    path : str
+    kind : str
+    name : str
+    type : str
+    converged : bool
+    energy : float
+    natoms : int
+    composition : str
+    structure : str
+    surface : float
+    termination_haut : str
+    termination_bas : str
+    outcar_size : int
+    outcar_mtime : float
+
+"""columns of the harvest table and their h5 types"""
+harvest_columns = {'path':str, 'kind':str, 'name':str, 'type':str, 'converged':bool, 'energy':float, 'natoms':int,
+                   'composition':str, 'structure':str, 'surface':float, 'termination_haut':str, 'termination_bas':str,
+                   'outcar_size':int, 'outcar_mtime':float}
+
+
+def ClassifyCalculation(path : str) -> Tuple[str,str,str] :
+    """Find the kind of calculation from the tree structure used by slab_energy_launcher mode
+    (same rules as ```ReadConvergenceFile```)
+
+    Parameters
+    ----------
+
+    path : str
+        Path of the calculation directory
+
+    Returns
+    -------
+
+    str
+        Kind of calculation : elements, bulk, slab or other
+
+    str
+        Name of the system (element for elements)
+
+    str
+        Type of element calculation (single or bulk), empty string otherwise
+    """
+    split_path = path.split('/')
+    if len(split_path) > 2 and split_path[-3] == 'elements' :
+        return 'elements', split_path[-2], split_path[-1]
+    if len(split_path) > 1 and split_path[-2] == 'bulk_full' :
+        return 'bulk', split_path[-1], ''
+    if len(split_path) > 1 and split_path[-2] == 'slab' :
+        return 'slab', split_path[-1], ''
+    return 'other', split_path[-1], ''
+
+
+def CompositionToString(composition : List[List[str] | List[float]]) -> str :
+    """Composition [[el1,el2,...],[nb1,nb2,...]] to string 'el1 nb1 el2 nb2 ...'"""
+    return ' '.join(['%s %s'%(el,str(nb)) for el, nb in zip(composition[0],composition[1])])
+
+
+def StringToComposition(composition : str) -> List[List[str] | List[int]] :
+    """String 'el1 nb1 el2 nb2 ...' to composition [[el1,el2,...],[nb1,nb2,...]]"""
+    split_compo = composition.split()
+    return [split_compo[::2], [int(nb) for nb in split_compo[1::2]]]
+
+
+def HarvestCalculation(path : str, match : Dict[str,float] = None, file2find : str = 'OUTCAR', tolerance_surface : float = 1e-2) -> DictHarvest :
+    """Extract energy, composition and terminations of one VASP calculation
+
+    Parameters
+    ----------
+
+    path : str
+        Path of the calculation directory
+
+    match : Dict[str,float]
+        Size and mtime of the output file (see ```ScanDirectories```), read from the file if None
+
+    file2find : str
+        Name of the VASP output file
+
+    tolerance_surface : float
+        Heigh tolerance for an atom to be considered in the termination of slabs
+
+    Returns
+    -------
+
+    DictHarvest
+        Row of the harvest table
+    """
+    kind, name, type = ClassifyCalculation(path)
+    path_outcar = '%s/%s'%(path,file2find)
+    if match is None :
+        stat = os.stat(path_outcar)
+        match = {'size':stat.st_size, 'mtime':stat.st_mtime}
+
+    path_structure = '%s/CONTCAR'%(path) if os.path.exists('%s/CONTCAR'%(path)) else '%s/POSCAR'%(path)
+    row : DictHarvest = {'path':path, 'kind':kind, 'name':name, 'type':type, 'converged':False, 'energy':np.nan, 'natoms':-1,
+                         'composition':'', 'structure':path_structure, 'surface':np.nan, 'termination_haut':'', 'termination_bas':'',
+                         'outcar_size':match['size'], 'outcar_mtime':match['mtime']}
+    try :
+        _, bool_struc_min = CheckConvergence(path_outcar)
+        index = GetOutcarIndex(path_outcar)
+        if index is None :
+            return row
+        row['natoms'] = index.natoms
+        if not bool_struc_min :
+            return row
+        row['energy'] = index.get_step()['energy']
+
+        # composition is read on the initial structure as in ```RecursiveChecker```
+        initial_structure = ase.io.read('%s/POSCAR'%(path), format='vasp')
+        dic_el : Dict[str,int] = {}
+        for el in initial_structure.get_chemical_symbols() :
+            dic_el[el] = dic_el.get(el, 0) + 1
+        row['composition'] = CompositionToString([list(dic_el.keys()), list(dic_el.values())])
+
+        if kind == 'slab' :
+            structure = ase.io.read(path_structure, format='vasp')
+            row['surface'] = float(np.linalg.det(structure.cell[:2,:2]))
+            composition = list(np.unique(structure.get_chemical_symbols()))
+            for terminaison in ['haut','bas'] :
+                compo_termination, _, _ = BuildCompositionDistanceVectorSlab(composition, structure, terminaison=terminaison, tolerance=tolerance_surface)
+                row['termination_%s'%(terminaison)] = CompositionToString([composition, ['%1.4f'%(compo) for compo in compo_termination]])
+        row['converged'] = True
+
+    except Exception as error :
+        print('... Harvesting error for %s : %s ...'%(path,str(error)))
+        row['converged'] = False
+
+    return row
+
+
+def WriteHarvestTable(path_table : os.PathLike[str], list_rows : List[DictHarvest], root_dir : str = '') -> None :
+    """Write the harvest table in h5 file (one dataset per column)
+
+    Parameters
+    ----------
+
+    path_table : os.PathLike[str]
+        Path of the h5 table
+
+    list_rows : List[DictHarvest]
+        Rows of the table
+
+    root_dir : str
+        Root of the harvested tree
+    """
+    with h5py.File(path_table, 'w') as h5 :
+        group = h5.create_group('calculations')
+        group.attrs['root'] = root_dir
+        for column, type in harvest_columns.items() :
+            values = [row[column] for row in list_rows]
+            if type == str :
+                group.create_dataset(column, data=np.array(values, dtype=object), dtype=h5py.string_dtype('utf-8'))
+            else :
+                group.create_dataset(column, data=np.array(values, dtype=type))
+    return
+
+
+def ReadHarvestTable(path_table : os.PathLike[str]) -> List[DictHarvest] :
+    """Read the harvest table
+
+    Parameters
+    ----------
+
+    path_table : os.PathLike[str]
+        Path of the h5 table
+
+    Returns
+    -------
+
+    List[DictHarvest]
+        Rows of the table
+    """
+    with h5py.File(path_table, 'r') as h5 :
+        group = h5['calculations']
+        columns = {column:(group[column].asstr()[()] if type == str else group[column][()]) for column, type in harvest_columns.items()}
+
+    nb_rows = len(columns['path'])
+    return [ {column:(type(columns[column][k]) if type != str else str(columns[column][k])) for column, type in harvest_columns.items()}
+             for k in range(nb_rows) ]
+
+
+def HarvestSurfaceCalculations(root_dir : str,
+                               path_table : os.PathLike[str],
+                               index_file : os.PathLike[str] = None,
+                               njob : int = 1,
+                               file2find : str = 'OUTCAR',
+                               tolerance_surface : float = 1e-2) -> List[DictHarvest] :
+    """Harvest all VASP calculations of a tree into a h5 table. The tree is scanned with ```ScanDirectories```
+    (only directories whose mtime changed are listed again), calculations whose output file is unchanged since
+    the previous harvest are kept from the table and others are parsed in a pool of workers
+
+    Parameters
+    ----------
+
+    root_dir : str
+        Root of the calculation tree
+
+    path_table : os.PathLike[str]
+        Path of the h5 table
+
+    index_file : os.PathLike[str]
+        Path to the json index of the tree, default is built from path_table
+
+    njob : int
+        Number of workers used to parse calculations
+
+    file2find : str
+        Name of the VASP output file
+
+    tolerance_surface : float
+        Heigh tolerance for an atom to be considered in the termination of slabs
+
+    Returns
+    -------
+
+    List[DictHarvest]
+        Rows of the updated table
+    """
+    if index_file is None :
+        index_file = '%s.scan.json'%(os.path.splitext(path_table)[0])
+    list_scanned = ScanDirectories(root_dir, file2find=file2find, index_file=index_file)
+
+    dic_previous : Dict[str,DictHarvest] = {}
+    if os.path.exists(path_table) :
+        dic_previous = {row['path']:row for row in ReadHarvestTable(path_table)}
+
+    list_rows : List[DictHarvest] = []
+    list_to_parse : List[Tuple[str,Dict[str,float]]] = []
+    for path, entry in list_scanned :
+        previous = dic_previous.get(path)
+        if previous is not None and previous['outcar_size'] == entry['match']['size'] and previous['outcar_mtime'] == entry['match']['mtime'] :
+            list_rows.append(previous)
+        else :
+            list_to_parse.append((path, entry['match']))
+
+    print('... %d calculations to harvest (%d unchanged) ...'%(len(list_to_parse),len(list_rows)))
+    list_rows += Parallel(n_jobs=njob)(delayed(HarvestCalculation)(path, match, file2find=file2find, tolerance_surface=tolerance_surface)
+                                       for path, match in list_to_parse)
+    list_rows = sorted(list_rows, key=lambda row : row['path'])
+    WriteHarvestTable(path_table, list_rows, root_dir=str(root_dir))
+    return list_rows
+
+
+def FillDataSurfaceFromTable(object : DataSurface, path_table : os.PathLike[str]) -> DataSurface :
+    """Fill the DataSurface object with converged calculations of the harvest table
+    (equivalent of ```ReadConvergenceFile```)
+
+    Parameters
+    ----------
+
+    object : DataSurface
+        DataSurface object to fill
+
+    path_table : os.PathLike[str]
+        Path of the h5 table
+
+    Returns
+    -------
+
+    DataSurface
+        Filled DataSurface object
+    """
+    for row in ReadHarvestTable(path_table) :
+        if not row['converged'] :
+            continue
+        if row['kind'] == 'elements' :
+            object.add_entry_el(row['name'],row['type'],row['energy']/row['natoms'])
+        elif row['kind'] == 'bulk' :
+            object.add_entry_bulk(row['name'],row['energy'],StringToComposition(row['composition']))
+        elif row['kind'] == 'slab' :
+            object.add_entry_slab(row['name'],row['energy'],StringToComposition(row['composition']))
+
+    return object
+
+
+def ExtractPathSlabTable(list_name_slab : List[str], path_table : os.PathLike[str]) -> List[str] :
+    """Find structure paths (CONTCAR or POSCAR) of converged slabs in the harvest table
+    (equivalent of ```ExtractPathSlab```)
+
+    Parameters
+    ----------
+
+    list_name_slab : List[str]
+        List of slab name to find
+
+    path_table : os.PathLike[str]
+        Path of the h5 table
+
+    Returns
+    -------
+
+    List[str]
+        List of corresponding slab path
+    """
+    dic_structure = {row['name']:row['structure'] for row in ReadHarvestTable(path_table) if row['kind'] == 'slab' and row['converged']}
+    return [dic_structure[name] for name in list_name_slab if name in dic_structure]
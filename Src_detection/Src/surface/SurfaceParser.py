@@ -44,6 +44,7 @@ class SurfaceParser :
         self.parameters['LevelLines'] = False
         self.parameters['MuDiscretisation'] = 100
         self.parameters['SlabsToPlot'] = ['Default']
+        self.parameters['HarvestTable'] = 'Default'
 
         """Slab builder settings"""
         self.parameters['hklVectors'] = [[1,0,0]]
@@ -56,6 +57,7 @@ class SurfaceParser :
         self.parameters['ToleranceAtomSurface'] = 1e-2
         self.parameters['AlphaParameters'] = [1.0]
         self.parameters['ToleranceDescritpors'] = 1e-2
+        self.parameters['NJob'] = 1
 
         """Optional parameters"""
         self.parameters['CheckSym'] = {'bool':False, 'replica': 1, 'rcut': 3.0}
@@ -1,6 +1,6 @@
 import numpy as np 
 from ase import Atom
-from typing import List, Tuple, TypedDict
+from typing import List, Tuple, TypedDict, Dict
 from scipy.spatial import KDTree
 from itertools import combinations
 
@@ -35,6 +35,9 @@ class DerivatedMesh(TypedDict) :
 
 class SurfaceRemesher : 
     """This one is good !"""
+    # maximum number of surface atoms for the exhaustive search in ```auto``` mode
+    max_exhaustive = 12
+
     def __init__(self, list_selected_atom : List[Atom], rcut : float) -> None : 
         """SurfaceRemesher allows to identify atoms which are part of rough surface terminations
         
@@ -54,15 +57,23 @@ class SurfaceRemesher :
 
     def build_neigh_atoms(self) -> None : 
         """"Build the rcut neighborhood of each atom in the prio attribute"""
-        full_positions = np.asarray([at.position for at in self.prior_surface_atom_dic['atoms'] ])
-        tree_system = KDTree(full_positions)
-        for at in self.prior_surface_atom_dic['atoms'] : 
-            list_id = tree_system.query_ball_point(at.position,self.rcut)
+        self.prior_positions = np.asarray([at.position for at in self.prior_surface_atom_dic['atoms'] ]).reshape(-1,3)
+        tree_system = KDTree(self.prior_positions)
+        self.neigh_index : List[np.ndarray] = [ np.asarray(list_id, dtype=int) for list_id in tree_system.query_ball_point(self.prior_positions, self.rcut) ]
+        for list_id in self.neigh_index : 
             list_at_neigh_rcut = [self.prior_surface_atom_dic['atoms'][idx] for idx in list_id]
             self.prior_surface_atom_dic['neigh'].append(list_at_neigh_rcut)
 
         return 
 
+    def _get_prior_index(self, list_atom : List[Atom]) -> np.ndarray : 
+        """Index of Atom objects in the prior list"""
+        dic_index = {id(at):idx for idx, at in enumerate(self.prior_surface_atom_dic['atoms'])}
+        try : 
+            return np.array([ dic_index[id(at)] for at in list_atom ], dtype=int)
+        except KeyError : 
+            raise ValueError('Surface atoms have to be part of the prior list of SurfaceRemesher')
+
     def build_local_normal_surface(self,sub_list_atom : List[Atom], central_atom : Atom, terminaison='haut',alpha=2.0) -> np.ndarray :
         """Build the average normal vector on a central atom (i) for a given sublist of neighbour atoms
         
@@ -129,7 +140,7 @@ class SurfaceRemesher :
                 sub_list += tmp
         return sub_list
 
-    def remesh_surface(self,list_atom_surface : List[Atom], terminaison : str ='haut', beta : float = 2.0) -> Tuple[int,List[Atom]] : 
+    def remesh_surface(self,list_atom_surface : List[Atom], terminaison : str ='haut', beta : float = 2.0, method : str = 'auto') -> Tuple[int,List[Atom]] : 
         """Find atom at the termination of a rough surface, cost function is detailed in Latex document ...
         
         Parameters 
@@ -143,6 +154,11 @@ class SurfaceRemesher :
 
         beta : float 
             Power used to regularised the loss function in Latex document
+
+        method : str 
+            ```auto``` : exhaustive search up to ```max_exhaustive``` surface atoms, greedy search above
+            ```greedy``` : polynomial selection along the termination direction (see ```greedy_remesh_surface```)
+            ```exhaustive``` : evaluation of all subsets (only for few atoms, cost is 2^n)
         
         Returns 
         -------
@@ -154,6 +170,14 @@ class SurfaceRemesher :
             List of atom which are part of the surface after the remeshing procedure
 
         """
+        if method == 'auto' : 
+            method = 'exhaustive' if len(list_atom_surface) <= self.max_exhaustive else 'greedy'
+
+        if method == 'greedy' : 
+            return self.greedy_remesh_surface(list_atom_surface, terminaison=terminaison, beta=beta)
+        elif method != 'exhaustive' : 
+            raise NotImplementedError(f'Remeshing method {method} is not implemented')
+
         max_card = 0
         loss_function = 1e-4
         remesh_list_atom_surface = None
@@ -184,4 +208,223 @@ class SurfaceRemesher :
                     max_card = len(sublist_k_atom_surface)
                     remesh_list_atom_surface = sublist_k_atom_surface
 
-        return max_card, remesh_list_atom_surface
\ No newline at end of file
+        return max_card, remesh_list_atom_surface
+
+    def greedy_remesh_surface(self, list_atom_surface : List[Atom], 
+                              terminaison : str = 'haut', 
+                              beta : float = 2.0, 
+                              alpha : float = 2.0,
+                              size_window : int = 16,
+                              max_sweep : int = 10) -> Tuple[int,List[Atom]] : 
+        """Polynomial version of ```remesh_surface```. Atoms are first added one by one to the surface subset following 
+        the termination direction (highest atoms first for 'haut') and the best feasible subset is kept. This subset is then 
+        refined by local moves (one atom added/removed or exchanged with an atom of the complementary set) restricted to 
+        the atoms ranked in a window around the cut, moves are accepted while the loss function increases. 
+        Each move is evaluated incrementally with ```SubsetLoss```
+        
+        Parameters 
+        ----------
+
+        list_atom_surface : List[Atom]
+            Pior list of atoms which are considered to be part of the surface 
+
+        termination : str 
+            Type of termination 'haut' or 'bas'
+
+        beta : float 
+            Power used to regularised the loss function in Latex document
+
+        alpha : float 
+            Power used for the radial decrease of normal vector computation
+
+        size_window : int 
+            Number of atoms on each side of the cut considered for local moves 
+
+        max_sweep : int 
+            Maximum number of sweeps of local moves
+        
+        Returns 
+        -------
+
+        int 
+            Cardinal of the subset of atom which is found to be optimal 
+
+        List[Atom]
+            List of atom which are part of the surface after the remeshing procedure
+        """
+        id_surface = self._get_prior_index(list_atom_surface)
+        sign = {'haut':1.0, 'bas':-1.0}[terminaison]
+        order = id_surface[np.argsort(-sign*self.prior_positions[id_surface,2], kind='stable')]
+
+        # prefix subsets along the termination direction (the whole set is never selected)
+        subset_loss = SubsetLoss(self.prior_positions, self.neigh_index, id_surface, sign, beta=beta, alpha=alpha)
+        loss_function = 1e-4
+        max_card = 0
+        for card, id_new in enumerate(order[:-1], start=1) : 
+            loss_function_k, feasible, update = subset_loss.evaluate_flip(np.array([id_new]))
+            subset_loss.commit(update)
+            if feasible and loss_function_k > loss_function : 
+                loss_function = loss_function_k
+                max_card = card
+
+        if max_card == 0 : 
+            return max_card, None
+
+        # local refinement around the cut
+        subset_loss = SubsetLoss(self.prior_positions, self.neigh_index, id_surface, sign, beta=beta, alpha=alpha)
+        subset_loss.commit(subset_loss.evaluate_flip(order[:max_card])[2])
+        window = order[max(0,max_card-size_window):max_card+size_window]
+        for _ in range(max_sweep) : 
+            improved = False
+            list_moves = [ np.array([id_flip]) for id_flip in window ]
+            list_moves += [ np.array([id_in, id_out]) for id_in in window for id_out in window 
+                           if subset_loss.in_subset[id_in] and not subset_loss.in_subset[id_out] ]
+            for id_flip in list_moves : 
+                # exchanges are skipped once one of the two atoms has moved during the sweep
+                if len(id_flip) == 2 and subset_loss.in_subset[id_flip[0]] == subset_loss.in_subset[id_flip[1]] :
+                    continue
+                loss_function_k, feasible, update = subset_loss.evaluate_flip(id_flip)
+                if feasible and loss_function_k > loss_function*(1.0 + 1e-12) : 
+                    loss_function = loss_function_k
+                    subset_loss.commit(update)
+                    improved = True
+            if not improved : 
+                break
+
+        id_subset = np.flatnonzero(subset_loss.in_subset)
+        return len(id_subset), [ self.prior_surface_atom_dic['atoms'][idx] for idx in id_subset ]
+
+class SubsetLoss : 
+    def __init__(self, positions : np.ndarray, 
+                 neigh_index : List[np.ndarray], 
+                 id_surface : np.ndarray, 
+                 sign : float, 
+                 beta : float = 2.0, 
+                 alpha : float = 2.0) -> None : 
+        """Incremental evaluation of the remeshing loss function for a subset S of surface atoms 
+
+        L(S) = sum_{i in S, j notin S} p_ij + |S^c|^{1/beta} |S|^beta with p_ij = (r_i - r_j).n_i/(||r_i - r_j|| max(||n_i||,1e-4))
+
+        S is feasible if all p_ij are positive. Normal contributions are pair additive so that adding or removing an atom only 
+        changes normals of its neighbours. For each atom of S, the sum and the number of negative projections on the complementary 
+        set are stored : a move only recomputes rows with a new normal and the columns of moved atoms
+
+        Parameters
+        ----------
+
+        positions : np.ndarray
+            Positions of the prior atoms (N,3)
+
+        neigh_index : List[np.ndarray]
+            Index of neighbours of each prior atom (the atom itself included)
+
+        id_surface : np.ndarray 
+            Index of surface atoms in the prior list
+
+        sign : float 
+            1.0 for 'haut' termination, -1.0 for 'bas' termination
+
+        beta : float 
+            Power used to regularised the loss function
+
+        alpha : float 
+            Power used for the radial decrease of normal vector computation
+        """
+        self.positions = positions
+        self.neigh_index = neigh_index
+        self.sign = sign
+        self.beta = beta
+        self.alpha = alpha
+
+        self.in_surface = np.zeros(positions.shape[0], dtype=bool)
+        self.in_surface[id_surface] = True
+        self.in_subset = np.zeros(positions.shape[0], dtype=bool)
+        self.normals = np.zeros((positions.shape[0],3))
+        self.row_sum = np.zeros(positions.shape[0])
+        self.row_negative = np.zeros(positions.shape[0], dtype=int)
+
+    def local_normal(self, id_central : int, in_subset : np.ndarray) -> np.ndarray : 
+        """Vectorised version of ```SurfaceRemesher.build_local_normal_surface``` : for each unordered pair of neighbours in the 
+        subset only the orientation compatible with the termination is kept"""
+        id_partners = self.neigh_index[id_central][in_subset[self.neigh_index[id_central]]]
+        id_partners = id_partners[id_partners != id_central]
+        if len(id_partners) < 2 : 
+            return np.zeros(3)
+        
+        id_j, id_k = np.triu_indices(len(id_partners), k=1)
+        central = self.positions[id_central]
+        cross_vectors = np.cross(central - self.positions[id_partners[id_j]], central - self.positions[id_partners[id_k]])
+        cross_vectors *= self.sign*np.sign(cross_vectors[:,2]).reshape(-1,1)
+        norms = np.linalg.norm(cross_vectors, axis=1)
+        valid = (norms > 0.0) & (cross_vectors[:,2] != 0.0)
+        if not np.any(valid) : 
+            return np.zeros(3)
+        return np.sum(cross_vectors[valid]/np.power(norms[valid], self.alpha).reshape(-1,1), axis=0)/np.sum(valid)
+
+    def projections(self, id_rows : np.ndarray, normals_rows : np.ndarray, id_columns : np.ndarray) -> np.ndarray : 
+        """Normalised projections p_ij for i in id_rows (with normals normals_rows) and j in id_columns"""
+        differences = self.positions[id_rows][:,np.newaxis,:] - self.positions[id_columns][np.newaxis,:,:]
+        norme_ave = np.maximum(np.linalg.norm(normals_rows, axis=1), 1e-4)
+        return np.einsum('ijk,ik->ij', differences, normals_rows)/(np.linalg.norm(differences, axis=2)*norme_ave.reshape(-1,1))
+
+    def evaluate_flip(self, id_flip : np.ndarray) -> Tuple[float, bool, Dict[str,np.ndarray]] : 
+        """Evaluate the loss function after moving id_flip atoms in (or out of) the subset, current state is not modified
+        
+        Parameters
+        ----------
+
+        id_flip : np.ndarray 
+            Index of moved atoms
+
+        Returns:
+        --------
+
+        float 
+            Loss function of the new subset 
+
+        bool 
+            Feasibility of the new subset
+
+        Dict[str,np.ndarray]
+            Update of the state to give to ```commit```
+        """
+        in_subset = self.in_subset.copy()
+        in_subset[id_flip] = ~in_subset[id_flip]
+        id_affected = np.unique(np.concatenate([self.neigh_index[idx] for idx in id_flip]))
+        normals = self.normals.copy()
+        for id_central in id_affected : 
+            normals[id_central] = self.local_normal(id_central, in_subset)
+
+        row_sum = self.row_sum.copy()
+        row_negative = self.row_negative.copy()
+        id_members = np.flatnonzero(in_subset)
+        id_complement = np.flatnonzero(self.in_surface & ~in_subset)
+        update = {'in_subset':in_subset, 'normals':normals, 'row_sum':row_sum, 'row_negative':row_negative}
+        if len(id_members) == 0 or len(id_complement) == 0 : 
+            return 0.0, False, update
+
+        # rows kept : only columns of moved atoms change
+        recompute = np.zeros(in_subset.shape[0], dtype=bool)
+        recompute[id_affected] = True
+        recompute[id_flip] = True
+        id_kept = id_members[~recompute[id_members]]
+        if len(id_kept) > 0 : 
+            # +1 for atoms entering the complementary set, -1 for atoms leaving it 
+            weight = np.where(in_subset[id_flip], -1, 1)
+            columns = self.projections(id_kept, normals[id_kept], id_flip)
+            row_sum[id_kept] += columns@weight
+            row_negative[id_kept] += (columns < 0.0).astype(int)@weight
+        
+        id_recomputed = id_members[recompute[id_members]]
+        rows = self.projections(id_recomputed, normals[id_recomputed], id_complement)
+        row_sum[id_recomputed] = np.sum(rows, axis=1)
+        row_negative[id_recomputed] = np.sum(rows < 0.0, axis=1)
+
+        feasible = np.sum(row_negative[id_members]) == 0
+        loss_function = np.sum(row_sum[id_members]) + np.power(len(id_complement),1.0/self.beta)*np.power(len(id_members),self.beta)
+        return loss_function, feasible, update
+
+    def commit(self, update : Dict[str,np.ndarray]) -> None : 
+        """Apply an update given by ```evaluate_flip```"""
+        self.__dict__.update(update)
+        return 
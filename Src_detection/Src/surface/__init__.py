@@ -6,5 +6,6 @@ from .PlotSurfaceEnergy import *
 from .RecursiveCheck import *
 from .SlabBuilder import *
 from .SurfaceParser import *
+from .SurfaceHarvester import *
 from .SurfaceRemesh import *
 from .Tools import *
@@ -2,4 +2,4 @@ from .custom_ovito_modifiers import FrameOvito, NaiveOvitoModifier, MCDModifier,
 from .neighbour import get_N_neighbour, get_neighborhood, get_N_neighbour_huge, build_extended_neigh_
 from .my_cfg_reader import my_cfg_reader, timeit
 from .read_matrix_phondy import DataPhondy
-from .tools import RecursiveBuilder, RecursiveCheck, nearest_mode, merge_dict_
+from .tools import RecursiveBuilder, RecursiveCheck, ScanDirectories, nearest_mode, merge_dict_, union_find_
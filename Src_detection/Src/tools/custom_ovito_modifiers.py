@@ -113,6 +113,55 @@ class LaTeXTextOverlay(ViewportOverlayInterface):
                 )
             ax.axis("off")
 
+def build_rgb_table(dic_rgb : Dict[int, tuple], default : str = 'grey') -> np.ndarray : 
+    """Build a type indexed rgb table (lookup table) from a type -> rgb dictionnary. The last 
+    row is the default color, used for all types which are not in the dictionnary (see ```lookup_rgb_table```)
+    
+    Parameters
+    ----------
+
+    dic_rgb : Dict[int, tuple]
+        Rgb dictionnary, keys are particle types
+
+    default : str 
+        Color for types which are not in the dictionnary
+
+    Returns:
+    --------
+
+    np.ndarray 
+        Rgb table (max_type+2,3), row i is the color of type i and last row is the default color
+    """
+    max_type = max((int(key) for key in dic_rgb.keys()), default=-1)
+    rgb_table = np.tile(colors.to_rgb(default), (max_type + 2, 1))
+    for key, rgb in dic_rgb.items() : 
+        rgb_table[int(key)] = rgb
+    return rgb_table
+
+def lookup_rgb_table(rgb_table : np.ndarray, particle_types : np.ndarray) -> np.ndarray : 
+    """Colors of particles from the table of ```build_rgb_table```, types outside the table 
+    get the default color (last row)
+    
+    Parameters
+    ----------
+
+    rgb_table : np.ndarray 
+        Rgb table built with ```build_rgb_table```
+
+    particle_types : np.ndarray 
+        Type of each particle
+
+    Returns:
+    --------
+
+    np.ndarray 
+        Rgb array (N,3)
+    """
+    index_table = np.asarray(particle_types, dtype=int)
+    id_default = rgb_table.shape[0] - 1
+    index_table = np.where((index_table >= 0) & (index_table < id_default), index_table, id_default)
+    return rgb_table[index_table]
+
 class NaiveOvitoModifier : 
     """Naive ```OvitoModifier``` for debug ..."""
     def __init__(self, dict_transparency : Dict[float, List[int]] = None, 
@@ -215,7 +264,7 @@ class NaiveOvitoModifier :
         if self.array_line is not None : 
             if self.array_caracter is None : 
                 Cmap = plt.get_cmap('autumn')
-                colors_line = [Cmap(i) for i in np.linspace(0.0,1.0,num=len(self.array_line)) ]
+                colors_line = Cmap(np.linspace(0.0,1.0,num=len(self.array_line)))
                 for id,line in enumerate(self.array_line) :
                     lines = data.lines.create(identifier=f'myline{id}', positions=line)
                     lines.vis.color = tuple( [ c for c in colors_line[id]][:-1] ) #colors.to_rgb('chartreuse')
@@ -247,12 +296,14 @@ class NaiveOvitoModifier :
         """
 
         array_ase = data.particles[self.ase_array][:]
-        array_transparency = np.empty(array_ase.shape)
-        array_color = np.empty((len(array_ase),3))
 
-        for id_data_ase, data_ase in enumerate(array_ase) : 
-            array_transparency[id_data_ase] = self.dict_transparency_ase[data_ase]
-            array_color[id_data_ase] = colors.to_rgb(self.dict_color_ase[data_ase])
+        # lookup tables over the distinct values of the array
+        unique_ase, inverse_ase = np.unique(array_ase, return_inverse=True)
+        table_transparency = np.array([self.dict_transparency_ase[data_ase] for data_ase in unique_ase])
+        table_color = np.array([colors.to_rgb(self.dict_color_ase[data_ase]) for data_ase in unique_ase])
+
+        array_transparency = table_transparency[inverse_ase.reshape(-1)]
+        array_color = table_color[inverse_ase.reshape(-1)]
 
 
         data.particles_.create_property('Color',data=array_color)
@@ -291,10 +342,11 @@ class MCDModifier :
             self._build_rgb_dict()
 
     def _build_rgb_dict(self) -> None : 
-        """Convert the species color dictionnary into rgb"""
+        """Convert the species color dictionnary into rgb and type indexed rgb table"""
         self.dic_rgb = {}
         for key in self.dict_color.keys() :
             self.dic_rgb[key] = colors.to_rgb(self.dict_color[key])
+        self.rgb_table = build_rgb_table(self.dic_rgb)
 
     def AssignColors(self, frame : int, data : DataCollection) -> None :
         """Build ```Color``` property for ```Ovito```
@@ -307,7 +359,7 @@ class MCDModifier :
 
         """
         particules_type = data.particles['Particle Type'][:]
-        color_array = np.array([self.dic_rgb[type] for _,type in enumerate(particules_type)])
+        color_array = lookup_rgb_table(self.rgb_table, particules_type)
         data.particles_.create_property('Color',data=color_array)
 
 
@@ -336,7 +388,7 @@ class MCDModifier :
 
         # Apply conditions using boolean indexing
         array_transparency[mask] = 0.2 * (1.0 - normalized_mcd[mask])
-        color_array[mask] = [colors.to_rgb(self.color_map(mcd)) for mcd in normalized_mcd[mask]]
+        color_array[mask] = self.color_map(normalized_mcd[mask])[:,:3]
 
         # Set default values for elements not meeting the condition
         color_array[~mask] = colors.to_rgb('grey')
@@ -370,10 +422,11 @@ class LogisticModifier :
             self._build_rgb_dict()
 
     def _build_rgb_dict(self) -> None : 
-        """Convert the species color dictionnary into rgb"""
+        """Convert the species color dictionnary into rgb and type indexed rgb table"""
         self.dic_rgb = {}
         for key in self.dict_color.keys() : 
             self.dic_rgb[key] = colors.to_rgb(self.dict_color[key])
+        self.rgb_table = build_rgb_table(self.dic_rgb)
 
     def AssignColors(self, frame : int, data : DataCollection) -> None : 
         """Build ```Color``` property for ```Ovito```
@@ -386,7 +439,7 @@ class LogisticModifier :
 
         """
         particules_type = data.particles['Particle Type'][:]
-        color_array = np.array([self.dic_rgb[type] for _,type in enumerate(particules_type)])
+        color_array = lookup_rgb_table(self.rgb_table, particules_type)
         data.particles_.create_property('Color',data=color_array)
 
     def PerformLogisticSelection(self, frame : int, data : DataCollection) -> None : 
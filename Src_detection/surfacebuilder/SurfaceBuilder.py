@@ -2,10 +2,11 @@ import sys, argparse, os
 
 sys.path.insert(0,'../')
 from Src import NearestMode, SurfaceParser, AseVaspParser, \
-                 CompositionFromBulk, BuilderSurfaceOriented, \
+                 CompositionFromBulk, BuilderSurfaceOrientations, \
                  SetupVaspASE, WritingSlurm, SetupVaspSlabASE, \
                  RecursiveChecker, CheckProblems, SetRelaunch, \
                  DataSurface, ReadConvergenceFile, ExtractPathSlab, ComputeandWriteParametricSurfaceEnergy, \
+                 HarvestSurfaceCalculations, FillDataSurfaceFromTable, ExtractPathSlabTable, \
                  ReadFileNormalVector, RelativeStabilityOnGrid, \
                  PlotProjectionHyperplaneInto2D, PlotAllHyperplanes3D
                  
@@ -55,22 +56,23 @@ if mode == 'slab_builder' :
 
     for orientation in Parser_xml.parameters['hklVectors'] :
         print('Slab will be generated for orientation (%s,%s,%s)'%(orientation[0],orientation[1],orientation[2]))
-        BuilderSurfaceOriented(Parser_xml.parameters['PathBulk'],
-                                orientation,
-                                Parser_xml.parameters['HeighPymatgen'],
-                                Parser_xml.parameters['Vaccum'],
-                                composition,
-                                Parser_xml.parameters['Levels'],
-                                Parser_xml.parameters['HeighConstraint'],
-                                Parser_xml.parameters['ToleranceHeigh'],
-                                Parser_xml.parameters['WritingSlabs'],
-                                tolerance_surface=Parser_xml.parameters['ToleranceAtomSurface'],
-                                check_sym=Parser_xml.parameters['CheckSym'],
-                                alpha_list=Parser_xml.parameters['AlphaParameters'],
-                                tolerance_descripteur=Parser_xml.parameters['ToleranceDescriptors'],
-                                dense_check=Parser_xml.parameters['CheckDense'],
-                                remesher=Parser_xml.parameters['RemeshSurface'])
-        print()
+    BuilderSurfaceOrientations(Parser_xml.parameters['PathBulk'],
+                               Parser_xml.parameters['hklVectors'],
+                               Parser_xml.parameters['HeighPymatgen'],
+                               Parser_xml.parameters['Vaccum'],
+                               composition,
+                               Parser_xml.parameters['Levels'],
+                               Parser_xml.parameters['HeighConstraint'],
+                               Parser_xml.parameters['ToleranceHeigh'],
+                               Parser_xml.parameters['WritingSlabs'],
+                               tolerance_surface=Parser_xml.parameters['ToleranceAtomSurface'],
+                               check_sym=Parser_xml.parameters['CheckSym'],
+                               alpha_list=Parser_xml.parameters['AlphaParameters'],
+                               tolerance_descripteur=Parser_xml.parameters['ToleranceDescritpors'],
+                               dense_check=Parser_xml.parameters['CheckDense'],
+                               remesher=Parser_xml.parameters['RemeshSurface'],
+                               njob=Parser_xml.parameters['NJob'])
+    print()
 
     print('Enjoy :)')
 
@@ -212,10 +214,18 @@ if mode == 'extract_surface_energy' :
         os.system('rm %s/hp.data'%(os.path.dirname(Parser_xml.parameters['HyperplaneData'])))
 
     data_surface_object = DataSurface()
-    filled_data_surface_object = ReadConvergenceFile(data_surface_object,'%s/check_convergence.log'%(Parser_xml.parameters['PathComput']))
     name_bulk = os.path.basename(Parser_xml.parameters['PathBulk']).split('.')[0]
     list_name_slab = [el.split('.')[0] for el in  os.listdir(Parser_xml.parameters['PathSlabs'])]
-    list_path_slab = ExtractPathSlab(list_name_slab,'%s/check_convergence.log'%(Parser_xml.parameters['PathComput']))
+    if Parser_xml.parameters['HarvestTable'] != 'Default' :
+        HarvestSurfaceCalculations(Parser_xml.parameters['PathComput'],
+                                   Parser_xml.parameters['HarvestTable'],
+                                   njob=Parser_xml.parameters['NJob'],
+                                   tolerance_surface=Parser_xml.parameters['ToleranceAtomSurface'])
+        filled_data_surface_object = FillDataSurfaceFromTable(data_surface_object,Parser_xml.parameters['HarvestTable'])
+        list_path_slab = ExtractPathSlabTable(list_name_slab,Parser_xml.parameters['HarvestTable'])
+    else :
+        filled_data_surface_object = ReadConvergenceFile(data_surface_object,'%s/check_convergence.log'%(Parser_xml.parameters['PathComput']))
+        list_path_slab = ExtractPathSlab(list_name_slab,'%s/check_convergence.log'%(Parser_xml.parameters['PathComput']))
     list_name_slab = [el.split('/')[-2] for el in list_path_slab]        
     ComputeandWriteParametricSurfaceEnergy(filled_data_surface_object,
                                             f'{os.path.basename(Parser_xml.parameters['HyperplaneData'])}/hp_full.data',
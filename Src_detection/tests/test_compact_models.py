@@ -0,0 +1,78 @@
+import pickle
+import numpy as np
+import pytest
+
+from sklearn.covariance import MinCovDet
+from sklearn.mixture import BayesianGaussianMixture
+from sklearn.neighbors import KernelDensity
+from sklearn.linear_model import LogisticRegression
+from sklearn.decomposition import PCA
+
+from Src.metrics import MCDModel, GMMModel, GridKDE, write_models_h5, read_models_h5
+
+
+@pytest.fixture
+def descriptors() -> np.ndarray :
+    rng = np.random.default_rng(4)
+    return rng.normal(size=(400,5))@rng.normal(size=(5,5))
+
+
+def fit_distribution(distances : np.ndarray) -> GridKDE :
+    return GridKDE(KernelDensity(kernel='gaussian').fit(distances.reshape(-1,1)))
+
+
+def test_mcd_round_trip(tmp_path, descriptors) :
+    """Pickled and h5 MCD models give the same distances and scores"""
+    model = MCDModel()
+    mcd = MinCovDet(random_state=0).fit(descriptors)
+    model.models['Fe'] = {'mcd':mcd, 'distribution':fit_distribution(mcd.mahalanobis(descriptors))}
+    model._write_h5(tmp_path / 'models.h5')
+
+    original = pickle.loads(pickle.dumps(model))
+    compact = MCDModel(str(tmp_path / 'models.h5'))
+    X = descriptors[::3] + 0.1
+    distances = original.models['Fe']['mcd'].mahalanobis(X)
+    np.testing.assert_allclose(compact.models['Fe']['mcd'].mahalanobis(X), distances, rtol=1e-10)
+    np.testing.assert_allclose(compact.models['Fe']['distribution'].score_samples(distances),
+                               original.models['Fe']['distribution'].score_samples(distances), rtol=1e-10)
+    np.testing.assert_allclose(compact.models['Fe']['distribution'].score_samples(distances, exact=True),
+                               original.models['Fe']['distribution'].kde.score_samples(distances.reshape(-1,1)), rtol=1e-8)
+
+
+def test_gmm_round_trip(tmp_path, descriptors) :
+    """Pickled and h5 GMM models give the same distances and scores"""
+    model = GMMModel()
+    model.n_components = 3
+    gmm = BayesianGaussianMixture(n_components=3, random_state=0).fit(descriptors)
+    model.models['Fe'] = {'gmm':gmm, 'distribution':None}
+    distances = model.mahalanobis_gmm('Fe', descriptors)
+    model.models['Fe']['distribution'] = [fit_distribution(distances[:,k]) for k in range(3)]
+    model._write_h5(tmp_path / 'models.h5')
+
+    original = pickle.loads(pickle.dumps(model))
+    compact = GMMModel(str(tmp_path / 'models.h5'))
+    X = descriptors[::3] + 0.1
+    distances = original.mahalanobis_gmm('Fe', X)
+    np.testing.assert_allclose(compact.mahalanobis_gmm('Fe', X), distances, rtol=1e-10)
+    for k in range(3) :
+        np.testing.assert_allclose(compact.models['Fe']['distribution'][k].score_samples(distances[:,k]),
+                                   original.models['Fe']['distribution'][k].score_samples(distances[:,k]), rtol=1e-10)
+
+
+def test_logistic_and_pca_round_trip(tmp_path, descriptors) :
+    """Pickled and h5 logistic and PCA models give the same predictions"""
+    classes = np.digitize(descriptors[:,0], [-1.0, 1.0])
+    logistic = LogisticRegression(max_iter=1000).fit(descriptors, classes)
+    pca = PCA(n_components=3, whiten=True).fit(descriptors)
+    write_models_h5(tmp_path / 'models.h5', 'logistic', 'LOGISTIC', {'Fe':{'logistic_regressor':logistic, 'metadata':['a','b']}})
+    write_models_h5(tmp_path / 'models.h5', 'pca', 'PCA', {'Fe':{'PCA':pca}})
+
+    _, models_logistic, _ = read_models_h5(tmp_path / 'models.h5', 'logistic')
+    _, models_pca, _ = read_models_h5(tmp_path / 'models.h5', 'pca')
+    original_logistic = pickle.loads(pickle.dumps(logistic))
+    original_pca = pickle.loads(pickle.dumps(pca))
+    X = descriptors[::3] + 0.1
+    np.testing.assert_allclose(models_logistic['Fe']['logistic_regressor'].predict_proba(X), original_logistic.predict_proba(X), rtol=1e-10, atol=1e-14)
+    np.testing.assert_array_equal(models_logistic['Fe']['logistic_regressor'].predict(X), original_logistic.predict(X))
+    assert models_logistic['Fe']['metadata'] == ['a','b']
+    np.testing.assert_allclose(models_pca['Fe']['PCA'].transform(X), original_pca.transform(X), rtol=1e-10, atol=1e-12)
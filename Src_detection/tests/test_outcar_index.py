@@ -0,0 +1,53 @@
+import os
+import numpy as np
+import pytest
+
+from ase.io import read
+from Src.surface.ExtractAllFromVASP import OutcarIndex, GetOutcarIndex, GetElementsFromVasp, GetMagnetisation, GetEnergyFromVasp, \
+                                           GetNatomFromVasp, ForcesAndPosFromVasp, GetStressFromVASP, GetVolumeFromVASP
+
+path_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+list_outcar = [os.path.join(path_data, 'OUTCAR_Ni'), os.path.join(path_data, 'OUTCAR_FeNi_steps')]
+
+
+@pytest.mark.parametrize('path_outcar', list_outcar)
+def test_index_steps(path_outcar) :
+    """Each ionic step of the index matches the ASE OUTCAR reader"""
+    index = OutcarIndex(path_outcar)
+    images = read(path_outcar, index=':', format='vasp-out')
+    assert index.is_valid()
+    assert len(index.steps) == len(images)
+    for step, atoms in enumerate(images) :
+        data = index.get_step(step)
+        assert index.symbols == atoms.get_chemical_symbols()
+        assert index.natoms == len(atoms)
+        np.testing.assert_allclose(data['cell'], atoms.cell[:], atol=1e-10)
+        np.testing.assert_allclose(data['positions'], atoms.positions, atol=1e-10)
+        np.testing.assert_allclose(data['forces'], atoms.get_forces(), atol=1e-10)
+        np.testing.assert_allclose(data['stress'], atoms.get_stress(), atol=1e-12)
+        assert data['energy'] == pytest.approx(atoms.get_potential_energy(), abs=1e-10)
+        assert data['free_energy'] == pytest.approx(atoms.get_potential_energy(force_consistent=True), abs=1e-10)
+        assert data['magmom'] == pytest.approx(atoms.get_magnetic_moment(), abs=1e-10)
+        if 'magmoms' in atoms.calc.results :
+            np.testing.assert_allclose(data['magmoms'], atoms.get_magnetic_moments(), atol=1e-10)
+        assert index.get_volume(step) == pytest.approx(atoms.get_volume(), rel=1e-12)
+
+
+@pytest.mark.parametrize('path_outcar', list_outcar)
+def test_getters(path_outcar) :
+    """Module getters (last ionic step) match the ASE OUTCAR reader"""
+    atoms = read(path_outcar, format='vasp-out')
+    positions, forces = ForcesAndPosFromVasp(path_outcar)
+    list_el, nb_el = GetElementsFromVasp(path_outcar)
+    symbols = atoms.get_chemical_symbols()
+
+    assert GetOutcarIndex(path_outcar) is GetOutcarIndex(path_outcar)
+    assert list_el == list(dict.fromkeys(symbols))
+    assert nb_el == [symbols.count(el) for el in list_el]
+    assert GetNatomFromVasp(path_outcar) == len(atoms)
+    assert GetEnergyFromVasp(path_outcar) == pytest.approx(atoms.get_potential_energy(), abs=1e-10)
+    assert GetMagnetisation(path_outcar) == pytest.approx(atoms.get_magnetic_moment(), abs=1e-10)
+    assert GetVolumeFromVASP(path_outcar) == pytest.approx(atoms.get_volume(), rel=1e-12)
+    np.testing.assert_allclose(positions, atoms.positions, atol=1e-10)
+    np.testing.assert_allclose(forces, atoms.get_forces(), atol=1e-10)
+    np.testing.assert_allclose(GetStressFromVASP(path_outcar), atoms.get_stress(), atol=1e-12)